@@ -1,46 +1,173 @@
+import argparse
+import time
+
+parser = argparse.ArgumentParser(description="Termicord Discord bot")
+parser.add_argument("--force-sync", action="store_true", help="Sync slash commands even if the command tree hasn't changed")
+parser.add_argument("--profile-startup", action="store_true", help="Report per-module import time and per-cog setup cost")
+parser.add_argument("--shard-count", type=int, help="Total number of shards across all processes (overrides SHARD_COUNT)")
+parser.add_argument("--shards", help="Shards to run in this process, e.g. 0-3 or 0,2 (overrides SHARD_IDS)")
+parser.add_argument("--metrics-port", type=int, help="Port for the metrics endpoint (overrides METRICS_PORT)")
+args = parser.parse_args()
+
+def parse_shard_ids(text: str):
+    shard_ids = []
+    for part in text.split(","):
+        start, _, end = part.strip().partition("-")
+        shard_ids.extend(range(int(start), int(end or start) + 1))
+    return sorted(set(shard_ids))
+
+# The profiler has to be installed before anything else is imported to see the whole startup
+profiler = None
+if args.profile_startup:
+    from utils.startup_profiler import ImportProfiler
+    profiler = ImportProfiler()
+    profiler.install()
+
 import discord
 from discord.ext import commands
-import asyncpg
-from config import TOKEN, DB_Host, DB_Name, DB_User, DB_Pass, DB_Port
+import asyncio
+import hashlib
+import json
+from config import TOKEN, SHARD_COUNT, SHARD_IDS
+from config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT
+from utils import metrics, tracing
+from utils.repository import create_pool
 
 intents = discord.Intents.default()
 intents.message_content = True
 
-async def create_db_pool():
-    return await asyncpg.create_pool(database=DB_Name, user=DB_User, password=DB_Pass, host=DB_Host, port=DB_Port)
+EXTENSIONS = [
+    "commands.addhost",
+    "commands.importhosts",
+    "commands.execute",
+    "commands.output",
+    "commands.files",
+    "commands.tail",
+    "commands.grep",
+    "commands.jobs",
+    "commands.removehost",
+    "commands.kill",
+    "commands.reboot",
+    "commands.status",
+    "commands.liveterminal",
+    "commands.processes",
+    "commands.users",
+    "commands.ip",
+    "commands.ports",
+    "commands.edithost",
+    "commands.listhost",
+    "commands.latency",
+    "commands.help",
+]
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+shard_count = args.shard_count or SHARD_COUNT
+try:
+    shard_ids = parse_shard_ids(args.shards) if args.shards else SHARD_IDS
+except ValueError:
+    parser.error(f"invalid shard list '{args.shards}'")
+if shard_ids and not shard_count:
+    parser.error("running specific shards needs a total shard count (--shard-count or SHARD_COUNT)")
+if shard_ids and not all(0 <= shard_id < shard_count for shard_id in shard_ids):
+    parser.error(f"shard ids must be between 0 and {shard_count - 1}")
+
+if shard_count:
+    # Each process only receives gateway events for the guilds on its own shards
+    bot = commands.AutoShardedBot(
+        command_prefix="!", intents=intents, shard_count=shard_count, shard_ids=shard_ids,
+        tree_cls=tracing.TracingCommandTree
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, tree_cls=tracing.TracingCommandTree)
 tree = bot.tree
 bot.db = None
+if METRICS_ENABLED:
+    metrics.instrument_discord(bot)
 
 started = False
 
+def command_tree_hash() -> str:
+    """Stable hash of the slash command payload that tree.sync() would send to Discord."""
+    payload = [command.to_dict(tree) for command in tree.get_commands()]
+    payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+async def sync_commands_if_changed() -> bool:
+    """Sync slash commands only when the command tree differs from the last synced one."""
+    tree_hash = command_tree_hash()
+    async with bot.db.acquire() as conn:
+        synced_hash = await conn.fetchval("SELECT value FROM bot_state WHERE key = 'command_tree_hash'")
+        if synced_hash == tree_hash and not args.force_sync:
+            return False
+
+        await tree.sync()
+        await conn.execute(
+            """INSERT INTO bot_state (key, value) VALUES ('command_tree_hash', $1)
+            ON CONFLICT (key) DO UPDATE SET value = $1""",
+            tree_hash
+        )
+    return True
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    tracing.finish_interaction(interaction, "ok")
+
 @bot.event
 async def on_ready():
     global started
     if started == False:
         try:
-            bot.db = await create_db_pool()
-            print(f"Connected to database!")
-            await bot.load_extension("commands.addhost")
-            await bot.load_extension("commands.execute")
-            await bot.load_extension("commands.removehost")
-            await bot.load_extension("commands.kill")
-            await bot.load_extension("commands.reboot")
-            await bot.load_extension("commands.status")
-            await bot.load_extension("commands.liveterminal")
-            await bot.load_extension("commands.processes")
-            await bot.load_extension("commands.users")
-            await bot.load_extension("commands.ip")
-            await bot.load_extension("commands.ports")
-            await bot.load_extension("commands.edithost")
-            await bot.load_extension("commands.listhost")
-            await bot.load_extension("commands.help")
-            await tree.sync()  # Sync slash commands
-            print(f"Loaded and Synced all commands!")
+            phase_start = time.perf_counter()
+            bot.db = await create_pool()
+            print(f"Connected to database! ({time.perf_counter() - phase_start:.2f}s)")
+
+            if METRICS_ENABLED:
+                bot.db = metrics.instrument_pool(bot.db)
+                bot.loop.create_task(metrics.monitor_loop_lag())
+                metrics_port = args.metrics_port or METRICS_PORT
+                try:
+                    await metrics.start_server(METRICS_HOST, metrics_port)
+                    print(f"Serving metrics on http://{METRICS_HOST}:{metrics_port}/metrics")
+                except OSError as e:
+                    print(f"Failed to start metrics endpoint: {e}")
+
+            phase_start = time.perf_counter()
+            failed = []
+            if profiler:
+                # Load one at a time so import and setup cost can be attributed to each cog
+                for extension in EXTENSIONS:
+                    extension_start = time.perf_counter()
+                    try:
+                        await bot.load_extension(extension)
+                    except Exception as e:
+                        print(f"Failed to load {extension}: {e}")
+                        failed.append(extension)
+                    profiler.record_setup(extension, time.perf_counter() - extension_start)
+            else:
+                results = await asyncio.gather(*(bot.load_extension(extension) for extension in EXTENSIONS), return_exceptions=True)
+                for extension, result in zip(EXTENSIONS, results):
+                    if isinstance(result, Exception):
+                        print(f"Failed to load {extension}: {result}")
+                        failed.append(extension)
+            print(f"Loaded {len(EXTENSIONS)} extensions ({time.perf_counter() - phase_start:.2f}s)")
+            if profiler:
+                profiler.uninstall()
+                print(profiler.report())
+
+            phase_start = time.perf_counter()
+            if failed:
+                # Syncing now would drop the failed cogs' commands and record the partial tree as synced
+                print(f"Skipped command sync, {len(failed)} extensions failed to load")
+            elif shard_ids and 0 not in shard_ids:
+                # Commands are global, the process running shard 0 syncs them for everyone
+                print("Skipped command sync, it's done by the process running shard 0")
+            elif await sync_commands_if_changed():
+                print(f"Synced all commands! ({time.perf_counter() - phase_start:.2f}s)")
+            else:
+                print(f"Command tree unchanged, skipped sync ({time.perf_counter() - phase_start:.2f}s)")
         except Exception as e:
             print(f"Failed to sync slash commands: {e}")
         started = True
-    print(f'Logged in as {bot.user} (ID: {bot.user.id})')
+    shard_text = f", shards {shard_ids or 'all'} of {bot.shard_count}" if shard_count else ""
+    print(f'Logged in as {bot.user} (ID: {bot.user.id}{shard_text})')
 
-bot.run(TOKEN)
\ No newline at end of file
+bot.run(TOKEN)
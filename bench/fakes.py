@@ -0,0 +1,159 @@
+import asyncio
+import types
+
+# Just enough of discord.py and asyncpg for the cogs to run against the stand-in server.
+
+class Record(tuple):
+    """Row that unpacks like a tuple and indexes by column name, like asyncpg.Record."""
+
+    def __new__(cls, values: dict):
+        record = super().__new__(cls, values.values())
+        record.columns = values
+        return record
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        return self.columns.get(key, default)
+
+class FakeConnection:
+    def __init__(self, db: "FakeDB"):
+        self.db = db
+
+    async def fetchrow(self, query, *args):
+        if "FROM hosts" in query:
+            return Record(dict(self.db.host))
+        if "FROM live_terminals" in query:
+            return Record({**self.db.host, "channel_id": args[0], "user_id": "1", "hostname": "standin", "recording": False, "guild_id": None})
+        return None
+
+    async def fetch(self, query, *args):
+        return []
+
+    async def fetchval(self, query, *args):
+        return None
+
+    async def execute(self, query, *args):
+        return "OK"
+
+class FakeAcquire:
+    def __init__(self, db: "FakeDB"):
+        self.db = db
+
+    async def __aenter__(self):
+        return FakeConnection(self.db)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class FakeDB:
+    """Pool whose every host lookup returns the stand-in server."""
+
+    def __init__(self, host: str, port: int):
+        self.host = {
+            "ip": host,
+            "username": "bench",
+            "password": "bench",
+            "identification_file": None,
+            "port": port,
+        }
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+class FakeMessage:
+    def __init__(self, channel: "FakeChannel", content=None, embed=None):
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.embed = embed
+        self.edits = 0
+        self.edited = asyncio.Event()
+
+    async def edit(self, content=None, embed=None, view=None, **kwargs):
+        self.edits += 1
+        self.channel.record(content, embed)
+        if embed is not None:
+            self.embed = embed
+        self.edited.set()
+        return self
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content)
+
+class FakeChannel:
+    """Counts what the cogs send and lets a benchmark wait for a marker in the output."""
+
+    def __init__(self, channel_id: int = 1000):
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+        self.guild = types.SimpleNamespace(id=1, filesize_limit=25 * 1024 * 1024)
+        self.messages = 0
+        self.bytes_sent = 0
+        self.waiters = []
+
+    def record(self, content, embed):
+        text = (content or "") + (f"{embed.title or ''}\n{embed.description or ''}" if embed is not None else "")
+        self.bytes_sent += len(text.encode("utf-8"))
+        for marker, event in self.waiters:
+            if marker in text:
+                event.set()
+
+    async def send(self, content=None, embed=None, **kwargs):
+        self.messages += 1
+        self.record(content, embed)
+        return FakeMessage(self, content, embed)
+
+    def wait_for(self, marker: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self.waiters.append((marker, event))
+        return event
+
+class FakeResponse:
+    async def defer(self, **kwargs):
+        pass
+
+    async def send_message(self, content=None, **kwargs):
+        pass
+
+class FakeFollowup:
+    def __init__(self, channel: FakeChannel):
+        self.channel = channel
+
+    async def send(self, content=None, embed=None, **kwargs):
+        return await self.channel.send(content, embed=embed)
+
+class FakeInteraction:
+    def __init__(self, channel: FakeChannel, user_id: int = 1):
+        self.user = types.SimpleNamespace(id=user_id, bot=False)
+        self.guild = types.SimpleNamespace(id=1, filesize_limit=25 * 1024 * 1024)
+        self.channel = channel
+        self.channel_id = channel.id
+        self.response = FakeResponse()
+        self.followup = FakeFollowup(channel)
+
+class FakeBot:
+    def __init__(self, db: FakeDB):
+        self.db = db
+        self.loop = asyncio.get_running_loop()
+        self.channels = {}
+
+    async def wait_until_ready(self):
+        pass
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_cog(self, name):
+        return None
+
+class FakeUserMessage:
+    """A message typed by a user, as on_message sees it."""
+
+    def __init__(self, channel: FakeChannel, content: str, user_id: int = 1):
+        self.channel = channel
+        self.content = content
+        self.author = types.SimpleNamespace(id=user_id, bot=False)
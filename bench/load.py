@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from bench.fakes import FakeBot, FakeChannel, FakeDB, FakeInteraction, FakeUserMessage, Record
+from bench.run import latency_stats
+from bench.sshserver import StandInServer
+
+# Simulates many users issuing a mix of slash commands against one set of cogs and reports
+# how latency, event loop lag, pool usage and memory develop while the load runs.
+# Usage: python -m bench.load --users 50 --duration 120 [--postgres] [--output load.json]
+
+DEFAULT_MIX = "status=4,processes=2,execute=2,terminal=2"
+USER_ID_BASE = 900000000000000000  # Simulated users get ids far away from real Discord ones
+
+def rss_bytes() -> int:
+    """Current resident memory, or the peak where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+
+class LoadTest:
+    def __init__(self, args, server: StandInServer):
+        self.args = args
+        self.server = server
+        self.mix = []
+        for entry in args.mix.split(","):
+            name, _, weight = entry.partition("=")
+            self.mix.append((name.strip(), float(weight or 1)))
+        self.latencies = defaultdict(list)  # command -> latencies in the current sampling window
+        self.totals = defaultdict(list)  # command -> every latency
+        self.errors = defaultdict(int)
+        self.loop_lag = []
+        self.timeline = []
+        self.pool = None
+        self.running = True
+
+    async def setup(self):
+        if self.args.postgres:
+            from utils import metrics
+            from utils.repository import create_pool
+            self.pool = await create_pool()
+            async with self.pool.acquire() as conn:
+                await conn.executemany(
+                    """INSERT INTO hosts (user_id, hostname, ip, username, password, port)
+                    VALUES ($1, 'standin', $2, 'bench', 'bench', $3)
+                    ON CONFLICT (user_id, hostname) DO UPDATE SET ip = $2, port = $3""",
+                    [(str(USER_ID_BASE + user), self.server.host, self.server.port) for user in range(self.args.users)]
+                )
+            db = metrics.instrument_pool(self.pool)
+        else:
+            db = FakeDB(self.server.host, self.server.port)
+
+        self.bot = FakeBot(db)
+        from commands.status import StatusCommand
+        from commands.processes import ProcessesCommand
+        from commands.execute import ExecuteCommand
+        from commands.liveterminal import LiveTerminalCommand
+        self.status_cog = StatusCommand(self.bot)
+        self.processes_cog = ProcessesCommand(self.bot)
+        self.execute_cog = ExecuteCommand(self.bot)
+        self.terminal_cog = LiveTerminalCommand(self.bot)
+
+    async def teardown(self):
+        for channel_id, terminal in list(self.terminal_cog.active_terminals.items()):
+            self.terminal_cog.active_terminals.pop(channel_id, None)
+            terminal['client'].close()
+        if self.pool is not None:
+            async with self.pool.acquire() as conn:
+                await conn.execute(
+                    "DELETE FROM hosts WHERE user_id = ANY($1::TEXT[])",
+                    [str(USER_ID_BASE + user) for user in range(self.args.users)]
+                )
+            await self.pool.close()
+
+    async def open_terminal(self, user_id: int, channel: FakeChannel):
+        session = Record({**self.server_host(), "channel_id": channel.id, "hostname": "standin"})
+        loop = asyncio.get_running_loop()
+        client = await loop.run_in_executor(None, self.terminal_cog.create_ssh_client, session)
+        shell = client.invoke_shell()
+        self.terminal_cog.active_terminals[channel.id] = {
+            'client': client,
+            'shell': shell,
+            'user_id': str(user_id),
+            'output_buffer': '',
+            'hostname': "standin",
+            'recorder': None
+        }
+        asyncio.create_task(self.terminal_cog.monitor_shell_output(channel, shell))
+
+    def server_host(self):
+        return {
+            "ip": self.server.host,
+            "username": "bench",
+            "password": "bench",
+            "identification_file": None,
+            "port": self.server.port,
+        }
+
+    async def run_command(self, name: str, user_id: int, terminal_channel: FakeChannel, sequence: int):
+        channel = FakeChannel(USER_ID_BASE + sequence)
+        interaction = FakeInteraction(channel, user_id)
+        if name == "status":
+            await self.status_cog.status.callback(self.status_cog, interaction, "standin")
+        elif name == "processes":
+            await self.processes_cog.processes.callback(self.processes_cog, interaction, "standin")
+        elif name == "execute":
+            done = channel.wait_for("Completed Command")
+            await self.execute_cog.execute.callback(
+                self.execute_cog, interaction, f"flood {self.args.flood_lines}; exit", "standin"
+            )
+            await asyncio.wait_for(done.wait(), timeout=self.args.timeout)
+        elif name == "terminal":
+            # on_message repeats the command back to the channel, so quote the marker to keep it out of that echo
+            marker = f"LOAD-DONE-{sequence}"
+            done = terminal_channel.wait_for(marker)
+            await self.terminal_cog.on_message(
+                FakeUserMessage(terminal_channel, f"flood {self.args.flood_lines}; echo LOAD-'DONE'-{sequence}", user_id)
+            )
+            await asyncio.wait_for(done.wait(), timeout=self.args.timeout)
+        else:
+            raise ValueError(f"Unknown command '{name}'")
+
+    async def user_loop(self, index: int, deadline: float):
+        user_id = USER_ID_BASE + index
+        rng = random.Random(index)
+        await asyncio.sleep(self.args.ramp * index / max(1, self.args.users))
+
+        terminal_channel = FakeChannel(user_id)
+        if any(name == "terminal" for name, _ in self.mix):
+            try:
+                await self.open_terminal(user_id, terminal_channel)
+            except Exception as e:
+                self.errors["terminal_open"] += 1
+                print(f"User {index} could not open a terminal: {e}")
+
+        names = [name for name, _ in self.mix]
+        weights = [weight for _, weight in self.mix]
+        sequence = index * 1000000
+        while self.running and time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            if name == "terminal" and terminal_channel.id not in self.terminal_cog.active_terminals:
+                continue
+            sequence += 1
+            start = time.perf_counter()
+            try:
+                await self.run_command(name, user_id, terminal_channel, sequence)
+                elapsed = time.perf_counter() - start
+                self.latencies[name].append(elapsed)
+                self.totals[name].append(elapsed)
+            except Exception as e:
+                self.errors[name] += 1
+                if self.args.verbose:
+                    print(f"User {index} {name} failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(rng.expovariate(1 / self.args.think) if self.args.think > 0 else 0)
+
+    async def monitor_lag(self):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            scheduled = loop.time() + 0.1
+            await asyncio.sleep(0.1)
+            self.loop_lag.append(max(0.0, loop.time() - scheduled))
+
+    async def sample(self, started: float):
+        """Record one point of the timeline and start a new sampling window."""
+        window, self.latencies = self.latencies, defaultdict(list)
+        lag, self.loop_lag = self.loop_lag, []
+        point = {
+            "elapsed_s": round(time.monotonic() - started, 1),
+            "commands": {name: {"count": len(values), **latency_stats(values)} for name, values in sorted(window.items()) if values},
+            "ops_per_second": round(sum(len(values) for values in window.values()) / self.args.interval, 2),
+            "loop_lag_max_ms": round(max(lag, default=0) * 1000, 2),
+            "loop_lag_mean_ms": round(sum(lag) / len(lag) * 1000, 2) if lag else 0,
+            "rss_mb": round(rss_bytes() / 1024 / 1024, 1),
+            "tasks": len(asyncio.all_tasks()),
+            "threads": threading.active_count(),
+        }
+        if self.pool is not None:
+            point["pool"] = {"size": self.pool.get_size(), "idle": self.pool.get_idle_size(), "max": self.pool.get_max_size()}
+        self.timeline.append(point)
+        print(
+            f"[{point['elapsed_s']:>6}s] {point['ops_per_second']:>7} ops/s  "
+            f"lag max {point['loop_lag_max_ms']:>7}ms  rss {point['rss_mb']:>7}MB  "
+            + "  ".join(f"{name} p95 {stats['p95_ms']:.0f}ms" for name, stats in point["commands"].items())
+            + (f"  pool {point['pool']['size'] - point['pool']['idle']}/{point['pool']['max']} busy" if "pool" in point else "")
+        )
+
+    async def run(self):
+        await self.setup()
+        started = time.monotonic()
+        deadline = started + self.args.duration
+        lag_task = asyncio.create_task(self.monitor_lag())
+        users = [asyncio.create_task(self.user_loop(index, deadline)) for index in range(self.args.users)]
+        rss_start = rss_bytes()
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.args.interval)
+            await self.sample(started)
+
+        self.running = False
+        await asyncio.wait(users, timeout=self.args.timeout)
+        lag_task.cancel()
+        await self.teardown()
+
+        total = sum(len(values) for values in self.totals.values())
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "settings": {key: value for key, value in vars(self.args).items() if key not in ("output",)},
+            "summary": {
+                "operations": total,
+                "ops_per_second": round(total / self.args.duration, 2),
+                "errors": dict(self.errors),
+                "commands": {name: {"count": len(values), **latency_stats(values)} for name, values in sorted(self.totals.items()) if values},
+                "rss_growth_mb": round((rss_bytes() - rss_start) / 1024 / 1024, 1),
+            },
+            "timeline": self.timeline,
+        }
+
+async def main(args):
+    server = StandInServer(latency=args.server_latency / 1000).start()
+    try:
+        report = await LoadTest(args, server).run()
+    finally:
+        server.stop()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    summary = report["summary"]
+    print(f"\n{summary['operations']} operations, {summary['ops_per_second']} ops/s, errors: {summary['errors'] or 'none'}")
+    for name, stats in summary["commands"].items():
+        print(f"  {name:<10} n={stats['count']:<6} p50 {stats['p50_ms']:.0f}ms  p95 {stats['p95_ms']:.0f}ms  p99 {stats['p99_ms']:.0f}ms")
+    print(f"Memory growth: {summary['rss_growth_mb']}MB. Results written to {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent users against the cogs and a local stand-in SSH server")
+    parser.add_argument("--users", type=int, default=20, help="Simulated concurrent users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run the load for")
+    parser.add_argument("--ramp", type=float, default=10, help="Seconds over which users start")
+    parser.add_argument("--think", type=float, default=2, help="Mean seconds a user waits between commands")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Command weights (default {DEFAULT_MIX})")
+    parser.add_argument("--flood-lines", type=int, default=200, help="Lines of output per execute and terminal command")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between timeline samples")
+    parser.add_argument("--server-latency", type=float, default=0, help="Extra milliseconds the server waits before each response")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds before a single command counts as failed")
+    parser.add_argument("--postgres", action="store_true", help="Use the database from config.py instead of an in-memory fake")
+    parser.add_argument("--verbose", action="store_true", help="Print every failed command")
+    parser.add_argument("--output", default="load-results.json", help="Where to write the JSON results")
+    asyncio.run(main(parser.parse_args()))
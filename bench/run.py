@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from bench.fakes import FakeBot, FakeChannel, FakeDB, FakeInteraction, Record
+from bench.sshserver import StandInServer, flood
+from utils.ssh import PROFILES, connect_client
+
+# Runs the cogs against a local stand-in SSH server and fake Discord objects.
+# Usage: python -m bench.run [--scenarios connect,status,execute,exec,cache,terminal,download,profiles] [--output results.json] [--compare old.json]
+
+SCENARIOS = ["connect", "status", "execute", "exec", "cache", "terminal", "download", "profiles"]
+
+def latency_stats(seconds):
+    values = sorted(seconds)
+    def at(fraction):
+        return values[min(len(values) - 1, int(fraction * len(values)))] * 1000
+    return {
+        "p50_ms": round(at(0.5), 3),
+        "p95_ms": round(at(0.95), 3),
+        "p99_ms": round(at(0.99), 3),
+        "mean_ms": round(statistics.mean(values) * 1000, 3),
+    }
+
+async def bench_connect(server, args):
+    """SSH connect + auth latency, the way the cogs open their connections."""
+    timings = []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        client = connect_client(FakeDB(server.host, server.port).host)
+        timings.append(time.perf_counter() - start)
+        client.close()
+    return {"iterations": len(timings), **latency_stats(timings)}
+
+async def bench_status(server, args):
+    from commands.status import StatusCommand
+
+    bot = FakeBot(FakeDB(server.host, server.port))
+    cog = StatusCommand(bot)
+    timings = []
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        channel = FakeChannel()
+        start = time.perf_counter()
+        await cog.status.callback(cog, FakeInteraction(channel), "standin")
+        timings.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": len(timings),
+        "commands_per_second": round(len(timings) / elapsed, 2),
+        **latency_stats(timings),
+    }
+
+async def bench_execute(server, args, mode: str = "shell"):
+    """/execute of a command that floods ANSI output, timed until the final embed is posted."""
+    from commands.execute import ExecuteCommand
+
+    bot = FakeBot(FakeDB(server.host, server.port))
+    cog = ExecuteCommand(bot)
+    raw_bytes = len(flood(args.flood_lines).encode("utf-8"))
+    timings = []
+    forwarded = 0
+    for _ in range(max(1, args.iterations // 10)):
+        channel = FakeChannel()
+        done = channel.wait_for("Completed Command")
+        start = time.perf_counter()
+        # An exec channel ends with the command, a shell needs telling
+        command = f"flood {args.flood_lines}" if mode == "exec" else f"flood {args.flood_lines}; exit"
+        await cog.execute.callback(cog, FakeInteraction(channel), command, "standin", mode=mode)
+        await asyncio.wait_for(done.wait(), timeout=args.timeout)
+        timings.append(time.perf_counter() - start)
+        forwarded += channel.bytes_sent
+    elapsed = sum(timings)
+    return {
+        "iterations": len(timings),
+        "flood_lines": args.flood_lines,
+        "commands_per_second": round(len(timings) / elapsed, 2),
+        "remote_bytes_per_second": round(raw_bytes * len(timings) / elapsed),
+        "discord_bytes_per_second": round(forwarded / elapsed),
+        **latency_stats(timings),
+    }
+
+async def bench_cache(server, args):
+    """/execute df -h with the result cache on: a burst of identical requests, then repeats and fresh runs."""
+    import commands.execute
+    from commands.execute import ExecuteCommand
+
+    commands.execute.COMMAND_CACHE_ENABLED = True
+    bot = FakeBot(FakeDB(server.host, server.port))
+    cog = ExecuteCommand(bot)
+
+    async def request(fresh=False):
+        start = time.perf_counter()
+        await cog.execute.callback(cog, FakeInteraction(FakeChannel()), "df -h", "standin", fresh=fresh)
+        return time.perf_counter() - start
+
+    results = {}
+    execs = server.execs
+    burst = await asyncio.gather(*(request() for _ in range(args.iterations)))
+    results["burst_requests"] = len(burst)
+    results["burst_remote_executions"] = server.execs - execs
+    results["burst_p50_ms"] = latency_stats(burst)["p50_ms"]
+
+    execs = server.execs
+    cached = [await request() for _ in range(args.iterations)]
+    results["cached_remote_executions"] = server.execs - execs
+    results["cached_p50_ms"] = latency_stats(cached)["p50_ms"]
+
+    fresh = [await request(fresh=True) for _ in range(max(1, args.iterations // 10))]
+    results["fresh_p50_ms"] = latency_stats(fresh)["p50_ms"]
+    return results
+
+async def bench_terminal(server, args):
+    """A live terminal forwarding flood output to its channel, timed per round trip."""
+    from commands.liveterminal import LiveTerminalCommand
+
+    bot = FakeBot(FakeDB(server.host, server.port))
+    cog = LiveTerminalCommand(bot)
+    channel = FakeChannel()
+    session = Record({**bot.db.host, "channel_id": channel.id, "hostname": "standin"})
+
+    connect_start = time.perf_counter()
+    client = cog.create_ssh_client(session)
+    shell = client.invoke_shell()
+    connect_time = time.perf_counter() - connect_start
+    cog.active_terminals[channel.id] = {
+        'client': client,
+        'shell': shell,
+        'user_id': "1",
+        'output_buffer': '',
+        'hostname': "standin",
+        'recorder': None
+    }
+    monitor = asyncio.create_task(cog.monitor_shell_output(channel, shell))
+
+    raw_bytes = len(flood(args.flood_lines).encode("utf-8"))
+    timings = []
+    try:
+        for index in range(max(1, args.iterations // 10)):
+            done = channel.wait_for(f"BENCH-DONE-{index}")
+            start = time.perf_counter()
+            shell.send(f"flood {args.flood_lines}; echo BENCH-DONE-{index}\n")
+            await asyncio.wait_for(done.wait(), timeout=args.timeout)
+            timings.append(time.perf_counter() - start)
+    finally:
+        cog.active_terminals.pop(channel.id, None)
+        await monitor
+        client.close()
+
+    elapsed = sum(timings)
+    return {
+        "iterations": len(timings),
+        "flood_lines": args.flood_lines,
+        "connect_ms": round(connect_time * 1000, 3),
+        "messages_sent": channel.messages,
+        "remote_bytes_per_second": round(raw_bytes * len(timings) / elapsed),
+        "discord_bytes_per_second": round(channel.bytes_sent / elapsed),
+        **latency_stats(timings),
+    }
+
+async def bench_download(server, args):
+    """/file download of a mixed text and random file, without and with compression."""
+    from commands.files import FilesCommand
+
+    bot = FakeBot(FakeDB(server.host, server.port))
+    cog = FilesCommand(bot)
+    size = args.transfer_mb * 1024 * 1024
+    with open(os.path.join(server.root, "payload.bin"), "wb") as payload:
+        block = flood(200).encode("utf-8")
+        while payload.tell() < size:
+            payload.write(block)
+            payload.write(os.urandom(len(block) // 4))
+    results = {"file_bytes": os.path.getsize(os.path.join(server.root, "payload.bin"))}
+    for compress in ("never", "always"):
+        channel = FakeChannel()
+        start = time.perf_counter()
+        await cog.download.callback(cog, FakeInteraction(channel), "standin", "/payload.bin", compress)
+        elapsed = time.perf_counter() - start
+        results[f"{compress}_seconds"] = round(elapsed, 3)
+        results[f"{compress}_bytes_per_second"] = round(results["file_bytes"] / elapsed)
+    return results
+
+async def bench_profiles(server, args):
+    """Handshake latency and exec output throughput for every SSH connection profile.
+
+    Run it with --bandwidth-kbps to see where compression starts paying for itself.
+    """
+    loop = asyncio.get_running_loop()
+    raw_bytes = len(flood(args.flood_lines).encode("utf-8"))
+
+    def exec_flood(client):
+        stdin, stdout, stderr = client.exec_command(f"flood {args.flood_lines}")
+        return len(stdout.read())
+
+    # Warm up once first, or the first profile also pays for the server's and paramiko's first-use setup
+    client = await loop.run_in_executor(None, connect_client, FakeDB(server.host, server.port).host)
+    client.close()
+
+    results = {}
+    for profile in PROFILES:
+        host = {**FakeDB(server.host, server.port).host, "ssh_profile": profile}
+        connects = []
+        transfers = []
+        for _ in range(max(1, args.iterations // 10)):
+            start = time.perf_counter()
+            client = await loop.run_in_executor(None, connect_client, host)
+            connects.append(time.perf_counter() - start)
+            try:
+                cipher = client.get_transport().local_cipher
+                start = time.perf_counter()
+                await asyncio.wait_for(loop.run_in_executor(None, exec_flood, client), timeout=args.timeout)
+                transfers.append(time.perf_counter() - start)
+            finally:
+                client.close()
+        # Flat keys so --compare can line them up with an older run
+        results[f"{profile}_cipher"] = cipher
+        results[f"{profile}_connect_p50_ms"] = latency_stats(connects)["p50_ms"]
+        results[f"{profile}_flood_bytes_per_second"] = round(raw_bytes * len(transfers) / sum(transfers))
+    return results
+
+def compare(results, baseline_path):
+    """Print how every numeric result moved against a previous results file."""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)["scenarios"]
+    print(f"\nCompared with {baseline_path}:")
+    for scenario, values in results.items():
+        for key, value in values.items():
+            old = baseline.get(scenario, {}).get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+                print(f"  {scenario}.{key}: {old} -> {value} ({(value - old) / old * 100:+.1f}%)")
+
+async def main(args):
+    server = StandInServer(latency=args.server_latency / 1000, bandwidth_kbps=args.bandwidth_kbps).start()
+    runners = {
+        "connect": bench_connect,
+        "status": bench_status,
+        "execute": bench_execute,
+        "exec": lambda server, args: bench_execute(server, args, mode="exec"),
+        "cache": bench_cache,
+        "terminal": bench_terminal,
+        "download": bench_download,
+        "profiles": bench_profiles,
+    }
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            print(f"Running {scenario}...")
+            results[scenario] = await runners[scenario](server, args)
+            print(f"  {json.dumps(results[scenario])}")
+    finally:
+        server.stop()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "iterations": args.iterations,
+            "flood_lines": args.flood_lines,
+            "server_latency_ms": args.server_latency,
+            "transfer_mb": args.transfer_mb,
+            "bandwidth_kbps": args.bandwidth_kbps,
+        },
+        "scenarios": results,
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Termicord cogs against a local stand-in SSH server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma separated, any of {', '.join(SCENARIOS)}")
+    parser.add_argument("--iterations", type=int, default=50, help="Iterations for connect and status, a tenth of this for execute and terminal")
+    parser.add_argument("--flood-lines", type=int, default=5000, help="Lines of ANSI output per execute/terminal iteration")
+    parser.add_argument("--transfer-mb", type=int, default=50, help="Size of the file the download scenario transfers")
+    parser.add_argument("--server-latency", type=float, default=0, help="Extra milliseconds the server waits before each response")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="Cap the server's upstream bandwidth, 0 for unlimited")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for one iteration before giving up")
+    parser.add_argument("--output", default="bench-results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="A previous results file to compare against")
+    args = parser.parse_args()
+    args.scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    asyncio.run(main(args))
@@ -0,0 +1,331 @@
+import errno
+import logging
+import os
+import random
+import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import paramiko
+
+# A local SSH server that answers the commands the cogs run with canned or synthetic output,
+# so benchmarks measure Termicord rather than a real host.
+
+# Clients hanging up mid-read is normal here, keep the server's transports quiet about it
+logging.getLogger("bench.sshserver").setLevel(logging.CRITICAL)
+
+PROMPT = "\x1b[01;32mbench@standin\x1b[00m:\x1b[01;34m~\x1b[00m$ "
+
+def cpuinfo(processors: int = 8) -> str:
+    block = (
+        "processor\t: {index}\nvendor_id\t: GenuineIntel\ncpu family\t: 6\n"
+        "model name\t: Intel(R) Xeon(R) Stand-in CPU @ 2.40GHz\ncpu MHz\t\t: 2400.000\n"
+        "cache size\t: 33792 KB\nflags\t\t: fpu vme de pse tsc msr pae mce cx8 apic sep\n\n"
+    )
+    return "".join(block.format(index=index) for index in range(processors))
+
+def ps_aux(count: int = 300) -> str:
+    rng = random.Random(count)
+    lines = ["USER         PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND"]
+    for pid in range(1, count + 1):
+        user = rng.choice(["root", "www-data", "postgres", "bench"])
+        command = rng.choice(["/usr/sbin/sshd -D", "nginx: worker process", "postgres: writer", "python3 app.py", "[kworker/0:1]"])
+        lines.append(
+            f"{user:<10} {pid:>6} {rng.uniform(0, 50):4.1f} {rng.uniform(0, 10):4.1f} "
+            f"{rng.randint(1000, 900000):>6} {rng.randint(100, 90000):>5} ?        Ss   10:00   0:01 {command}"
+        )
+    return "\n".join(lines) + "\n"
+
+def ss_listen(count: int = 40) -> str:
+    lines = []
+    for index in range(count):
+        protocol = "tcp" if index % 3 else "udp"
+        state = "LISTEN" if protocol == "tcp" else "UNCONN"
+        lines.append(
+            f"{protocol}   {state} 0      128          0.0.0.0:{8000 + index}      0.0.0.0:*    "
+            f'users:(("service{index}",pid={1000 + index},fd=3))'
+        )
+    return "\n".join(lines) + "\n"
+
+def flood(lines: int) -> str:
+    """ANSI-heavy output like a colourised build log, the worst case for output cleaning."""
+    colors = ["31", "32", "33", "34", "35", "36", "1;31", "1;32"]
+    return "".join(
+        f"\x1b[{colors[index % len(colors)]}m[{index:06d}]\x1b[0m \x1b[1mcompiling\x1b[0m "
+        f"module_{index % 97}.c \x1b[2K\x1b[?25l{'=' * (index % 40)}>\x1b[?25h \x1b[38;5;{index % 256}mok\x1b[0m\n"
+        for index in range(lines)
+    )
+
+RESPONSES = [
+    (re.compile(r"^cat /proc/cpuinfo"), lambda match: cpuinfo()),
+    (re.compile(r"^cat /proc/uptime"), lambda match: "123456.78 987654.32\n"),
+    (re.compile(r"^cat /proc/sys/kernel/random/boot_id"), lambda match: "6f1c7c3e-8d2a-4f7e-9b1a-0c4d2e5f6a7b\n"),
+    (re.compile(r"^cat /proc/loadavg"), lambda match: "0.42 0.37 0.31 2/512 12345\n"),
+    (re.compile(r"^vmstat"), lambda match: (
+        "procs -----------memory---------- ---swap-- -----io---- -system-- ------cpu-----\n"
+        " r  b   swpd   free   buff  cache   si   so    bi    bo   in   cs us sy id wa st\n"
+        " 1  0      0 812344 102400 2048000    0    0     3     9  120  240 10  2 88  0  0\n"
+    )),
+    (re.compile(r"^df"), lambda match: (
+        "Filesystem      Size  Used Avail Use% Mounted on\n"
+        "/dev/nvme0n1p2  468G  201G  244G  46% /\n"
+        "tmpfs           7.8G  1.2M  7.8G   1% /run\n"
+    )),
+    (re.compile(r"^uname"), lambda match: "Linux standin 6.1.0-18-amd64 #1 SMP PREEMPT_DYNAMIC Debian 6.1.76-1 x86_64 GNU/Linux\n"),
+    (re.compile(r"^free"), lambda match: "Mem:       16303428     5123456     8123456      123456     3056516    10800000\n"),
+    (re.compile(r"^sar "), lambda match: "1536.5\n"),
+    (re.compile(r"^ps aux"), lambda match: ps_aux()),
+    (re.compile(r"ss -tulnp"), lambda match: ss_listen()),
+    (re.compile(r"^who$"), lambda match: "bench    pts/0        2024-01-01 10:00 (10.0.0.2)\nroot     tty1         2024-01-01 09:00\n"),
+    (re.compile(r"^w$"), lambda match: (
+        " 10:00:00 up 1 day,  10:17,  2 users,  load average: 0.42, 0.37, 0.31\n"
+        "USER     TTY      FROM             LOGIN@   IDLE   JCPU   PCPU WHAT\n"
+        "bench    pts/0    10.0.0.2         10:00    1.00s  0.01s  0.00s w\n"
+    )),
+    (re.compile(r"^(ip addr|ifconfig)"), lambda match: "10.0.0.5/24 eth0\n172.17.0.1/16 docker0\n"),
+    (re.compile(r"^(curl|wget)"), lambda match: "203.0.113.7\n"),
+    (re.compile(r"^flood (\d+)$"), lambda match: flood(int(match.group(1)))),
+    (re.compile(r"^echo (.*)$"), lambda match: re.sub(r"['\"]", "", match.group(1)) + "\n"),
+    (re.compile(r"^(export|set|stty|true)\b"), lambda match: ""),
+]
+
+def respond(command: str):
+    """Return (output, exit_status) for a command."""
+    command = command.strip()
+    for pattern, handler in RESPONSES:
+        match = pattern.search(command)
+        if match:
+            return handler(match), 0
+    return f"sh: 1: {command.split()[0] if command else ''}: not found\n", 127
+
+class StandInInterface(paramiko.ServerInterface):
+    """Accepts any credentials and hands every session channel to a worker thread."""
+
+    def __init__(self, server: "StandInServer"):
+        self.server = server
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_window_change_request(self, channel, width, height, pixelwidth, pixelheight):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        threading.Thread(target=self.server.run_shell, args=(channel,), daemon=True).start()
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.server.run_exec, args=(channel, command.decode("utf-8", "ignore")), daemon=True).start()
+        return True
+
+class StandInHandle(paramiko.SFTPHandle):
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+class StandInSFTP(paramiko.SFTPServerInterface):
+    """Serves a local directory as the whole remote filesystem, for the transfer benchmarks."""
+
+    def __init__(self, interface: StandInInterface, *args, **kwargs):
+        super().__init__(interface, *args, **kwargs)
+        self.root = interface.server.root
+
+    def local(self, path: str) -> str:
+        path = os.path.normpath("/" + path).lstrip("/")
+        return os.path.join(self.root, path)
+
+    def call(self, function, *args):
+        try:
+            function(*args)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def canonicalize(self, path):
+        return os.path.normpath("/" + path)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self.local(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def list_folder(self, path):
+        try:
+            directory = self.local(path)
+            return [
+                paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(directory, name)), name)
+                for name in os.listdir(directory)
+            ]
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def open(self, path, flags, attr):
+        mode = "rb"
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "r+b"
+        try:
+            fd = os.open(self.local(path), flags, 0o644)
+            handle = StandInHandle(flags)
+            handle.filename = self.local(path)
+            file = os.fdopen(fd, mode)
+            handle.readfile = file
+            handle.writefile = file
+            return handle
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def remove(self, path):
+        return self.call(os.remove, self.local(path))
+
+    def rename(self, oldpath, newpath):
+        if os.path.exists(self.local(newpath)):
+            return paramiko.SFTPServer.convert_errno(errno.EEXIST)
+        return self.call(os.rename, self.local(oldpath), self.local(newpath))
+
+    def posix_rename(self, oldpath, newpath):
+        return self.call(os.replace, self.local(oldpath), self.local(newpath))
+
+    def mkdir(self, path, attr):
+        return self.call(os.mkdir, self.local(path))
+
+    def rmdir(self, path):
+        return self.call(os.rmdir, self.local(path))
+
+class ThrottledSocket:
+    """Socket whose sends are paced to a fixed bandwidth, to imitate a slow link."""
+
+    def __init__(self, sock: socket.socket, bytes_per_second: float):
+        self.sock = sock
+        self.bytes_per_second = bytes_per_second
+        self.available_at = time.monotonic()
+
+    def send(self, data) -> int:
+        sent = self.sock.send(data[:16384])
+        now = time.monotonic()
+        self.available_at = max(self.available_at, now) + sent / self.bytes_per_second
+        if self.available_at > now:
+            time.sleep(self.available_at - now)
+        return sent
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+class StandInServer:
+    """Listens on a local port and serves every connection from its own paramiko transport."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, root: str = None, bandwidth_kbps: float = 0):
+        # RSA for the legacy profile's ssh-rsa, ECDSA for the modern ones
+        self.host_keys = [paramiko.RSAKey.generate(2048), paramiko.ECDSAKey.generate()]
+        self.bandwidth = bandwidth_kbps * 1024 / 8  # Bytes per second the server sends at most, 0 for unlimited
+        self.owns_root = root is None
+        self.root = root or tempfile.mkdtemp(prefix="standin-")  # What SFTP clients see as /
+        self.latency = latency  # Extra delay before each response, to imitate a distant host
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(512)
+        self.host, self.port = self.sock.getsockname()
+        self.transports = []
+        self.execs = 0  # Exec requests served, so benchmarks can count remote executions
+        self.running = False
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        for transport in self.transports:
+            transport.close()
+        if self.owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(ThrottledSocket(client, self.bandwidth) if self.bandwidth else client)
+            transport.set_log_channel("bench.sshserver")
+            transport.use_compression(True)  # Offered next to none, only used when the client asks for it
+            for host_key in self.host_keys:
+                transport.add_server_key(host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, StandInSFTP)
+            try:
+                transport.start_server(server=StandInInterface(self))
+            except (paramiko.SSHException, EOFError):
+                continue
+            self.transports = [t for t in self.transports if t.is_active()] + [transport]
+
+    def wait_for_request_reply(self):
+        # The request reply is sent by the transport thread right after our callback returns,
+        # give it a moment so output never overtakes it
+        time.sleep(0.001 + self.latency)
+
+    def run_exec(self, channel, command: str):
+        self.execs += 1
+        self.wait_for_request_reply()
+        output, status = respond(command)
+        try:
+            if status:
+                channel.sendall_stderr(output.encode("utf-8"))
+            else:
+                channel.sendall(output.encode("utf-8"))
+            channel.send_exit_status(status)
+        except (OSError, EOFError):
+            pass
+        finally:
+            channel.close()
+
+    def run_shell(self, channel):
+        self.wait_for_request_reply()
+        buffer = b""
+        try:
+            channel.sendall(PROMPT.encode("utf-8"))
+            while True:
+                data = channel.recv(4096)
+                if not data:
+                    break
+                buffer += data
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    for command in line.decode("utf-8", "ignore").replace("\x03", "").split(";"):
+                        if command.strip() == "exit":
+                            channel.send_exit_status(0)
+                            return
+                        if self.latency:
+                            time.sleep(self.latency)
+                        output, _ = respond(command)
+                        channel.sendall(output.replace("\n", "\r\n").encode("utf-8"))
+                    channel.sendall(PROMPT.encode("utf-8"))
+        except (OSError, EOFError):
+            pass
+        finally:
+            channel.close()
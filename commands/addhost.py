@@ -4,15 +4,29 @@ from discord import app_commands
 from typing import Optional
 import tempfile
 import os
-import paramiko
-import io
 import asyncio
 from config import setup_commands
+from utils.lazy import lazy_import
+from utils.repository import HostRepository
+from utils.ssh import connect_client
+
+paramiko = lazy_import("paramiko")
 
 class AddHostCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
         self.timeout = 30  # Default timeout in seconds
+        self.setup_command_timeout = 600  # Per setup command, slow apt mirrors can take a while
+        self.progress_interval = 3  # Seconds between progress embed edits
+        self.output_tail_size = 4000  # Characters of setup output kept on the host row
+        self.setup_jobs = {}  # (user_id, hostname) -> running setup task
+
+    async def cog_load(self):
+        # Setup jobs don't survive a restart, don't leave them looking like they're still running.
+        # Only this process's shards: other shard processes may still be running theirs.
+        shard_ids = getattr(self.bot, "shard_ids", None)
+        await self.hosts.interrupt_setups(list(shard_ids) if shard_ids else None, self.setup_command_timeout + 60)
 
     @app_commands.describe(
         hostname="The hostname of the host",
@@ -20,7 +34,8 @@ class AddHostCommand(commands.Cog):
         username="The username to connect to the host",
         password="The password to connect to the host",
         identification_file="The identification file to connect to the host",
-        port="The port to connect to the host"
+        port="The port to connect to the host",
+        group="Host group used by fleet commands such as /rolling-reboot (optional)"
     )
     @app_commands.command(name="add-host", description="Add a new host")
     async def add_host(
@@ -31,11 +46,11 @@ class AddHostCommand(commands.Cog):
         username: str,
         password: Optional[str] = None,
         identification_file: Optional[discord.Attachment] = None,
-        port: Optional[int] = None
+        port: Optional[int] = None,
+        group: Optional[str] = None
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
         if password is None and identification_file is None:
             await interaction.followup.send("Please provide either a password or an identification file.")
@@ -58,7 +73,7 @@ class AddHostCommand(commands.Cog):
                 await interaction.followup.send(f"Failed to process identification file: {str(e)}")
                 return
 
-        # Test connection before saving
+        # Test connection before saving, the verified client is reused for the setup commands
         try:
             connection_test = await asyncio.wait_for(
                 self.test_connection(ip, username, password, identification_file_content, port),
@@ -74,71 +89,178 @@ class AddHostCommand(commands.Cog):
             await interaction.followup.send(f"Connection test failed with error: {str(e)}")
             return
 
-        # Save host to database
-        async with db.acquire() as conn:
-            try:
-                await conn.execute(
-                    """INSERT INTO hosts (user_id, hostname, ip, username, password, identification_file, port)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7)
-                    ON CONFLICT (user_id, hostname) DO UPDATE
-                    SET ip = $3, username = $4, password = $5, identification_file = $6, port = $7""",
-                    user_id, hostname, ip, username, password, identification_file_content, port
-                )
-            except Exception as e:
-                await interaction.followup.send(f"Failed to save host configuration: {str(e)}")
-                return
+        client = connection_test[1]
+
+        key = (user_id, hostname)
+        previous = self.setup_jobs.get(key)
+        if previous is not None:
+            # The host is being re-added, its old setup job would keep overwriting the new one's status
+            previous.cancel()
+            await asyncio.wait({previous})
 
-        # Run setup commands
+        # Save host to database
         try:
-            await asyncio.wait_for(
-                self.run_commands_on_host(ip, username, password, identification_file_content, port, setup_commands),
-                timeout=self.timeout * 2
-            )
-            await interaction.followup.send(f"Host '{hostname}' added successfully and setup commands executed.")
-        except asyncio.TimeoutError:
-            await interaction.followup.send(f"Setup commands timed out after {self.timeout * 2} seconds. Host was added but might not be properly configured.")
+            shard = interaction.guild.shard_id if interaction.guild else 0
+            await self.hosts.add(user_id, hostname, ip, username, password, identification_file_content, port, group, shard)
         except Exception as e:
-            await interaction.followup.send(f"Host added but setup commands failed: {str(e)}")
+            client.close()
+            await interaction.followup.send(f"Failed to save host configuration: {str(e)}")
+            return
 
-    async def test_connection(self, ip, username, password, identification_file_content, port):
-        """Test SSH connection to the host."""
-        try:
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        if not setup_commands:
+            client.close()
+            await self.set_setup_status(user_id, hostname, "succeeded", "")
+            await interaction.followup.send(f"Host '{hostname}' added successfully.")
+            return
 
-            if identification_file_content:
-                key = paramiko.RSAKey(file_obj=io.StringIO(identification_file_content))
-                client.connect(hostname=ip, port=port, username=username, pkey=key, timeout=10)
-            else:
-                client.connect(hostname=ip, port=port, username=username, password=password, timeout=10)
+        # Run setup commands in the background, the interaction doesn't wait for slow package mirrors
+        message = await interaction.followup.send(embed=self.setup_embed(hostname, setup_commands, {}, "", "running"))
+        task = asyncio.create_task(self.run_setup_job(client, user_id, hostname, setup_commands, message))
+        self.setup_jobs[key] = task
 
-            client.close()
-            return True, "Connection successful"
+        def forget_job(_):
+            # A re-added host may have started a newer job under the same key, leave that one alone
+            if self.setup_jobs.get(key) is task:
+                del self.setup_jobs[key]
+
+        task.add_done_callback(forget_job)
+
+    def connect_client(self, ip, username, password, identification_file_content, port) -> "paramiko.SSHClient":
+        """Open an SSH connection to the host. Blocking, run it in an executor."""
+        return connect_client({
+            "ip": ip,
+            "username": username,
+            "password": password,
+            "identification_file": identification_file_content,
+            "port": port,
+        })
+
+    async def test_connection(self, ip, username, password, identification_file_content, port):
+        """Test SSH connection to the host. On success the connected client is returned in place of the message."""
+        def close_late(future):
+            if not future.cancelled() and future.exception() is None:
+                future.result().close()
+
+        future = self.bot.loop.run_in_executor(
+            None, self.connect_client, ip, username, password, identification_file_content, port
+        )
+        try:
+            client = await asyncio.shield(future)
+            return True, client
+        except asyncio.CancelledError:
+            # The caller's timeout fired, the connect can't be interrupted so close the client once it's done
+            future.add_done_callback(close_late)
+            raise
         except Exception as e:
             return False, str(e)
 
-    async def run_commands_on_host(self, ip, username, password, identification_file_content, port, commands):
-        """Run commands on the given host using SSH."""
+    async def set_setup_status(self, user_id: str, hostname: str, status: str, output: str):
+        """Persist the setup job status and the tail of its output on the host row."""
+        try:
+            await self.hosts.set_setup_status(user_id, hostname, status, output[-self.output_tail_size:])
+        except Exception as e:
+            print(f"Failed to save setup status for {hostname}: {e}")
+
+    def setup_embed(self, hostname: str, commands, results: dict, output_tail: str, status: str) -> discord.Embed:
+        """Build the progress embed for a host's setup job."""
+        colors = {"running": discord.Color.blue(), "succeeded": discord.Color.green(), "failed": discord.Color.orange(),
+                  "superseded": discord.Color.light_grey()}
+        titles = {
+            "running": f"Host '{hostname}' added, running setup commands...",
+            "succeeded": f"Host '{hostname}' added and setup commands executed",
+            "failed": f"Host '{hostname}' added but setup commands failed",
+            "superseded": f"Setup of host '{hostname}' stopped, the host was added again",
+        }
+        icons = {"running": "🔄", "ok": "✅", "failed": "❌", "timeout": "⏱️"}
+        lines = [f"{icons.get(results.get(command), '⏳')} `{command}`" for command in commands]
+        description = "\n".join(lines)
+        if output_tail:
+            description += f"\n\n**Output:**\n```{output_tail[-1500:]}```"
+        embed = discord.Embed(title=titles[status], description=description, color=colors[status])
+        if status == "failed":
+            embed.set_footer(text="The host was saved but might not be properly configured.")
+        return embed
+
+    async def run_command(self, client, command: str, on_output) -> int:
+        """Run a single command on an open client, streaming output to on_output. Returns the exit status."""
+        channel = client.get_transport().open_session()
+        channel.exec_command(command)
+        started = asyncio.get_event_loop().time()
         try:
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            while True:
+                if channel.recv_ready():
+                    on_output(channel.recv(4096).decode('utf-8', errors='ignore'))
+                elif channel.recv_stderr_ready():
+                    on_output(channel.recv_stderr(4096).decode('utf-8', errors='ignore'))
+                elif channel.exit_status_ready():
+                    return channel.recv_exit_status()
+                else:
+                    if asyncio.get_event_loop().time() - started > self.setup_command_timeout:
+                        raise asyncio.TimeoutError()
+                    await asyncio.sleep(0.1)
+        finally:
+            channel.close()
 
-            if identification_file_content:
-                key = paramiko.RSAKey(file_obj=io.StringIO(identification_file_content))
-                client.connect(hostname=ip, port=port, username=username, pkey=key, timeout=10)
-            else:
-                client.connect(hostname=ip, port=port, username=username, password=password, timeout=10)
+    async def run_setup_job(self, client, user_id: str, hostname: str, commands, message: discord.Message):
+        """Run the setup commands over the already verified connection as a background job."""
+        results = {}
+        output = []
+        last_update = 0
+        status = "succeeded"
 
+        def on_output(text):
+            output.append(text)
+            if len(output) > 200:
+                output[:] = [''.join(output)[-self.output_tail_size:]]
+
+        async def show_progress(current_status):
+            try:
+                await message.edit(embed=self.setup_embed(hostname, commands, results, ''.join(output), current_status))
+            except discord.errors.HTTPException as e:
+                print(f"Failed to update setup progress for {hostname}: {e}")
+
+        run = None
+        try:
+            await self.set_setup_status(user_id, hostname, "running", "")
             for command in commands:
-                stdin, stdout, stderr = client.exec_command(command, timeout=30)
-                output = stdout.read().decode('utf-8')
-                error = stderr.read().decode('utf-8')
-                if error:
-                    print(f"Warning while executing {command}: {error}")
+                results[command] = "running"
+                output.append(f"$ {command}\n")
+                await show_progress("running")
 
-            client.close()
+                run = asyncio.create_task(self.run_command(client, command, on_output))
+                while not run.done():
+                    await asyncio.wait({run}, timeout=self.progress_interval)
+                    now = asyncio.get_event_loop().time()
+                    if not run.done() and now - last_update >= self.progress_interval:
+                        last_update = now
+                        await show_progress("running")
+
+                try:
+                    exit_status = run.result()
+                    results[command] = "ok" if exit_status == 0 else "failed"
+                    if exit_status != 0:
+                        print(f"Warning while executing {command}: exit status {exit_status}")
+                except asyncio.TimeoutError:
+                    results[command] = "timeout"
+                    output.append(f"Timed out after {self.setup_command_timeout} seconds\n")
+
+                if results[command] != "ok":
+                    status = "failed"
+                await self.set_setup_status(user_id, hostname, "running", ''.join(output))
+        except asyncio.CancelledError:
+            # Superseded by a re-add of the host, whose job owns the status now
+            if run is not None:
+                run.cancel()
+            await show_progress("superseded")
+            raise
         except Exception as e:
-            raise Exception(f"Failed to execute commands: {str(e)}")
+            status = "failed"
+            output.append(f"Failed to execute commands: {str(e)}\n")
+        finally:
+            client.close()
+
+        await self.set_setup_status(user_id, hostname, status, ''.join(output))
+        await show_progress(status)
 
 async def setup(bot):
     await bot.add_cog(AddHostCommand(bot))
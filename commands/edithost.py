@@ -5,10 +5,13 @@ from typing import Optional
 import tempfile
 import os
 from typing import List
+from utils.repository import HostRepository
+from utils.ssh import PROFILES, validate_algorithms
 
 class EditHostCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     @app_commands.describe(
         hostname="The current hostname of the host to edit",
@@ -17,8 +20,19 @@ class EditHostCommand(commands.Cog):
         username="New username to set (optional)",
         password="New password (optional)",
         identification_file="New identification file to upload (optional)",
-        port="New port number (optional)"
+        port="New port number (optional)",
+        reboot_poll_interval="Initial delay in seconds between reachability probes after a reboot (optional)",
+        reboot_timeout="How long in seconds to wait for the host to come back after a reboot (optional)",
+        group="New host group (optional)",
+        ssh_profile="Connection profile the settings below start from (optional)",
+        compression="Compress the SSH connection, helps on slow links (optional)",
+        ciphers="Comma separated ciphers in order of preference, 'default' uses the profile's (optional)",
+        kex="Comma separated key exchange algorithms in order of preference, 'default' uses the profile's (optional)",
+        host_key_algorithms="Comma separated host key algorithms in order of preference, 'default' uses the profile's (optional)",
+        connect_timeout="Seconds to wait for the TCP connection, 0 uses the profile's (optional)",
+        banner_timeout="Seconds to wait for the SSH banner, 0 uses the profile's (optional)"
     )
+    @app_commands.choices(ssh_profile=[app_commands.Choice(name=name, value=name) for name in PROFILES])
     @app_commands.command(name="edit-host", description="Edit an existing host")
     async def edit_host(
         self,
@@ -29,73 +43,77 @@ class EditHostCommand(commands.Cog):
         username: Optional[str] = None,
         password: Optional[str] = None,
         identification_file: Optional[discord.Attachment] = None,
-        port: Optional[int] = None
+        port: Optional[int] = None,
+        reboot_poll_interval: Optional[float] = None,
+        reboot_timeout: Optional[int] = None,
+        group: Optional[str] = None,
+        ssh_profile: Optional[str] = None,
+        compression: Optional[bool] = None,
+        ciphers: Optional[str] = None,
+        kex: Optional[str] = None,
+        host_key_algorithms: Optional[str] = None,
+        connect_timeout: Optional[app_commands.Range[float, 0, 300]] = None,
+        banner_timeout: Optional[app_commands.Range[float, 0, 300]] = None
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
-        async with db.acquire() as conn:
-            host = await conn.fetchrow(
-                """SELECT * FROM hosts WHERE user_id = $1 AND hostname = $2""",
-                user_id, hostname
-            )
-            if not host:
-                await interaction.followup.send(f"No host found with the name '{hostname}'.")
-                return
+        identification_file_content = None
+        if identification_file:
+            temp_file_path = os.path.join(tempfile.gettempdir(), identification_file.filename)
+            await identification_file.save(temp_file_path)
+            with open(temp_file_path, "rb") as f:
+                identification_file_content = f.read().decode('utf-8')
+            os.remove(temp_file_path)
 
-            identification_file_content = None
-            if identification_file:
-                temp_file_path = os.path.join(tempfile.gettempdir(), identification_file.filename)
-                await identification_file.save(temp_file_path)
-                with open(temp_file_path, "rb") as f:
-                    identification_file_content = f.read().decode('utf-8')
-                os.remove(temp_file_path)
+        updates = {
+            "hostname_edit": hostname_edit,
+            "ip": ip,
+            "username": username,
+            "password": password,
+            "identification_file": identification_file_content,
+            "port": port,
+            "reboot_poll_interval": reboot_poll_interval,
+            "reboot_timeout": reboot_timeout,
+            "group": group,
+        }
+        updates = {field: value for field, value in updates.items() if value}
 
-            update_fields = []
-            update_values = [user_id, hostname] 
-            placeholder_index = 3 
+        # Unlike the fields above these can be set to false, zero or back to the profile's value
+        algorithms = {"ciphers": ciphers, "kex": kex, "host_key_algorithms": host_key_algorithms}
+        for setting, value in algorithms.items():
+            if value is None:
+                continue
+            if value.strip().lower() == "default":
+                updates[f"ssh_{setting}"] = ""
+                continue
+            error = validate_algorithms(setting, value)
+            if error:
+                await interaction.followup.send(error[:1900])
+                return
+            updates[f"ssh_{setting}"] = value.replace(" ", "")
+        ssh_updates = {
+            "ssh_profile": ssh_profile,
+            "ssh_compression": compression,
+            "ssh_connect_timeout": connect_timeout,
+            "ssh_banner_timeout": banner_timeout,
+        }
+        updates.update({field: value for field, value in ssh_updates.items() if value is not None})
 
-            if hostname_edit:
-                update_fields.append(f"hostname = ${placeholder_index}")
-                update_values.append(hostname_edit)
-                placeholder_index += 1
-            if ip:
-                update_fields.append(f"ip = ${placeholder_index}")
-                update_values.append(ip)
-                placeholder_index += 1
-            if username:
-                update_fields.append(f"username = ${placeholder_index}")
-                update_values.append(username)
-                placeholder_index += 1
-            if password:
-                update_fields.append(f"password = ${placeholder_index}")
-                update_values.append(password)
-                placeholder_index += 1
-            if identification_file_content:
-                update_fields.append(f"identification_file = ${placeholder_index}")
-                update_values.append(identification_file_content)
-                placeholder_index += 1
-            if port:
-                update_fields.append(f"port = ${placeholder_index}")
-                update_values.append(port)
-                placeholder_index += 1
+        if not updates:
+            await interaction.followup.send("No updates provided.")
+            return
 
-            if not update_fields:
-                await interaction.followup.send("No updates provided.")
-                return
+        try:
+            updated = await self.hosts.update(user_id, hostname, **updates)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while editing host '{hostname}'. Please try again later.")
+            return
 
-            try:
-                await conn.execute(
-                    f"""UPDATE hosts
-                        SET {', '.join(update_fields)}
-                        WHERE user_id = $1 AND hostname = $2""",
-                    *update_values
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while editing host '{hostname}'. Please try again later.")
-                return
+        if not updated:
+            await interaction.followup.send(f"No host found with the name '{hostname}'.")
+            return
 
         await interaction.followup.send(f"Host '{hostname}' updated successfully.")
     
@@ -105,23 +123,13 @@ class EditHostCommand(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(EditHostCommand(bot))
@@ -2,12 +2,17 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from collections import deque
-import paramiko
-import os
+import codecs
 import re
 import asyncio
-from typing import List, Optional
-import io
+import time
+from typing import Dict, List, Optional
+from config import COMMAND_CACHE_ENABLED
+from utils.cache import ResultCache, cache_ttl, host_key, normalize_command
+from utils.output import OutputSpool, deliver_output, upload_limit
+from utils.tracing import span
+from utils.repository import HostRepository
+from utils.ssh import connect_client
 
 class CommandInputModal(discord.ui.Modal):
     def __init__(self, channel) -> None:
@@ -30,18 +35,67 @@ class CommandInputModal(discord.ui.Modal):
         else:
             await interaction.response.send_message("No input provided. Please try again.", ephemeral=True)
 
+EXECUTE_MODES = ["shell", "exec"]
+
+class StreamTail:
+    """One output stream of an exec channel: everything goes to its spool, the last lines are kept for the embed."""
+
+    def __init__(self, spool: OutputSpool, max_lines: int, max_width: int = 300):
+        self.spool = spool
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.lines = deque(maxlen=max_lines)
+        self.max_width = max_width
+        self.partial = ""
+        self.truncated = False  # Some output isn't shown in the embed
+
+    def feed(self, data: bytes, final: bool = False):
+        text = self.decoder.decode(data, final)
+        if not text:
+            return
+        self.spool.append(text)
+        *complete, self.partial = (self.partial + text).split("\n")
+        if len(self.partial) > self.max_width * 4:
+            # Output without newlines, show it as a line rather than buffering it forever
+            complete.append(self.partial)
+            self.partial = ""
+        for line in complete:
+            if len(self.lines) == self.lines.maxlen or len(line) > self.max_width:
+                self.truncated = True
+            self.lines.append(line[:self.max_width])
+
+    def text(self, max_chars: int) -> str:
+        lines = list(self.lines) + ([self.partial[:self.max_width]] if self.partial else [])
+        text = "\n".join(lines)
+        if len(text) > max_chars:
+            self.truncated = True
+            text = text[-max_chars:]
+        return text
+
+async def deliver_streams(send, guild: Optional[discord.Guild], user_id: str, output: OutputSpool, error_output: Optional[OutputSpool], text: str):
+    await deliver_output(send, output, user_id, upload_limit(guild), text)
+    if error_output is not None:
+        if error_output.size:
+            await deliver_output(send, error_output, user_id, upload_limit(guild), "Standard error:", filename="command_stderr.txt")
+        else:
+            error_output.close()
+
 class CommandControls(discord.ui.View):
-    def __init__(self, channel, complete_output):
+    def __init__(self, channel, complete_output: OutputSpool, user_id: str, error_output: Optional[OutputSpool] = None):
         super().__init__(timeout=None)
         self.channel = channel
         self.is_running = True
         self.complete_output = complete_output
+        self.error_output = error_output  # stderr, only kept apart in exec mode
+        self.user_id = user_id
         self.last_activity = asyncio.get_event_loop().time()
 
     @discord.ui.button(label="Ctrl + C", style=discord.ButtonStyle.danger)
     async def stop_execution(self, interaction: discord.Interaction, button: discord.ui.Button):
         if self.is_running:
-            self.channel.send("\x03")  # Send Ctrl+C signal
+            if self.error_output is None:
+                self.channel.send("\x03")  # Send Ctrl+C signal
+            else:
+                self.channel.close()  # No terminal to interrupt, closing the channel hangs up on the command
             self.is_running = False
             await self.cleanup(interaction)
         else:
@@ -68,17 +122,15 @@ class CommandControls(discord.ui.View):
         for child in self.children:
             child.disabled = True
         
+        # Packaging a large output can take longer than Discord waits for a response
+        await interaction.response.defer()
         await interaction.message.edit(view=self)
         
-        output_file = discord.File(
-            io.StringIO(''.join(self.complete_output)),
-            filename="command_output.txt"
-        )
-        
-        await interaction.response.send_message(
-            "Execution finished. Full output attached.",
-            file=output_file
-        )
+        await self.deliver(interaction.followup.send, interaction.guild, "Execution finished. Full output attached.")
+
+    async def deliver(self, send, guild: Optional[discord.Guild], text: str):
+        """Attach the full output, and stderr after it when it was kept apart."""
+        await deliver_streams(send, guild, self.user_id, self.complete_output, self.error_output, text)
 
     def update_activity(self):
         """Update the last activity timestamp"""
@@ -87,7 +139,10 @@ class CommandControls(discord.ui.View):
 class ExecuteCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
         self.active_commands = {}
+        self.cache = ResultCache()
+        self.cached_command_timeout = 60  # Seconds a cacheable command may run, they're all quick reads
 
     def clean_terminal_output(self, text: str) -> str:
         """Clean terminal output of control sequences and format it properly."""
@@ -155,21 +210,22 @@ class ExecuteCommand(commands.Cog):
                 for child in view.children:
                     child.disabled = True
                 
-                output_file = discord.File(
-                    io.StringIO(''.join(view.complete_output)),
-                    filename="command_output.txt"
-                )
-                
                 timeout_embed = discord.Embed(
                     title="Command Timed Out",
                     color=discord.Color.orange(),
                     description="Command terminated due to lack of activity for 120 seconds. Full output attached. Use /execute <command> <hostname> <continuous: True> to stop timeouts!"
                 )
                 await message.edit(embed=timeout_embed, view=view)
-                await message.reply(content="Command terminated due to lack of activity for 120 seconds. Full output attached. Use /execute <command> <hostname> <continuous: True> to stop timeouts!", file=output_file)
+                try:
+                    await view.deliver(
+                        message.reply, message.guild,
+                        "Command terminated due to lack of activity for 120 seconds. Full output attached. Use /execute <command> <hostname> <continuous: True> to stop timeouts!"
+                    )
+                except Exception as e:
+                    print(f"Failed to send command output: {e}")
                 break
 
-    async def read_output(self, channel, output_lines: deque, complete_output: list, message: discord.Message, command: str, hostname: str, view: CommandControls):
+    async def read_output(self, channel, output_lines: deque, complete_output: OutputSpool, message: discord.Message, command: str, hostname: str, view: CommandControls):
         """Continuously read output from the SSH channel"""
         last_update = 0
         update_interval = 1
@@ -220,94 +276,259 @@ class ExecuteCommand(commands.Cog):
 
         await self.update_output_embed(message, command, hostname, output_lines, view, is_final=True)
 
+    def exec_embed(self, command: str, hostname: str, stdout: StreamTail, stderr: StreamTail, exit_status: Optional[int] = None) -> discord.Embed:
+        if exit_status is None:
+            title, color = f"Executing Command on Host '{hostname}'", discord.Color.blue()
+        else:
+            title = f"Completed Command on Host '{hostname}'"
+            color = discord.Color.green() if exit_status == 0 else discord.Color.red()
+
+        # Embed descriptions hold 4096 characters, stderr gets a share only when there is some
+        stderr_text = stderr.text(900)
+        description = f"**Command:**\n```{command[:500]}```\n**Output:**\n```{stdout.text(3300 - len(stderr_text)) or ' '}```"
+        if stderr_text:
+            description += f"\n**Stderr:**\n```{stderr_text}```"
+        embed = discord.Embed(title=title, color=color, description=description)
+
+        if exit_status is not None:
+            status = "no exit status, killed by a signal?" if exit_status == -1 else f"exit status {exit_status}"
+            footer = f"{status} • {stdout.spool.size:,} bytes of output, {stderr.spool.size:,} of stderr"
+            if stdout.truncated or stderr.truncated:
+                footer += " • Full output attached"
+            embed.set_footer(text=footer)
+        return embed
+
+    async def read_exec_output(self, client, channel, message: discord.Message, command: str, hostname: str, view: CommandControls):
+        """Stream an exec channel until the command exits, keeping stdout and stderr apart.
+
+        There's no terminal, so the output is taken as is: no prompts or banners to strip and no
+        escape sequences to clean.
+        """
+        stdout = StreamTail(view.complete_output, 50)
+        stderr = StreamTail(view.error_output, 15)
+        loop = asyncio.get_running_loop()
+        last_update = 0
+        update_interval = 1
+
+        asyncio.create_task(self.check_timeout(view, message))
+
+        try:
+            while view.is_running:
+                received = False
+                # Drain what's buffered, bounded so a flood can't starve the event loop
+                for _ in range(32):
+                    if not channel.recv_ready():
+                        break
+                    stdout.feed(channel.recv(32768))
+                    received = True
+                for _ in range(32):
+                    if not channel.recv_stderr_ready():
+                        break
+                    stderr.feed(channel.recv_stderr(32768))
+                    received = True
+
+                if received:
+                    view.update_activity()
+                elif channel.exit_status_ready() or channel.closed:
+                    break
+
+                current_time = loop.time()
+                if received and current_time - last_update >= update_interval:
+                    try:
+                        await message.edit(embed=self.exec_embed(command, hostname, stdout, stderr), view=view)
+                    except discord.errors.HTTPException as e:
+                        print(f"Failed to update command output: {e}")
+                    last_update = current_time
+
+                await asyncio.sleep(0 if received else 0.1)
+
+            # Output that arrived together with the exit status
+            while channel.recv_ready():
+                stdout.feed(channel.recv(32768))
+            while channel.recv_stderr_ready():
+                stderr.feed(channel.recv_stderr(32768))
+            exit_status = channel.recv_exit_status() if channel.exit_status_ready() else -1
+        finally:
+            client.close()
+
+        if not view.is_running:
+            return  # A button or the inactivity timeout ended it and delivered the output
+
+        view.is_running = False
+        stdout.feed(b"", final=True)
+        stderr.feed(b"", final=True)
+        for child in view.children:
+            child.disabled = True
+        await message.edit(embed=self.exec_embed(command, hostname, stdout, stderr, exit_status), view=view)
+
+        if stdout.truncated or stderr.truncated:
+            await view.deliver(message.reply, message.guild, f"Exit status {exit_status}. Full output attached.")
+        else:
+            view.complete_output.close()
+            view.error_output.close()
+
+    def run_command(self, host_data, command: str) -> Dict:
+        """Run a command on an exec channel and collect all of its output. Blocking, run it in an executor."""
+        client = connect_client(host_data)
+        try:
+            channel = client.get_transport().open_session()
+            channel.exec_command(command)
+            stdout, stderr = bytearray(), bytearray()
+            deadline = time.monotonic() + self.cached_command_timeout
+            # Both streams are drained as they arrive, a full stderr buffer would stall stdout otherwise
+            while not (channel.exit_status_ready() and not channel.recv_ready() and not channel.recv_stderr_ready()):
+                if channel.recv_ready():
+                    stdout += channel.recv(32768)
+                elif channel.recv_stderr_ready():
+                    stderr += channel.recv_stderr(32768)
+                elif channel.closed:
+                    break
+                elif time.monotonic() > deadline:
+                    raise TimeoutError(f"the command didn't finish within {self.cached_command_timeout} seconds")
+                else:
+                    time.sleep(0.01)
+            exit_status = channel.recv_exit_status() if channel.exit_status_ready() else -1
+        finally:
+            client.close()
+        return {'stdout': bytes(stdout), 'stderr': bytes(stderr), 'exit_status': exit_status, 'finished_at': time.time()}
+
+    async def execute_cached(self, interaction: discord.Interaction, host_data, command: str, hostname: str, ttl: float, fresh: bool):
+        """Answer from a recent result when there is one, otherwise run the command once for everyone asking."""
+        loop = asyncio.get_running_loop()
+        key = (host_key(host_data), normalize_command(command))
+        try:
+            with span("ssh.cached_command"):
+                result, source = await self.cache.get(
+                    key, ttl, lambda: loop.run_in_executor(None, self.run_command, host_data, command), bypass=fresh
+                )
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+            return
+
+        stdout = StreamTail(OutputSpool(), 50)
+        stderr = StreamTail(OutputSpool(), 15)
+        stdout.feed(result['stdout'], final=True)
+        stderr.feed(result['stderr'], final=True)
+        embed = self.exec_embed(command, hostname, stdout, stderr, result['exit_status'])
+        if source == "hit":
+            note = f"Cached result from {time.time() - result['finished_at']:.0f}s ago, use fresh to run it again"
+        elif source == "coalesced":
+            note = "Shared with an identical request that was already running"
+        else:
+            note = f"Result kept for {ttl:g}s"
+        embed.set_footer(text=f"{embed.footer.text} • {note}")
+        with span("discord.followup"):
+            await interaction.followup.send(embed=embed)
+
+        if stdout.truncated or stderr.truncated:
+            await deliver_streams(
+                interaction.followup.send, interaction.guild, str(interaction.user.id),
+                stdout.spool, stderr.spool, "Full output attached."
+            )
+        else:
+            stdout.spool.close()
+            stderr.spool.close()
+
     @app_commands.describe(
             command="The command to execute",
             hostname="The hostname of the host to execute the command on",
-            continuous="Whether to run the command in continuous mode won't get automatically stopped after the command is executed"
+            continuous="Whether to run the command in continuous mode won't get automatically stopped after the command is executed",
+            background="Queue the command as a background job instead of streaming it here, see /jobs",
+            mode="shell runs it in an interactive terminal, exec runs it directly and reports stderr and the exit status",
+            fresh="Run the command even if a recent result of it is cached"
     )
+    @app_commands.choices(mode=[app_commands.Choice(name=mode, value=mode) for mode in EXECUTE_MODES])
     @app_commands.command(name="execute", description="Execute a bash command on a selected host")
     async def execute(
         self,
         interaction: discord.Interaction,
         command: str,
         hostname: str,
-        continuous: Optional[bool] = False
+        continuous: Optional[bool] = False,
+        background: Optional[bool] = False,
+        mode: Optional[str] = None,
+        fresh: Optional[bool] = False
     ):
-        await interaction.response.defer()
+        with span("discord.defer"):
+            await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
         self.continuous = continuous
-
-        async with db.acquire() as conn:
+        # Allowlisted read-only commands don't need a terminal, so they run in exec mode unless asked otherwise
+        ttl = cache_ttl(command) if COMMAND_CACHE_ENABLED and not continuous else None
+        if mode is None:
+            mode = "exec" if ttl is not None else "shell"
+
+        if background:
+            jobs = self.bot.get_cog("jobs")
+            if jobs is None:
+                await interaction.followup.send("Background jobs are not available.")
+                return
             try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
+                job_id = await jobs.enqueue(user_id, hostname, command, interaction.channel_id)
             except Exception as e:
                 print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while executing command on host '{hostname}'. Please try again later.")
+                await interaction.followup.send(f"An error occurred while queueing the command for host '{hostname}'. Please try again later.")
                 return
+            await interaction.followup.send(
+                f"Queued job #{job_id} on host '{hostname}'. Use `/jobs tail {job_id}` to follow its output."
+            )
+            return
 
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
+        try:
+            with span("db.host_lookup"):
+                host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while executing command on host '{hostname}'. Please try again later.")
+            return
 
-            ip, username, password, identification_file, port = host_data
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
 
-            temp_file_path = f"temp.pem"
-            if identification_file:
-                with open(temp_file_path, "w") as temp_file:
-                    temp_file.write(identification_file)
+        if mode == "exec" and ttl is not None:
+            await self.execute_cached(interaction, host_data, command, hostname, ttl, fresh)
+            return
 
-            try:
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
+        try:
+            with span("ssh.connect", ip=host_data['ip']):
+                client = await asyncio.get_running_loop().run_in_executor(None, connect_client, host_data)
+
+            if mode == "exec":
+                with span("ssh.open_exec"):
+                    channel = client.get_transport().open_session()
+                    channel.exec_command(command)
+            else:
+                with span("ssh.open_shell"):
+                    channel = client.get_transport().open_session()
+                    channel.get_pty()
+                    channel.invoke_shell()
 
-                channel = client.get_transport().open_session()
-                channel.get_pty()
-                channel.invoke_shell()
-                
                 channel.send(f"{command}\n")
                 
-                output_lines = deque(maxlen=50)
-                complete_output = []
-                view = CommandControls(channel, complete_output)
+            output_lines = deque(maxlen=50)
+            complete_output = OutputSpool()
+            view = CommandControls(channel, complete_output, user_id, OutputSpool() if mode == "exec" else None)
                 
-                initial_embed = discord.Embed(
-                    title=f"Executing Command on Host '{hostname}'",
-                    color=discord.Color.blue(),
-                    description=f"**Command:**\n```{command}```\n**Live Output:**\n```Initializing...```"
-                )
+            initial_embed = discord.Embed(
+                title=f"Executing Command on Host '{hostname}'",
+                color=discord.Color.blue(),
+                description=f"**Command:**\n```{command}```\n**Live Output:**\n```Initializing...```"
+            )
+            with span("discord.followup"):
                 message = await interaction.followup.send(embed=initial_embed, view=view)
                 
+            if mode == "exec":
+                asyncio.create_task(self.read_exec_output(client, channel, message, command, hostname, view))
+            else:
                 asyncio.create_task(self.read_output(
                     channel, output_lines, complete_output, message, command, hostname, view
                 ))
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-                if 'client' in locals():
-                    client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+            if 'client' in locals():
+                client.close()
 
     @execute.autocomplete("hostname")
     async def host_autocomplete(
@@ -315,23 +536,13 @@ class ExecuteCommand(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(ExecuteCommand(bot))
\ No newline at end of file
@@ -0,0 +1,280 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import List, Optional
+import asyncio
+import gzip
+import hashlib
+import os
+import posixpath
+import shlex
+import stat
+import tempfile
+import time
+import aiohttp
+from config import SFTP_CHUNK_SIZE, SFTP_MAX_REQUESTS, TRANSFER_MAX_PARTS
+from utils.output import PartWriter, TransferTooLarge, format_size, upload_limit
+from utils.repository import HostRepository
+from utils.ssh import connect_client
+
+COMPRESS_OPTIONS = ["auto", "always", "never"]
+
+def remote_path_of(path: str) -> str:
+    """SFTP paths are relative to the login directory, so drop a leading ~/ rather than expanding it."""
+    if path == "~":
+        return "."
+    if path.startswith("~/"):
+        return path[2:] or "."
+    return path
+
+class FilesCommand(commands.GroupCog, name="file"):
+    def __init__(self, bot):
+        self.bot = bot
+        self.hosts = HostRepository(bot.db)
+        self.upload_buffer = SFTP_CHUNK_SIZE * 8  # Bytes read from Discord per executor hop when uploading
+
+    def download_to_parts(self, client, remote_path: str, directory: str, part_size: int, compress: str):
+        """Stream a remote file into part files, hashing it on the way. Blocking, run it in an executor.
+
+        Reads are pipelined one window of SFTP_MAX_REQUESTS chunks at a time and the next window is
+        only requested once this one is written. prefetch alone only caps the requests in flight,
+        so a slow disk or gzip would let paramiko buffer the whole file.
+        """
+        sftp = client.open_sftp()
+        try:
+            attributes = sftp.stat(remote_path)
+            if not stat.S_ISREG(attributes.st_mode):
+                raise IsADirectoryError(f"'{remote_path}' is not a regular file")
+            size = attributes.st_size
+            compressed = compress == "always" or (compress == "auto" and size > part_size)
+            filename = posixpath.basename(remote_path.rstrip("/")) or "download"
+
+            writer = PartWriter(directory, filename + (".gz" if compressed else ""), part_size, TRANSFER_MAX_PARTS)
+            if not compressed and size > part_size * TRANSFER_MAX_PARTS:
+                raise TransferTooLarge(f"needs more than {TRANSFER_MAX_PARTS} parts of {format_size(part_size)}")
+            sink = gzip.GzipFile(filename=filename, mode="wb", fileobj=writer, compresslevel=6) if compressed else writer
+
+            digest = hashlib.sha256()
+            try:
+                with sftp.open(remote_path, "rb") as remote:
+                    window = SFTP_CHUNK_SIZE * SFTP_MAX_REQUESTS
+                    offset = 0
+                    while offset < size:
+                        end = min(offset + window, size)
+                        chunks = [(start, min(SFTP_CHUNK_SIZE, end - start)) for start in range(offset, end, SFTP_CHUNK_SIZE)]
+                        for chunk in remote.readv(chunks, max_concurrent_prefetch_requests=SFTP_MAX_REQUESTS):
+                            if not chunk:
+                                raise EOFError(f"'{remote_path}' shrank while it was being downloaded")
+                            digest.update(chunk)
+                            sink.write(chunk)
+                            offset += len(chunk)
+                if compressed:
+                    sink.close()
+            except Exception:
+                if writer.current is not None:
+                    writer.current.close()
+                raise
+            return size, digest.hexdigest(), writer.close(), compressed
+        finally:
+            sftp.close()
+
+    def remove_quietly(self, sftp, path: str):
+        """Remove a leftover file, it may never have been created or the connection may be gone."""
+        try:
+            sftp.remove(path)
+        except Exception:
+            pass
+
+    def remote_checksum(self, client, remote_path: str) -> Optional[str]:
+        """sha256sum of the file as the host sees it, None if the host can't tell us."""
+        stdin, stdout, stderr = client.exec_command(f"sha256sum -- {shlex.quote(remote_path)}", timeout=300)
+        output = stdout.read().decode("utf-8", "ignore").split()
+        return output[0] if stdout.channel.recv_exit_status() == 0 and output else None
+
+    @app_commands.describe(
+        hostname="The host to upload the file to",
+        file="The file to upload",
+        remote_path="Where to put it. A directory (ending in /) keeps the attachment's name",
+        overwrite="Replace the file if it already exists",
+        verify="Compare the checksum the host computes with the one of the uploaded data"
+    )
+    @app_commands.command(name="upload", description="Upload an attachment to a host over SFTP")
+    async def upload(
+        self,
+        interaction: discord.Interaction,
+        hostname: str,
+        file: discord.Attachment,
+        remote_path: str = "./",
+        overwrite: Optional[bool] = False,
+        verify: Optional[bool] = False
+    ):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while uploading to host '{hostname}'. Please try again later.")
+            return
+
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
+
+        loop = asyncio.get_running_loop()
+        client = None
+        sftp = None
+        started = time.perf_counter()
+        try:
+            client = await loop.run_in_executor(None, connect_client, host_data)
+            sftp = await loop.run_in_executor(None, client.open_sftp)
+
+            target = remote_path_of(remote_path)
+            try:
+                attributes = await loop.run_in_executor(None, sftp.stat, target)
+            except FileNotFoundError:
+                attributes = None
+            if target.endswith("/") or (attributes is not None and stat.S_ISDIR(attributes.st_mode)):
+                target = posixpath.join(target, file.filename)
+                try:
+                    attributes = await loop.run_in_executor(None, sftp.stat, target)
+                except FileNotFoundError:
+                    attributes = None
+            if attributes is not None and not overwrite:
+                await interaction.followup.send(f"'{target}' already exists on '{hostname}'. Use `overwrite` to replace it.")
+                return
+
+            # Write next to the target and rename at the end, so a failed upload never leaves a truncated file
+            partial = f"{target}.termicord-partial"
+            digest = hashlib.sha256()
+            try:
+                remote = await loop.run_in_executor(None, sftp.open, partial, "wb")
+                try:
+                    # Pipelined writes don't wait for the server to acknowledge each one
+                    remote.set_pipelined(True)
+                    async with aiohttp.ClientSession() as session:
+                        async with session.get(file.url) as response:
+                            response.raise_for_status()
+                            async for chunk in response.content.iter_chunked(self.upload_buffer):
+                                digest.update(chunk)
+                                await loop.run_in_executor(None, remote.write, chunk)
+                finally:
+                    await loop.run_in_executor(None, remote.close)
+                await loop.run_in_executor(None, sftp.posix_rename, partial, target)
+            except Exception:
+                await loop.run_in_executor(None, self.remove_quietly, sftp, partial)
+                raise
+            elapsed = time.perf_counter() - started
+
+            checksum = digest.hexdigest()
+            lines = [
+                f"Uploaded `{file.filename}` to `{target}` on '{hostname}'.",
+                f"{format_size(file.size)} in {elapsed:.1f}s ({format_size(file.size / max(elapsed, 0.001))}/s)",
+                f"sha256 `{checksum}`",
+            ]
+            if verify:
+                remote_checksum = await loop.run_in_executor(None, self.remote_checksum, client, target)
+                if remote_checksum is None:
+                    lines.append("⚠️ Couldn't verify, `sha256sum` failed on the host.")
+                elif remote_checksum == checksum:
+                    lines.append("✅ Checksum verified on the host.")
+                else:
+                    lines.append(f"❌ Checksum mismatch, the host has `{remote_checksum}`.")
+            await interaction.followup.send("\n".join(lines))
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"Upload to host '{hostname}' failed: {e}")
+        finally:
+            if sftp is not None:
+                sftp.close()
+            if client is not None:
+                client.close()
+
+    @app_commands.describe(
+        hostname="The host to download the file from",
+        remote_path="The file to download",
+        compress="gzip the file: auto does it only when it's over the upload limit"
+    )
+    @app_commands.choices(compress=[app_commands.Choice(name=option, value=option) for option in COMPRESS_OPTIONS])
+    @app_commands.command(name="download", description="Download a file from a host over SFTP")
+    async def download(
+        self,
+        interaction: discord.Interaction,
+        hostname: str,
+        remote_path: str,
+        compress: str = "auto"
+    ):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while downloading from host '{hostname}'. Please try again later.")
+            return
+
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
+
+        loop = asyncio.get_running_loop()
+        client = None
+        part_size = upload_limit(interaction.guild)
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="termicord-") as directory:
+            try:
+                client = await loop.run_in_executor(None, connect_client, host_data)
+                size, checksum, paths, compressed = await loop.run_in_executor(
+                    None, self.download_to_parts, client, remote_path_of(remote_path), directory, part_size, compress
+                )
+            except FileNotFoundError:
+                await interaction.followup.send(f"'{remote_path}' doesn't exist on '{hostname}'.")
+                return
+            except (TransferTooLarge, IsADirectoryError) as e:
+                await interaction.followup.send(f"Can't send '{remote_path}': {e}.")
+                return
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                await interaction.followup.send(f"Download from host '{hostname}' failed: {e}")
+                return
+            finally:
+                if client is not None:
+                    client.close()
+            elapsed = time.perf_counter() - started
+
+            lines = [
+                f"Downloaded `{remote_path}` from '{hostname}'.",
+                f"{format_size(size)} in {elapsed:.1f}s ({format_size(size / max(elapsed, 0.001))}/s)",
+                f"sha256 `{checksum}`",
+            ]
+            if compressed:
+                packed = sum(os.path.getsize(path) for path in paths)
+                lines.append(f"gzip compressed to {format_size(packed)}.")
+            if len(paths) > 1:
+                name = posixpath.basename(paths[0]).rsplit(".part", 1)[0]
+                lines.append(f"Split into {len(paths)} parts, join them with `cat {name}.part* > {name}`.")
+
+            # One part per message, each stays under the upload limit on its own
+            await interaction.followup.send("\n".join(lines), file=discord.File(paths[0]))
+            for path in paths[1:]:
+                await interaction.followup.send(file=discord.File(path))
+
+    @upload.autocomplete("hostname")
+    @download.autocomplete("hostname")
+    async def host_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
+
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
+
+async def setup(bot):
+    await bot.add_cog(FilesCommand(bot))
@@ -0,0 +1,254 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import Dict, List, Optional
+import asyncio
+import io
+import re
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import GREP_CONCURRENCY, GREP_MAX_MATCHES, GREP_MAX_LINE, GREP_TIMEOUT
+from utils.repository import HostRepository
+from utils.ssh import connect_client
+
+COUNT_MARKER = "__termicord_grep_count__ "
+
+def quote_paths(paths: str) -> str:
+    """Escape whitespace separated paths for the remote shell, leaving ~ and glob characters to expand there."""
+    return " ".join(re.sub(r"([^\w*?\[\]/.~,+=:@%-])", r"\\\1", path) for path in paths.split())
+
+class GrepResultsView(discord.ui.View):
+    """Drill-down into one host's matches, or download all of them."""
+
+    def __init__(self, results: Dict[str, Dict], pattern: str):
+        super().__init__(timeout=900)
+        self.results = results
+        self.pattern = pattern
+        matched = sorted(
+            (hostname for hostname, result in results.items() if result['lines']),
+            key=lambda hostname: -results[hostname]['count']
+        )
+        if not matched:
+            self.remove_item(self.download_all)
+            return
+
+        # Discord allows 25 options, the download has every host
+        select = discord.ui.Select(
+            placeholder="Show the matches of a host",
+            options=[
+                discord.SelectOption(label=hostname[:100], value=hostname, description=f"{results[hostname]['count']:,} matches")
+                for hostname in matched[:25]
+            ]
+        )
+        select.callback = self.show_host
+        self.add_item(select)
+
+    async def show_host(self, interaction: discord.Interaction):
+        hostname = interaction.data['values'][0]
+        result = self.results[hostname]
+        text = "\n".join(result['lines'])
+        shown = f"first {len(result['lines'])} of {result['count']:,}" if result['count'] > len(result['lines']) else f"{result['count']:,}"
+        header = f"**{hostname}**: {shown} matches"
+        if len(text) <= 1800:
+            await interaction.response.send_message(f"{header}\n```\n{text}\n```")
+        else:
+            await interaction.response.send_message(
+                header, file=discord.File(io.StringIO(text + "\n"), filename=f"grep_{hostname}.txt")
+            )
+
+    @discord.ui.button(label="Download all", style=discord.ButtonStyle.secondary)
+    async def download_all(self, interaction: discord.Interaction, button: discord.ui.Button):
+        output = io.StringIO()
+        for hostname, result in sorted(self.results.items()):
+            for line in result['lines']:
+                output.write(f"{hostname}:{line}\n")
+        output.seek(0)
+        await interaction.response.send_message(
+            f"Matches of `{self.pattern}` on {sum(1 for result in self.results.values() if result['lines'])} hosts.",
+            file=discord.File(output, filename="grep_matches.txt")
+        )
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except Exception:
+            pass
+
+class GrepCommand(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.hosts = HostRepository(bot.db)
+
+    def build_command(self, pattern: str, paths: str, ignore_case: bool, fixed_strings: bool, recursive: bool, max_matches: int) -> str:
+        """grep on the host, with awk keeping the first max_matches lines and counting the rest.
+
+        Only the kept lines and the count come back over SSH. LC_ALL=C makes grep compare bytes
+        instead of decoding every line, which is several times faster on large logs.
+        """
+        flags = "-HnI" + ("r" if recursive else "") + ("i" if ignore_case else "") + ("F" if fixed_strings else "E")
+        awk = (
+            f"awk -v max={max_matches} -v width={GREP_MAX_LINE} "
+            f"'n < max {{ print substr($0, 1, width) }} {{ n++ }} END {{ print \"{COUNT_MARKER}\" n + 0 }}'"
+        )
+        return f"LC_ALL=C grep {flags} -- {shlex.quote(pattern)} {quote_paths(paths)} | {awk}"
+
+    def run_grep(self, host_data, command: str) -> Dict:
+        """Run the search on one host. Blocking, run it in an executor."""
+        started = time.perf_counter()
+        client = connect_client(host_data)
+        try:
+            stdin, stdout, stderr = client.exec_command(command, timeout=GREP_TIMEOUT)
+            output = stdout.read().decode("utf-8", errors="replace")
+            errors = stderr.read().decode("utf-8", errors="replace").strip()
+        finally:
+            client.close()
+
+        lines = output.splitlines()
+        if not lines or not lines[-1].startswith(COUNT_MARKER):
+            raise RuntimeError(errors.splitlines()[0] if errors else "no result from grep")
+        return {
+            'count': int(lines[-1][len(COUNT_MARKER):]),
+            'lines': lines[:-1],
+            'warning': errors.splitlines()[0] if errors else None,
+            'error': None,
+            'elapsed': time.perf_counter() - started,
+        }
+
+    @app_commands.describe(
+        group="The host group to search",
+        pattern="What to search for, an extended regular expression unless fixed_strings is set",
+        path="Files to search, space separated. Globs and ~ are expanded on the host",
+        ignore_case="Match regardless of case",
+        fixed_strings="Treat the pattern as plain text instead of a regular expression",
+        recursive="Search directories recursively",
+        max_matches="Matching lines to bring back per host, the rest are only counted"
+    )
+    @app_commands.command(name="grep", description="Search files on every host in a group, in parallel")
+    async def grep(
+        self,
+        interaction: discord.Interaction,
+        group: str,
+        pattern: str,
+        path: str,
+        ignore_case: Optional[bool] = False,
+        fixed_strings: Optional[bool] = False,
+        recursive: Optional[bool] = False,
+        max_matches: app_commands.Range[int, 1, 1000] = GREP_MAX_MATCHES
+    ):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        try:
+            hosts = await self.hosts.in_group(user_id, group)
+        except Exception as e:
+            print(f"Database error: {e}")
+            await interaction.followup.send("An error occurred while loading the host group. Please try again later.")
+            return
+
+        if not hosts:
+            await interaction.followup.send(f"No hosts found in group '{group}'.")
+            return
+
+        command = self.build_command(pattern, path, ignore_case, fixed_strings, recursive, max_matches)
+        results: Dict[str, Optional[Dict]] = {host['hostname']: None for host in hosts}
+        progress = {"finished": False}
+        started = time.perf_counter()
+        message = await interaction.followup.send(embed=self.results_embed(group, pattern, path, results, started, progress))
+
+        async def refresh_embed():
+            # Edits are throttled so a big group doesn't hit the rate limit
+            while not progress["finished"]:
+                await asyncio.sleep(2)
+                try:
+                    await message.edit(embed=self.results_embed(group, pattern, path, results, started, progress))
+                except discord.errors.HTTPException as e:
+                    print(f"Failed to update grep embed: {e}")
+
+        loop = asyncio.get_running_loop()
+        # A pool of its own, so searching a large group doesn't take every thread of the shared executor
+        executor = ThreadPoolExecutor(max_workers=GREP_CONCURRENCY, thread_name_prefix="grep")
+
+        async def search_one(host):
+            started_search = asyncio.Event()
+
+            def run():
+                loop.call_soon_threadsafe(started_search.set)
+                return self.run_grep(host, command)
+
+            future = loop.run_in_executor(executor, run)
+            try:
+                await started_search.wait()  # The timeout covers the search, not the time queued for a worker
+                results[host['hostname']] = await asyncio.wait_for(future, timeout=GREP_TIMEOUT + 15)
+            except Exception as e:
+                error = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e) or type(e).__name__
+                results[host['hostname']] = {'count': 0, 'lines': [], 'warning': None, 'error': error, 'elapsed': None}
+
+        refresher = asyncio.create_task(refresh_embed())
+        try:
+            await asyncio.gather(*(search_one(host) for host in hosts))
+        finally:
+            progress["finished"] = True
+            refresher.cancel()
+            executor.shutdown(wait=False)  # A search still running past its timeout closes its own client
+
+        view = GrepResultsView(results, pattern)
+        view.message = message
+        await message.edit(embed=self.results_embed(group, pattern, path, results, started, progress), view=view)
+
+    def results_embed(self, group: str, pattern: str, path: str, results: Dict[str, Optional[Dict]], started: float, progress: Dict) -> discord.Embed:
+        """Per-host match counts, hosts with the most matches first."""
+        done = [result for result in results.values() if result is not None]
+        total = sum(result['count'] for result in done)
+        failed = sum(1 for result in done if result['error'])
+
+        def order(item):
+            hostname, result = item
+            if result is None:
+                return (2, 0, hostname)
+            return (1 if result['error'] else 0, -result['count'], hostname)
+
+        lines = []
+        for hostname, result in sorted(results.items(), key=order):
+            if result is None:
+                lines.append(f"⏳ **{hostname}**: searching")
+            elif result['error']:
+                lines.append(f"❌ **{hostname}**: {result['error'][:100]}")
+            elif result['count']:
+                capped = f" (first {len(result['lines'])} kept)" if result['count'] > len(result['lines']) else ""
+                lines.append(f"🔴 **{hostname}**: {result['count']:,} matches{capped}")
+            else:
+                warning = f" ({result['warning'][:80]})" if result['warning'] else ""
+                lines.append(f"⚪ **{hostname}**: no matches{warning}")
+
+        description = f"`{pattern[:200]}` in `{path[:200]}`\n\n" + "\n".join(lines)
+        if len(description) > 3900:
+            description = description[:3900] + "\n..."
+
+        if not progress["finished"]:
+            title, color = f"Searching: {group}", discord.Color.blue()
+        elif failed:
+            title, color = f"Search Finished With Errors: {group}", discord.Color.orange()
+        else:
+            title, color = f"Search Complete: {group}", discord.Color.green()
+
+        embed = discord.Embed(title=title, description=description, color=color)
+        footer = f"{len(done)}/{len(results)} hosts • {total:,} matches • {time.perf_counter() - started:.1f}s"
+        if progress["finished"] and total:
+            footer += " • Pick a host below to see its matches"
+        embed.set_footer(text=footer)
+        return embed
+
+    @grep.autocomplete("group")
+    async def group_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        try:
+            groups = await self.hosts.groups(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+        return [app_commands.Choice(name=group, value=group) for group in groups]
+
+async def setup(bot):
+    await bot.add_cog(GrepCommand(bot))
@@ -25,10 +25,11 @@ class HelpCommand(commands.Cog):
         embed.add_field(
             name="🏠 Host Management",
             value=(
-                "📌 **/add-host** <hostname> <ip> <username> [password] [id_file] [port]\n→ Add a new host to the bot\n"
+                "📌 **/add-host** <hostname> <ip> <username> [password] [id_file] [port] [group]\n→ Add a new host to the bot\n"
+                "📥 **/import-hosts** <file> [username] [password] [id_file] [group]\n→ Import hosts from a CSV, YAML or ssh_config file\n"
                 "🗑️ **/remove-host** <hostname>\n→ Remove a host from the bot\n"
                 "📋 **/list-hosts**\n→ View all your added hosts\n"
-                "✏️ **/edit-host** <hostname> <ip> <username> [password] [id_file] [port]\n→ Modify host information"
+                "✏️ **/edit-host** <hostname> <ip> <username> [password] [id_file] [port] [ssh_profile] ...\n→ Modify host information and its SSH connection profile"
             ),
             inline=False
         )
@@ -37,9 +38,25 @@ class HelpCommand(commands.Cog):
         embed.add_field(
             name="⚡ Function Execution",
             value=(
-                "🔄 **/execute** <command> <hostname>\n→ Run commands on target host\n"
-                "⛔ **/kill** <pid> <hostname>\n→ Terminate a process\n"
-                "🔄 **/reboot** <hostname>\n→ Restart the host"
+                "🔄 **/execute** <command> <hostname> [continuous] [background] [mode] [fresh]\n→ Run commands on target host\n"
+                "🗂️ **/jobs list** | **/jobs tail** <id> | **/jobs output** <id> | **/jobs cancel** <id>\n→ Manage background jobs\n"
+                "📦 **/output get** <id> [part] | **/output list**\n→ Fetch command output too large to attach\n"
+                "⛔ **/kill** <pid> <hostname> [signal]\n→ Terminate a process\n"
+                "💥 **/bulk-kill** <hostname> [pids] [pattern] [user] [cgroup] [signal]\n→ Signal many processes at once\n"
+                "🔄 **/reboot** <hostname> [wait_for_ready]\n→ Restart the host\n"
+                "🌊 **/rolling-reboot** <group> [max_in_flight] [health_gate]\n→ Restart a host group in waves"
+            ),
+            inline=False
+        )
+
+        # File Section
+        embed.add_field(
+            name="📁 Files",
+            value=(
+                "⬆️ **/file upload** <hostname> <file> [remote_path] [overwrite] [verify]\n→ Upload an attachment over SFTP\n"
+                "⬇️ **/file download** <hostname> <remote_path> [compress]\n→ Download a file, split into parts if it's too big\n"
+                "📜 **/tail start** <hostname> <path> | **/tail stop** <id> | **/tail list**\n→ Follow a file, new lines are posted in the channel\n"
+                "🔎 **/grep** <group> <pattern> <path> [ignore_case] [fixed_strings] [recursive] [max_matches]\n→ Search files on a whole host group"
             ),
             inline=False
         )
@@ -48,10 +65,12 @@ class HelpCommand(commands.Cog):
         embed.add_field(
             name="💻 Live Terminal",
             value=(
-                "▶️ **/live-terminal start** <hostname> <channel>\n→ Launch interactive terminal\n"
+                "▶️ **/live-terminal start** <hostname> <channel> [record]\n→ Launch interactive terminal\n"
                 "⏹️ **/live-terminal stop** <channel>\n→ End terminal session\n"
                 "🔁 **/live-terminal restart** <channel>\n→ Restart inactive session\n"
                 "📊 **/live-terminal list**\n→ View active terminals\n"
+                "🔎 **/live-terminal search** <channel> <query> [context] [limit]\n→ Search a session's scrollback\n"
+                "⏪ **/live-terminal replay** <channel> [since_minutes] [duration_minutes] [speed]\n→ Replay a recorded session\n"
                 "⚡ **Special Command**: ^C\n→ Interrupt current process"
             ),
             inline=False
@@ -66,7 +85,8 @@ class HelpCommand(commands.Cog):
                 "🔍 **/ports**\n→ List open TCP/UDP ports\n"
                 "📊 **/processes** <hostname> [sort]\n→ View sorted process list\n"
                 "📈 **/status**\n→ Show host resource status\n"
-                "👥 **/users**\n→ List connected users"
+                "👥 **/users**\n→ List connected users\n"
+                "⏱️ **/latency** [command] [hostname]\n→ Show command latency percentiles"
             ),
             inline=False
         )
@@ -0,0 +1,205 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import Optional, List, Dict
+import asyncio
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.lazy import lazy_import
+from utils.repository import HostRepository
+from utils.ssh import connect_client
+
+paramiko = lazy_import("paramiko")
+
+try:
+    import yaml
+except ImportError:  # PyYAML is optional, only needed for YAML imports
+    yaml = None
+
+class ImportHostsCommand(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.hosts = HostRepository(bot.db)
+        self.timeout = 30  # Per-host connection test timeout in seconds
+
+    def normalize_host(self, entry: Dict, defaults: Dict) -> Dict:
+        """Map an imported entry onto the hosts table columns, filling in defaults."""
+        host = {
+            "hostname": entry.get("hostname") or entry.get("name"),
+            "ip": entry.get("ip") or entry.get("address") or entry.get("hostname") or entry.get("name"),
+            "username": entry.get("username") or entry.get("user") or defaults["username"],
+            "password": entry.get("password") or defaults["password"],
+            "identification_file": entry.get("identification_file") or defaults["identification_file"],
+            "port": int(entry.get("port") or 22),
+            "host_group": entry.get("group") or entry.get("host_group") or defaults["group"],
+        }
+        for field in ("hostname", "ip", "username"):
+            if host[field] is not None:
+                host[field] = str(host[field]).strip()
+        return host
+
+    def parse_csv(self, text: str) -> List[Dict]:
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+    def parse_yaml(self, text: str) -> List[Dict]:
+        if yaml is None:
+            raise ValueError("YAML imports require PyYAML (pip install pyyaml).")
+        data = yaml.safe_load(text)
+        if isinstance(data, dict):
+            data = data.get("hosts", [])
+        if not isinstance(data, list):
+            raise ValueError("Expected a list of hosts or a mapping with a 'hosts' list.")
+        return data
+
+    def parse_ssh_config(self, text: str) -> List[Dict]:
+        config = paramiko.SSHConfig.from_text(text)
+        entries = []
+        for alias in sorted(config.get_hostnames()):
+            if any(char in alias for char in "*?!"):
+                continue
+            options = config.lookup(alias)
+            # IdentityFile paths are deliberately ignored, they name files on the bot's own disk.
+            # Keys only come from the identification_file attachment.
+            entries.append({
+                "hostname": alias,
+                "ip": options.get("hostname", alias),
+                "username": options.get("user"),
+                "port": options.get("port"),
+            })
+        return entries
+
+    def parse_file(self, filename: str, text: str) -> List[Dict]:
+        """Pick a parser from the attachment's extension, falling back to ssh_config syntax."""
+        extension = os.path.splitext(filename.lower())[1]
+        if extension == ".csv":
+            return self.parse_csv(text)
+        if extension in (".yaml", ".yml"):
+            return self.parse_yaml(text)
+        return self.parse_ssh_config(text)
+
+    def test_connection(self, host: Dict):
+        """Test SSH connection to the host. Blocking, run it in an executor."""
+        connect_client(host).close()
+
+    async def test_hosts(self, hosts: List[Dict], concurrency: int):
+        """Test every host concurrently, at most `concurrency` at a time. Returns (ok_hosts, failures)."""
+        loop = asyncio.get_running_loop()
+        # A pool of its own, so a large import neither starves nor waits behind other commands' SSH work
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="import-hosts")
+
+        async def test_one(host):
+            started = asyncio.Event()
+
+            def run():
+                loop.call_soon_threadsafe(started.set)
+                self.test_connection(host)
+
+            future = loop.run_in_executor(executor, run)
+            try:
+                await started.wait()  # The timeout covers the connect, not the time queued for a worker
+                await asyncio.wait_for(future, timeout=self.timeout)
+                return host, None
+            except asyncio.TimeoutError:
+                return host, f"timed out after {self.timeout} seconds"
+            except Exception as e:
+                return host, str(e) or type(e).__name__
+
+        try:
+            results = await asyncio.gather(*(test_one(host) for host in hosts))
+        finally:
+            # Connects still running past their timeout close their own client when they finish
+            executor.shutdown(wait=False)
+        ok_hosts = [host for host, error in results if error is None]
+        failures = [(host["hostname"], error) for host, error in results if error is not None]
+        return ok_hosts, failures
+
+    @app_commands.describe(
+        file="A CSV, YAML or OpenSSH ssh_config file describing the hosts",
+        username="Default username for hosts that don't specify one (optional)",
+        password="Default password for hosts that don't specify one (optional)",
+        identification_file="Default key for hosts without one, ssh_config IdentityFile paths are ignored (optional)",
+        group="Default host group for the imported hosts (optional)",
+        concurrency="How many connection tests to run at the same time"
+    )
+    @app_commands.command(name="import-hosts", description="Import many hosts at once from a CSV, YAML or ssh_config file")
+    async def import_hosts(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        identification_file: Optional[discord.Attachment] = None,
+        group: Optional[str] = None,
+        concurrency: app_commands.Range[int, 1, 100] = 20
+    ):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        try:
+            text = (await file.read()).decode("utf-8")
+            defaults = {
+                "username": username,
+                "password": password,
+                "identification_file": (await identification_file.read()).decode("utf-8") if identification_file else None,
+                "group": group,
+            }
+            entries = self.parse_file(file.filename, text)
+        except Exception as e:
+            await interaction.followup.send(f"Failed to read import file: {str(e)}")
+            return
+
+        hosts = {}
+        failures = []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                failures.append((str(entry)[:50], "invalid entry: expected a mapping of host fields"))
+                continue
+            try:
+                host = self.normalize_host(entry, defaults)
+            except (TypeError, ValueError) as e:
+                failures.append((str(entry.get("hostname", "?")), f"invalid entry: {e}"))
+                continue
+            if not host["hostname"] or not host["ip"] or not host["username"]:
+                failures.append((host["hostname"] or "?", "missing hostname, ip or username"))
+            elif not host["password"] and not host["identification_file"]:
+                failures.append((host["hostname"], "no password or identification file"))
+            else:
+                hosts[host["hostname"]] = host  # Later entries win, like repeated /add-host calls
+
+        if not hosts and not failures:
+            await interaction.followup.send("No hosts found in the import file.")
+            return
+
+        progress = await interaction.followup.send(f"Testing {len(hosts)} hosts with up to {concurrency} concurrent connections...")
+        ok_hosts, test_failures = await self.test_hosts(list(hosts.values()), concurrency)
+        failures.extend(test_failures)
+
+        if ok_hosts:
+            try:
+                await self.hosts.import_hosts(user_id, ok_hosts)
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                await progress.edit(content=f"Failed to save imported hosts: {str(e)}")
+                return
+
+        embed = discord.Embed(
+            title="Host Import Summary",
+            color=discord.Color.green() if not failures else discord.Color.orange(),
+            description=f"**Imported:** {len(ok_hosts)}\n**Failed:** {len(failures)}"
+        )
+        report = "\n".join(f"{hostname}: {error}" for hostname, error in failures)
+
+        if failures and len(report) <= 1000:
+            embed.add_field(name="Failures", value=f"```{report}```", inline=False)
+            await progress.edit(content=None, embed=embed)
+        elif failures:
+            embed.set_footer(text="Failure details attached.")
+            await progress.edit(content=None, embed=embed)
+            await interaction.followup.send(file=discord.File(io.StringIO(report), filename="import_failures.txt"))
+        else:
+            await progress.edit(content=None, embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(ImportHostsCommand(bot))
@@ -1,14 +1,15 @@
 import discord
 from discord.ext import commands
-import paramiko
 from discord import app_commands
-import os
 from typing import List
 import re
+from utils.repository import HostRepository
+from utils.ssh import connect_client
 
 class IPCommand(commands.GroupCog, name="ip"):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     def strip_ansi_codes(self, text: str) -> str:
         """Remove ANSI escape sequences from the text."""
@@ -68,77 +69,48 @@ class IPCommand(commands.GroupCog, name="ip"):
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while getting IPs from host '{hostname}'. Please try again later.")
-                return
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while getting IPs from host '{hostname}'. Please try again later.")
+            return
 
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
 
-            ip, username, password, identification_file, port = host_data
+        client = None
+        try:
+            # SSH connection setup
+            client = connect_client(host_data)
 
-            # Temporary file creation for SSH key
-            temp_file_path = f"temp.pem"
-            if identification_file:
-                with open(temp_file_path, "w") as temp_file:
-                    temp_file.write(identification_file)
+            private_ips = self.get_private_ips(client)
 
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            embed = discord.Embed(
+                title=f"🔒 Private IP Addresses for {hostname}",
+                color=discord.Color.blue(),
+                description="List of all private IP addresses by network interface"
+            )
 
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22
+            if private_ips:
+                for interface, ip in private_ips.items():
+                    embed.add_field(
+                        name=f"🌐 Interface: {interface}",
+                        value=f"```{ip}```",
+                        inline=False
                     )
+            else:
+                embed.description = "❌ No private IP addresses found"
 
-                private_ips = self.get_private_ips(client)
-
-                embed = discord.Embed(
-                    title=f"🔒 Private IP Addresses for {hostname}",
-                    color=discord.Color.blue(),
-                    description="List of all private IP addresses by network interface"
-                )
-
-                if private_ips:
-                    for interface, ip in private_ips.items():
-                        embed.add_field(
-                            name=f"🌐 Interface: {interface}",
-                            value=f"```{ip}```",
-                            inline=False
-                        )
-                else:
-                    embed.description = "❌ No private IP addresses found"
-
-                await interaction.followup.send(embed=embed)
+            await interaction.followup.send(embed=embed)
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-            finally:
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+        finally:
+            if client is not None:
                 client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
 
     @app_commands.describe(hostname="The hostname of the host to check public IP")
     @app_commands.command(name="public", description="Get public IP address for a host")
@@ -149,87 +121,56 @@ class IPCommand(commands.GroupCog, name="ip"):
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while getting IP from host '{hostname}'. Please try again later.")
-                return
-
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
-
-            ip, username, password, identification_file, port = host_data
-
-            # Temporary file creation for SSH key
-            temp_file_path = f"temp.pem"
-            if identification_file:
-                with open(temp_file_path, "w") as temp_file:
-                    temp_file.write(identification_file)
-
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
-
-                public_ip = self.get_public_ip(client)
 
-                embed = discord.Embed(
-                    title=f"🌍 Public IP Address for {hostname}",
-                    color=discord.Color.green()
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while getting IP from host '{hostname}'. Please try again later.")
+            return
+
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
+
+        client = None
+        try:
+            # SSH connection setup
+            client = connect_client(host_data)
+
+            public_ip = self.get_public_ip(client)
+
+            embed = discord.Embed(
+                title=f"🌍 Public IP Address for {hostname}",
+                color=discord.Color.green()
+            )
+
+            if public_ip != "Unable to determine public IP":
+                embed.add_field(
+                    name="🔍 Public IP",
+                    value=f"```{public_ip}```",
+                    inline=False
                 )
-
-                if public_ip != "Unable to determine public IP":
-                    embed.add_field(
-                        name="🔍 Public IP",
-                        value=f"```{public_ip}```",
-                        inline=False
-                    )
                     
-                    embed.add_field(
-                        name="ℹ️ IP Info",
-                        value=f"[View Details](https://ipinfo.io/{public_ip})",
-                        inline=False
-                    )
-                else:
-                    embed.add_field(
-                        name="❌ Error",
-                        value="Unable to determine public IP address",
-                        inline=False
-                    )
+                embed.add_field(
+                    name="ℹ️ IP Info",
+                    value=f"[View Details](https://ipinfo.io/{public_ip})",
+                    inline=False
+                )
+            else:
+                embed.add_field(
+                    name="❌ Error",
+                    value="Unable to determine public IP address",
+                    inline=False
+                )
 
-                await interaction.followup.send(embed=embed)
+            await interaction.followup.send(embed=embed)
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-            finally:
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+        finally:
+            if client is not None:
                 client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
 
     @private.autocomplete("hostname")
     @public.autocomplete("hostname")
@@ -238,23 +179,13 @@ class IPCommand(commands.GroupCog, name="ip"):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(IPCommand(bot))
\ No newline at end of file
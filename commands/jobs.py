@@ -0,0 +1,225 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import Optional
+import asyncio
+from config import JOB_WORKERS, SSH_WORKER_MODE, SSH_WORKERS
+from utils.jobrunner import JobRunner, worker_slot
+from utils.output import OutputSpool, deliver_output, upload_limit
+
+class JobsCommand(commands.GroupCog, name="jobs"):
+    def __init__(self, bot):
+        self.bot = bot
+        self.external = SSH_WORKER_MODE == "external"  # Jobs run in worker.py processes instead of this one
+        self.runner: Optional[JobRunner] = None
+        self.listener = None
+
+    async def cog_load(self):
+        if self.external:
+            # Workers report finished jobs over NOTIFY since they can't talk to Discord themselves
+            self.listener = await self.bot.db.acquire()
+            await self.listener.add_listener("job_events", self.on_job_event)
+        else:
+            self.runner = JobRunner(self.bot.db, on_finished=self.notify)
+            self.runner.start(JOB_WORKERS)
+
+    async def cog_unload(self):
+        if self.runner is not None:
+            await self.runner.stop()
+        if self.listener is not None:
+            await self.bot.db.release(self.listener)
+            self.listener = None
+
+    async def enqueue(self, user_id: str, hostname: str, command: str, channel_id: Optional[int] = None) -> int:
+        """Queue a command to run on a host and return the job id."""
+        slot = worker_slot(user_id, hostname, SSH_WORKERS) if self.external else None
+        async with self.bot.db.acquire() as conn:
+            job_id = await conn.fetchval(
+                """INSERT INTO jobs (user_id, hostname, command, channel_id, worker_slot)
+                VALUES ($1, $2, $3, $4, $5) RETURNING id""",
+                user_id, hostname, command, str(channel_id) if channel_id else None, slot
+            )
+            if self.external:
+                await conn.execute("SELECT pg_notify('job_queued', $1)", str(slot))
+        if self.runner is not None:
+            self.runner.wakeup.set()
+        return job_id
+
+    def on_job_event(self, connection, pid, channel, payload):
+        self.bot.loop.create_task(self.notify_finished(int(payload)))
+
+    async def notify_finished(self, job_id: int):
+        async with self.bot.db.acquire() as conn:
+            job = await conn.fetchrow(
+                "SELECT id, hostname, channel_id, status, exit_status FROM jobs WHERE id = $1",
+                job_id
+            )
+        if job:
+            await self.notify(job, job['status'], job['exit_status'])
+
+    async def notify(self, job, status: str, exit_status: Optional[int]):
+        """Tell the channel the job was started from that it finished."""
+        if not job['channel_id']:
+            return
+        # With several shard processes the channel may be on another shard, messages can still be sent over REST
+        channel = self.bot.get_channel(int(job['channel_id'])) or self.bot.get_partial_messageable(int(job['channel_id']))
+        icons = {"succeeded": "✅", "failed": "❌", "cancelled": "⏹️"}
+        exit_text = f" with exit status {exit_status}" if exit_status is not None else ""
+        try:
+            await channel.send(
+                f"{icons.get(status, '')} Job #{job['id']} on host '{job['hostname']}' {status}{exit_text}. "
+                f"Use `/jobs tail {job['id']}` to see its output."
+            )
+        except discord.errors.HTTPException as e:
+            print(f"Failed to send job notification: {e}")
+
+    async def fetch_job(self, user_id: str, job_id: int):
+        async with self.bot.db.acquire() as conn:
+            return await conn.fetchrow(
+                """SELECT id, hostname, command, status, exit_status, created_at, started_at, finished_at
+                FROM jobs WHERE id = $1 AND user_id = $2""",
+                job_id, user_id
+            )
+
+    async def fetch_output_tail(self, job_id: int, max_chars: int) -> str:
+        """Read just enough of the newest output chunks to fill max_chars."""
+        async with self.bot.db.acquire() as conn:
+            chunks = await conn.fetch(
+                "SELECT data FROM job_output WHERE job_id = $1 ORDER BY seq DESC LIMIT 50",
+                job_id
+            )
+        tail = []
+        size = 0
+        for chunk in chunks:
+            tail.append(chunk['data'])
+            size += len(chunk['data'])
+            if size >= max_chars:
+                break
+        return ''.join(reversed(tail))[-max_chars:]
+
+    def job_embed(self, job, output: str) -> discord.Embed:
+        colors = {
+            "queued": discord.Color.light_grey(),
+            "running": discord.Color.blue(),
+            "succeeded": discord.Color.green(),
+            "failed": discord.Color.red(),
+            "cancelled": discord.Color.orange(),
+        }
+        embed = discord.Embed(
+            title=f"Job #{job['id']} on Host '{job['hostname']}'",
+            color=colors.get(job['status'], discord.Color.blue()),
+            description=f"**Command:**\n```{job['command'][:500]}```\n**Output:**\n```{output or 'No output yet.'}```"
+        )
+        status = job['status'] if job['exit_status'] is None else f"{job['status']} (exit status {job['exit_status']})"
+        embed.set_footer(text=f"Status: {status}")
+        return embed
+
+    @app_commands.command(name="list", description="List your recent background jobs")
+    async def list_jobs(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        async with self.bot.db.acquire() as conn:
+            jobs = await conn.fetch(
+                """SELECT id, hostname, command, status, exit_status, created_at
+                FROM jobs WHERE user_id = $1 ORDER BY id DESC LIMIT 15""",
+                user_id
+            )
+
+        if not jobs:
+            await interaction.followup.send("You have no background jobs.")
+            return
+
+        embed = discord.Embed(title="Your Background Jobs", color=discord.Color.blue())
+        for job in jobs:
+            exit_text = f" (exit {job['exit_status']})" if job['exit_status'] is not None else ""
+            embed.add_field(
+                name=f"#{job['id']} • {job['hostname']} • {job['status']}{exit_text}",
+                value=f"```{job['command'][:200]}```",
+                inline=False
+            )
+        embed.set_footer(text="Use /jobs tail <id> to see output or /jobs cancel <id> to stop a job.")
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.describe(job_id="The job to show", follow="Keep updating the output until the job finishes")
+    @app_commands.command(name="tail", description="Show the latest output of a background job")
+    async def tail_job(self, interaction: discord.Interaction, job_id: int, follow: Optional[bool] = False):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        job = await self.fetch_job(user_id, job_id)
+        if not job:
+            await interaction.followup.send(f"No job found with id {job_id}.")
+            return
+
+        output = await self.fetch_output_tail(job_id, 1800)
+        message = await interaction.followup.send(embed=self.job_embed(job, output))
+
+        if follow:
+            # Follow for at most ten minutes, /jobs tail can be run again after that
+            for _ in range(300):
+                if job['status'] not in ("queued", "running"):
+                    break
+                await asyncio.sleep(2)
+                job = await self.fetch_job(user_id, job_id)
+                output = await self.fetch_output_tail(job_id, 1800)
+                try:
+                    await message.edit(embed=self.job_embed(job, output))
+                except discord.errors.HTTPException as e:
+                    print(f"Failed to update job output: {e}")
+                    break
+
+    @app_commands.describe(job_id="The job to download the full output of")
+    @app_commands.command(name="output", description="Download the full output of a background job")
+    async def job_output(self, interaction: discord.Interaction, job_id: int):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        job = await self.fetch_job(user_id, job_id)
+        if not job:
+            await interaction.followup.send(f"No job found with id {job_id}.")
+            return
+
+        async with self.bot.db.acquire() as conn:
+            chunks = await conn.fetch("SELECT data FROM job_output WHERE job_id = $1 ORDER BY seq", job_id)
+
+        spool = OutputSpool()
+        for chunk in chunks:
+            spool.append(chunk['data'])
+        await deliver_output(
+            interaction.followup.send, spool, user_id, upload_limit(interaction.guild),
+            f"Full output of job #{job_id}.", filename=f"job_{job_id}_output.txt"
+        )
+
+    @app_commands.describe(job_id="The job to cancel")
+    @app_commands.command(name="cancel", description="Cancel a queued or running background job")
+    async def cancel_job(self, interaction: discord.Interaction, job_id: int):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        async with self.bot.db.acquire() as conn:
+            job = await conn.fetchrow(
+                """UPDATE jobs
+                SET cancel_requested = true,
+                    status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                    finished_at = CASE WHEN status = 'queued' THEN CURRENT_TIMESTAMP ELSE finished_at END
+                WHERE id = $1 AND user_id = $2 AND status IN ('queued', 'running')
+                RETURNING status""",
+                job_id, user_id
+            )
+
+        if not job:
+            await interaction.followup.send(f"No queued or running job found with id {job_id}.")
+            return
+
+        # Stop it right away wherever it's running, otherwise workers notice on their next lease renewal
+        if self.runner is not None:
+            self.runner.cancel_local(job_id)
+        else:
+            async with self.bot.db.acquire() as conn:
+                await conn.execute("SELECT pg_notify('job_cancel', $1)", str(job_id))
+
+        await interaction.followup.send(f"Job #{job_id} has been cancelled.")
+
+async def setup(bot):
+    await bot.add_cog(JobsCommand(bot))
@@ -1,110 +1,239 @@
 import discord
 from discord.ext import commands
-import paramiko
 from discord import app_commands
-import os
-from typing import List
+import io
+import re
+import shlex
+from typing import List, Optional
+from utils.repository import HostRepository
+from utils.ssh import connect_client
+
+SIGNALS = ["KILL", "TERM", "INT", "HUP", "QUIT", "USR1", "USR2", "STOP", "CONT"]
 
 class KillCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
-    @app_commands.describe(hostname="The hostname of the host to execute the command on", pid="The PID of the process to kill")
+    @app_commands.describe(
+        hostname="The hostname of the host to execute the command on",
+        pid="The PID of the process to kill",
+        signal="The signal to send (defaults to KILL)"
+    )
+    @app_commands.choices(signal=[app_commands.Choice(name=name, value=name) for name in SIGNALS])
     @app_commands.command(name="kill", description="Kill a selected process in a selected host by it's PID")
     async def kill(
         self,
         interaction: discord.Interaction,
         pid: int,
-        hostname: str
+        hostname: str,
+        signal: str = "KILL"
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while killing process on host '{hostname}'. Please try again later.")
-                return
-
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
-
-            ip, username, password, identification_file, port = host_data
-
-            # Temporary file creation
-            temp_file_path = f"temp.pem"
-            with open(temp_file_path, "w") as temp_file:
-                temp_file.write(identification_file)
-
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()  # Create SSH client
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
-
-                # Execute command
-                stdin, stdout, stderr = client.exec_command(f"kill -9 {pid}")
-                error = stderr.read().decode("utf-8")
-
-                if error:
-                    await interaction.followup.send(f"An error occurred while killing process on host '{hostname}': {error}")
-                else:
-                    await interaction.followup.send(f"Process with PID '{pid}' on host '{hostname}' killed successfully.")
-
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while killing process on host '{hostname}'. Please try again later.")
-            finally:
-                client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
+
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while killing process on host '{hostname}'. Please try again later.")
+            return
+
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
+
+        try:
+            error = await self.bot.loop.run_in_executor(None, self.run_kill, host_data, signal, pid)
+
+            if error:
+                await interaction.followup.send(f"An error occurred while killing process on host '{hostname}': {error}")
+            else:
+                await interaction.followup.send(f"Process with PID '{pid}' on host '{hostname}' killed successfully.")
+
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while killing process on host '{hostname}'. Please try again later.")
+
+    def run_kill(self, host_data, signal: str, pid: int) -> str:
+        """Send the signal to one process. Blocking, run it in an executor. Returns kill's stderr."""
+        client = connect_client(host_data)
+        try:
+            stdin, stdout, stderr = client.exec_command(f"kill -s {signal} {pid}")
+            return stderr.read().decode("utf-8")
+        finally:
+            client.close()
+
+    def build_bulk_kill_script(
+        self,
+        pids: List[int],
+        pattern: Optional[str],
+        user: Optional[str],
+        cgroup: Optional[str],
+        match_full_command: bool,
+        signal: str,
+        dry_run: bool
+    ) -> str:
+        """Build a shell script that resolves every target and signals it in a single remote execution.
+
+        Targets are the union of the explicit PIDs, the pgrep matches for pattern/user and the
+        processes in the cgroup. Each PID is reported on its own line as `RESULT <pid> <ok|fail> <message>`,
+        preceded by `NAME <pid> <command>` lines for the resolved processes.
+        """
+        lines = ['t=$(mktemp)', '{']
+        if pids:
+            lines.append(f"printf '%s\\n' {' '.join(str(pid) for pid in pids)}")
+        if pattern or user:
+            pgrep = ["pgrep"]
+            if match_full_command:
+                pgrep.append("-f")
+            if user:
+                pgrep += ["-u", shlex.quote(user)]
+            if pattern:
+                pgrep += ["--", shlex.quote(pattern)]
+            lines.append(" ".join(pgrep))
+        if cgroup:
+            lines.append(f"cat {shlex.quote('/sys/fs/cgroup/' + cgroup.strip('/') + '/cgroup.procs')}")
+        # The group runs in the current shell, so only $$ and the shell that launched it share our command line
+        lines.append('} > "$t" 2>/dev/null')
+        lines.append('targets=$(sort -un "$t" | grep -v -x -e "$$" -e "$PPID")')
+        lines.append('rm -f "$t"')
+        lines.append('[ -z "$targets" ] && exit 0')
+        lines.append('ps -o pid=,comm= -p "$(echo $targets | tr " " ",")" | while read p c; do echo "NAME $p $c"; done')
+        if dry_run:
+            lines.append('for p in $targets; do echo "RESULT $p ok dry run"; done')
+        else:
+            lines.append(
+                f'for p in $targets; do if out=$(kill -s {signal} "$p" 2>&1); '
+                'then echo "RESULT $p ok"; else echo "RESULT $p fail $out"; fi; done'
+            )
+        return "\n".join(lines)
+
+    def run_bulk_kill(self, host_data, script: str) -> str:
+        """Run a bulk kill script on the host. Blocking, run it in an executor. Returns its output."""
+        client = connect_client(host_data)
+        try:
+            stdin, stdout, stderr = client.exec_command(f"sh -c {shlex.quote(script)}", timeout=60)
+            return stdout.read().decode("utf-8", errors="ignore")
+        finally:
+            client.close()
+
+    def parse_bulk_kill_output(self, output: str):
+        """Parse the bulk kill script output into a list of (pid, command, ok, message)."""
+        names = {}
+        results = []
+        for line in output.splitlines():
+            parts = line.split(" ", 3)
+            if len(parts) >= 3 and parts[0] == "NAME":
+                names[parts[1]] = " ".join(parts[2:])
+            elif len(parts) >= 3 and parts[0] == "RESULT":
+                message = parts[3] if len(parts) > 3 else ""
+                results.append((parts[1], parts[2] == "ok", message))
+        return [(pid, names.get(pid, "?"), ok, message) for pid, ok, message in results]
+
+    @app_commands.describe(
+        hostname="The hostname of the host to kill processes on",
+        pids="PIDs to signal, separated by spaces or commas",
+        pattern="Process name pattern to match (pgrep syntax)",
+        user="Only match processes owned by this user",
+        cgroup="Signal every process in this cgroup (path under /sys/fs/cgroup)",
+        match_full_command="Match the pattern against the full command line instead of the process name",
+        signal="The signal to send (defaults to KILL)",
+        dry_run="Only list the processes that would be signalled"
+    )
+    @app_commands.choices(signal=[app_commands.Choice(name=name, value=name) for name in SIGNALS])
+    @app_commands.command(name="bulk-kill", description="Signal many processes on a host by PID list, name pattern, user or cgroup")
+    async def bulk_kill(
+        self,
+        interaction: discord.Interaction,
+        hostname: str,
+        pids: Optional[str] = None,
+        pattern: Optional[str] = None,
+        user: Optional[str] = None,
+        cgroup: Optional[str] = None,
+        match_full_command: Optional[bool] = False,
+        signal: str = "KILL",
+        dry_run: Optional[bool] = False
+    ):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        if not (pids or pattern or user or cgroup):
+            await interaction.followup.send("Please provide PIDs, a pattern, a user or a cgroup to match.")
+            return
+
+        pid_list = []
+        if pids:
+            for value in re.split(r"[\s,]+", pids.strip()):
+                if not value.isdigit():
+                    await interaction.followup.send(f"Invalid PID '{value}'.")
+                    return
+                pid_list.append(int(value))
+
+        if cgroup and ".." in cgroup.split("/"):
+            await interaction.followup.send("Invalid cgroup path.")
+            return
+
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while killing processes on host '{hostname}'. Please try again later.")
+            return
+
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
+
+        script = self.build_bulk_kill_script(pid_list, pattern, user, cgroup, match_full_command, signal, dry_run)
+
+        try:
+            output = await self.bot.loop.run_in_executor(None, self.run_bulk_kill, host_data, script)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while killing processes on host '{hostname}'. Please try again later.")
+            return
+
+        results = self.parse_bulk_kill_output(output)
+        if not results:
+            await interaction.followup.send(f"No matching processes found on host '{hostname}'.")
+            return
+
+        succeeded = sum(1 for _, _, ok, _ in results if ok)
+        failed = len(results) - succeeded
+        report = "\n".join(
+            f"{'✔' if ok else '✘'} {pid:>7} {command}" + (f" ({message})" if message and not ok else "")
+            for pid, command, ok, message in results
+        )
+
+        embed = discord.Embed(
+            title=f"{'Dry Run: ' if dry_run else ''}Bulk Kill on Host '{hostname}'",
+            color=discord.Color.green() if not failed else discord.Color.orange(),
+            description=f"**Signal:** SIG{signal}\n**Matched:** {len(results)}\n**Succeeded:** {succeeded}\n**Failed:** {failed}"
+        )
+
+        if len(report) <= 1000:
+            embed.add_field(name="Results", value=f"```{report}```", inline=False)
+            await interaction.followup.send(embed=embed)
+        else:
+            embed.set_footer(text="Per-PID results attached.")
+            output_file = discord.File(io.StringIO(report), filename="kill_results.txt")
+            await interaction.followup.send(embed=embed, file=output_file)
 
     @kill.autocomplete("hostname")
+    @bulk_kill.autocomplete("hostname")
     async def host_autocomplete(
         self,
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
-
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
+
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(KillCommand(bot))
@@ -0,0 +1,73 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import List, Optional
+from config import TRACING_ENABLED
+from utils.tracing import collector
+
+class LatencyCommand(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def format_rows(self, rows, limit: int) -> str:
+        lines = [f"{'':<24} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8}"]
+        for key, count, p50, p95, p99 in rows[:limit]:
+            lines.append(f"{str(key)[:24]:<24} {count:>5} {p50:>6.0f}ms {p95:>6.0f}ms {p99:>6.0f}ms")
+        return "\n".join(lines)
+
+    @app_commands.describe(
+        command="Show the per-phase breakdown for this command",
+        hostname="Only show stats for this host"
+    )
+    @app_commands.command(name="latency", description="Show command latency percentiles from recent traces")
+    async def latency(
+        self,
+        interaction: discord.Interaction,
+        command: Optional[str] = None,
+        hostname: Optional[str] = None
+    ):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        if not TRACING_ENABLED:
+            await interaction.followup.send("Tracing is disabled. Set `TRACING_ENABLED = True` in config.py to collect latency stats.")
+            return
+
+        embed = discord.Embed(title="⏱️ Command Latency", color=discord.Color.blue())
+
+        commands_rows = collector.summary(collector.by_command, [command] if command else None)
+        if commands_rows:
+            embed.add_field(name="Per Command", value=f"```{self.format_rows(commands_rows, 15)}```", inline=False)
+
+        host_keys = [key for key in collector.by_host if key[0] == user_id and (hostname is None or key[1] == hostname)]
+        host_rows = [(key[1], *stats) for key, *stats in collector.summary(collector.by_host, host_keys)]
+        if host_rows:
+            embed.add_field(name="Per Host", value=f"```{self.format_rows(host_rows, 10)}```", inline=False)
+
+        if command:
+            phase_keys = [key for key in collector.by_phase if key[0] == command]
+            phase_rows = [(key[1], *stats) for key, *stats in collector.summary(collector.by_phase, phase_keys)]
+            if phase_rows:
+                embed.add_field(name=f"Phases of /{command}", value=f"```{self.format_rows(phase_rows, 15)}```", inline=False)
+
+        if not embed.fields:
+            await interaction.followup.send("No traces recorded yet.")
+            return
+
+        embed.set_footer(text=f"Based on the last {collector.window} runs of each command or host since the bot started.")
+        await interaction.followup.send(embed=embed)
+
+    @latency.autocomplete("command")
+    async def command_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in sorted(collector.by_command)
+            if name.startswith(current)
+        ][:25]
+
+async def setup(bot):
+    await bot.add_cog(LatencyCommand(bot))
@@ -1,19 +1,20 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from utils.repository import HostRepository
+from utils.ssh import describe_profile
 
 class ListHostsCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     @app_commands.command(name="list-hosts", description="List all added hosts")
     async def list_hosts(self, interaction: discord.Interaction):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
-        
-        async with db.acquire() as conn:
-            hosts = await conn.fetch("SELECT hostname, ip, username, port FROM hosts WHERE user_id = $1", user_id)
+
+        hosts = await self.hosts.list(user_id)
 
         if not hosts:
             await interaction.followup.send("You have no hosts added.")
@@ -28,7 +29,7 @@ class ListHostsCommand(commands.Cog):
         for host in hosts:
             embed.add_field(
                 name=f"🔧 {host['hostname']}",
-                value=f"**IP:** {host['ip']}\n**Username:** {host['username']}\n**Port:** {host['port']}",
+                value=f"**IP:** {host['ip']}\n**Username:** {host['username']}\n**Port:** {host['port']}\n**Group:** {host['host_group'] or 'None'}\n**Setup:** {host['setup_status'] or 'Unknown'}\n**SSH:** {describe_profile(host)}",
                 inline=False
             )
 
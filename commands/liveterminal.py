@@ -1,40 +1,288 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from typing import List, Dict
-import paramiko
+from typing import List, Dict, Optional
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
 import asyncio
+import codecs
+import gzip
+import json
+import time
+import io
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
+from config import RECORDINGS_DIR, SCROLLBACK_MAX_LINES, SCROLLBACK_KEPT_SESSIONS, RESTORE_CONCURRENCY, RESTORE_TIMEOUT
+from utils.lazy import lazy_import
+from utils import metrics
+from utils.repository import HostRepository, LiveTerminalRepository
+from utils.ssh import connect_client, resolve_profile
+
+paramiko = lazy_import("paramiko")
+
+class SessionRecorder:
+    """Records a terminal's raw output and input as an asciicast v2 stream in a gzip file.
+
+    Events are buffered in memory and appended as a new gzip member on every flush, so the
+    forwarding path only pays for a list append and the file stays valid if the bot dies.
+    """
+
+    def __init__(self, loop, channel_id: int, hostname: str, flush_interval: float = 2.0):
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+        self.loop = loop
+        # Segments are named by their start in milliseconds. The name is claimed with an exclusive
+        # create, bumped past any taken one, so two recorders never append to the same file.
+        started_ms = int(time.time() * 1000)
+        while True:
+            self.path = os.path.join(RECORDINGS_DIR, f"{channel_id}_{started_ms}.cast.gz")
+            try:
+                open(self.path, "xb").close()
+                break
+            except FileExistsError:
+                started_ms += 1
+        self.started = started_ms // 1000
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.flush_interval = flush_interval
+        self.closed = False
+        self.pending = [json.dumps({
+            "version": 2,
+            "width": 80,
+            "height": 24,
+            "timestamp": int(self.started),
+            "title": f"{hostname} in channel {channel_id}",
+        }) + "\n"]
+        self.flush_task = loop.create_task(self.flush_loop())
+
+    def record_output(self, data: bytes):
+        text = self.decoder.decode(data)
+        if text:
+            self.pending.append(json.dumps([round(time.time() - self.started, 6), "o", text]) + "\n")
+
+    def record_input(self, text: str):
+        self.pending.append(json.dumps([round(time.time() - self.started, 6), "i", text]) + "\n")
+
+    def write(self, events: List[str]):
+        """Compress events into a gzip member and append it. Blocking, run it in an executor."""
+        data = gzip.compress(''.join(events).encode('utf-8'))
+        with open(self.path, "ab") as recording:
+            recording.write(data)
+
+    async def flush(self):
+        if not self.pending:
+            return
+        events, self.pending = self.pending, []
+        await self.loop.run_in_executor(None, self.write, events)
+
+    async def flush_loop(self):
+        while not self.closed:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Failed to write terminal recording {self.path}: {e}")
+
+    async def close(self):
+        self.closed = True
+        self.flush_task.cancel()
+        await self.flush()
+
+class ScrollbackIndex:
+    """Bounded in-memory scrollback for a terminal with an inverted index over its words.
+
+    Lines get increasing sequence numbers, so every posting list stays sorted and evicting the
+    oldest line only has to pop the left end of the postings for its words.
+    """
+
+    token_pattern = re.compile(r"[a-z0-9_]+")
+
+    def __init__(self, max_lines: int):
+        self.max_lines = max_lines
+        self.lines = deque()  # (seq, timestamp, text)
+        self.postings: Dict[str, deque] = {}
+        self.next_seq = 0
+
+    def tokenize(self, text: str):
+        return set(self.token_pattern.findall(text.lower()))
+
+    def add_line(self, text: str):
+        seq = self.next_seq
+        self.next_seq += 1
+        self.lines.append((seq, time.time(), text))
+        for token in self.tokenize(text):
+            self.postings.setdefault(token, deque()).append(seq)
+
+        if len(self.lines) > self.max_lines:
+            old_seq, _, old_text = self.lines.popleft()
+            for token in self.tokenize(old_text):
+                posting = self.postings[token]
+                posting.popleft()
+                if not posting:
+                    del self.postings[token]
+
+    def get_line(self, seq: int):
+        first_seq = self.lines[0][0]
+        if seq < first_seq or seq >= self.next_seq:
+            return None
+        return self.lines[seq - first_seq]
+
+    def search(self, query: str, limit: int = 10):
+        """Return the newest line sequence numbers containing every word of the query."""
+        tokens = self.tokenize(query)
+        if not self.lines:
+            return []
+        if not tokens:
+            # Nothing indexable in the query (e.g. only punctuation), fall back to a scan
+            needle = query.lower()
+            return [seq for seq, _, text in reversed(self.lines) if needle in text.lower()][:limit]
+
+        postings = [self.postings.get(token) for token in tokens]
+        if any(posting is None for posting in postings):
+            return []
+        shortest = min(postings, key=len)
+        matches = []
+        for seq in reversed(shortest):
+            if tokens <= self.tokenize(self.get_line(seq)[2]):
+                matches.append(seq)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+def read_recording(path: str):
+    """Yield (absolute_time, kind, data) events from a recording file."""
+    with gzip.open(path, "rt", encoding="utf-8") as recording:
+        first_line = recording.readline()
+        if not first_line:
+            return  # Segment claimed but nothing flushed to it yet
+        header = json.loads(first_line)
+        started = header["timestamp"]
+        try:
+            for line in recording:
+                try:
+                    offset, kind, data = json.loads(line)
+                except ValueError:
+                    continue
+                yield started + offset, kind, data
+        except (EOFError, gzip.BadGzipFile):
+            return  # Truncated last member from a crash, everything before it is still readable
 
 class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
+        self.terminals = LiveTerminalRepository(bot.db)
         self.active_terminals: Dict[int, Dict] = {}
+        # channel id -> scrollback, least recently used first. Kept after a session stops so it can still be searched
+        self.scrollback: "OrderedDict[int, ScrollbackIndex]" = OrderedDict()
+        self.activity_interval = 60  # Minimum seconds between last_active_at updates for a terminal
+        metrics.live_terminals.collect = lambda: {(): len(self.active_terminals)}
         self.bot.loop.create_task(self.initialize_terminals())
         
     async def initialize_terminals(self):
-        """Initialize all active terminals from the database on startup."""
+        """Initialize all active terminals from the database on startup.
+
+        Sessions are restored concurrently, at most RESTORE_CONCURRENCY at a time and the most
+        recently used channels first, so one slow host doesn't hold up every other terminal.
+        """
         await self.bot.wait_until_ready()
-        async with self.bot.db.acquire() as conn:
-            active_sessions = await conn.fetch(
-                """SELECT lt.channel_id, lt.user_id, lt.hostname, 
-                          h.ip, h.username, h.password, h.identification_file, h.port
-                   FROM live_terminals lt
-                   JOIN hosts h ON lt.user_id = h.user_id AND lt.hostname = h.hostname
-                   WHERE lt.is_active = true"""
-            )
-            
-            for session in active_sessions:
-                channel = self.bot.get_channel(int(session['channel_id']))
-                if channel:
-                    await self.restore_terminal_session(session, channel)
+        active_sessions = [session for session in await self.terminals.active_sessions() if self.owns_session(session)]
+
+        if not active_sessions:
+            return
+
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(RESTORE_CONCURRENCY)
+        # Connects get a pool of their own, a burst of restores can't starve every other command's executor work
+        executor = ThreadPoolExecutor(max_workers=RESTORE_CONCURRENCY, thread_name_prefix="terminal-restore")
+
+        async def restore_one(session):
+            channel = self.bot.get_channel(int(session['channel_id']))
+            if not channel:
+                return session, False, 0.0, "channel not found"
+            # Tasks are created in activity order and the semaphore wakes waiters in FIFO order
+            async with semaphore:
+                session_started = time.perf_counter()
+                error = await self.restore_terminal_session(session, channel, executor)
+                return session, error is None, time.perf_counter() - session_started, error
 
-    async def restore_terminal_session(self, session, channel):
-        """Restore an individual terminal session from the database."""
         try:
+            results = await asyncio.gather(*(restore_one(session) for session in active_sessions))
+        finally:
+            executor.shutdown(wait=False)  # Connects still running past their timeout close their own client
+
+        restored = sum(1 for _, ok, _, _ in results if ok)
+        print(
+            f"Restored {restored}/{len(results)} live terminals in {time.perf_counter() - started:.2f}s "
+            f"(concurrency {RESTORE_CONCURRENCY}, default timeout {RESTORE_TIMEOUT}s)"
+        )
+        for session, ok, elapsed, error in results:
+            status = "restored" if ok else f"failed: {error}"
+            print(f"  {session['channel_id']} ({session['hostname']}): {status} ({elapsed:.2f}s)")
+
+    def owns_session(self, session) -> bool:
+        """Whether this process runs the shard a terminal's guild is on, and so should host it."""
+        shard_ids = getattr(self.bot, "shard_ids", None)
+        if not shard_ids:
+            return True
+        if session['guild_id'] is None:
+            # Started before guild ids were stored, only the owning shard can see the channel
+            return self.bot.get_channel(int(session['channel_id'])) is not None
+        return (int(session['guild_id']) >> 22) % self.bot.shard_count in shard_ids
+
+    def restore_timeout(self, session) -> float:
+        """Seconds to wait for a host when restoring its terminal.
+
+        A host with its own connection settings, or a profile other than the default, gets its
+        connect and banner timeouts. Everything else waits RESTORE_TIMEOUT.
+        """
+        if not (session['ssh_connect_timeout'] or session['ssh_banner_timeout'] or (session['ssh_profile'] or "default") != "default"):
+            return RESTORE_TIMEOUT
+        settings = resolve_profile(session)
+        return settings['connect_timeout'] + settings['banner_timeout']
+
+    def connect_with_timeout(self, session, timeout: float, executor: ThreadPoolExecutor):
+        """Connect an SSH client and open a shell in executor, giving up after `timeout` seconds.
+
+        The timeout starts when a worker picks the connect up, not while it waits for one. The
+        connect itself can't be interrupted, so a client that finishes connecting after the
+        timeout is closed as soon as it's done instead of being leaked.
+        """
+        loop = self.bot.loop
+        started = asyncio.Event()
+
+        def connect():
+            loop.call_soon_threadsafe(started.set)
             client = self.create_ssh_client(session)
-            shell = client.invoke_shell()
+            try:
+                return client, client.invoke_shell()
+            except Exception:
+                client.close()
+                raise
+
+        def close_late(future):
+            if not future.cancelled() and future.exception() is None:
+                future.result()[0].close()
+
+        future = loop.run_in_executor(executor, connect)
+
+        async def wait():
+            await started.wait()
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+            except asyncio.TimeoutError:
+                future.add_done_callback(close_late)
+                raise
+
+        return wait()
+
+    async def restore_terminal_session(self, session, channel, executor: ThreadPoolExecutor) -> Optional[str]:
+        """Restore an individual terminal session from the database. Returns an error message or None."""
+        try:
+            try:
+                timeout = self.restore_timeout(session)
+                client, shell = await self.connect_with_timeout(session, timeout, executor)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"connection timed out after {timeout:g} seconds")
             shell.send('export TERM=xterm\n')
             shell.send('set +o vi\n')
             shell.send('stty -echo\n')
@@ -43,43 +291,42 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
                 'client': client,
                 'shell': shell,
                 'user_id': session['user_id'],
-                'output_buffer': ''
+                'output_buffer': '',
+                'hostname': session['hostname'],
+                'recorder': self.start_recorder(int(session['channel_id']), session['hostname'], session['recording'])
             }
             
             # Start output monitoring task
             self.bot.loop.create_task(self.monitor_shell_output(channel, shell))
             await channel.send("Terminal session restored after bot restart.")
+            return None
             
         except Exception as e:
-            await channel.send(f"Failed to restore terminal session: {e}")
+            error = str(e) or type(e).__name__
+            try:
+                await channel.send(f"Failed to restore terminal session: {error}")
+            except discord.HTTPException:
+                pass
             await self.cleanup_terminal(int(session['channel_id']))
+            return error
 
-    def create_ssh_client(self, session) -> paramiko.SSHClient:
-        """Create and connect an SSH client."""
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        if session['identification_file']:
-            temp_file_path = f"temp_{session['channel_id']}.pem"
-            with open(temp_file_path, "w") as temp_file:
-                temp_file.write(session['identification_file'])
-            client.connect(
-                hostname=session['ip'],
-                username=session['username'],
-                port=session['port'] or 22,
-                key_filename=temp_file_path,
-                timeout=10
-            )
-        else:
-            client.connect(
-                hostname=session['ip'],
-                username=session['username'],
-                password=session['password'],
-                port=session['port'] or 22,
-                timeout=10
-            )
-        os.remove(temp_file_path)
-        return client
+    def start_recorder(self, channel_id: int, hostname: str, enabled: bool) -> Optional[SessionRecorder]:
+        """Start recording a terminal session if recording is enabled for it."""
+        if not enabled:
+            return None
+        return SessionRecorder(self.bot.loop, channel_id, hostname)
+
+    async def stop_recorder(self, terminal_data: Dict):
+        recorder = terminal_data.pop('recorder', None)
+        if recorder:
+            try:
+                await recorder.close()
+            except Exception as e:
+                print(f"Failed to close terminal recording: {e}")
+
+    def create_ssh_client(self, session) -> "paramiko.SSHClient":
+        """Create and connect an SSH client with the host's connection profile."""
+        return connect_client(session)
 
     def clean_terminal_output(self, text: str) -> str:
         """Clean terminal output of control sequences and format it properly."""
@@ -114,7 +361,8 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
 
     @app_commands.describe(
         hostname="The hostname of the host to connect to",
-        channel="The text channel to use for the live terminal"
+        channel="The text channel to use for the live terminal",
+        record="Record the session so it can be replayed later with /live-terminal replay"
     )
     @app_commands.checks.has_permissions(manage_guild=True)
     @app_commands.command(name="start", description="Start a live terminal session in a specified channel")
@@ -122,79 +370,46 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
         self,
         interaction: discord.Interaction,
         hostname: str,
-        channel: discord.TextChannel
+        channel: discord.TextChannel,
+        record: Optional[bool] = False
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
         if channel.id in self.active_terminals:
             await interaction.followup.send("There's already an active terminal session in this channel.")
             return
 
-        async with db.acquire() as conn:
-            try:
-                await conn.execute(
-                    """INSERT INTO live_terminals (user_id, hostname, channel_id, is_active)
-                    VALUES ($1, $2, $3, true)
-                    ON CONFLICT (channel_id) DO UPDATE
-                    SET user_id = $1, hostname = $2, is_active = true""",
-                    user_id, hostname, str(channel.id)
-                )
-
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-
-                if not host_data:
-                    await interaction.followup.send("Host not found. Please check your configured hosts.")
-                    return
+        try:
+            await self.terminals.start(user_id, hostname, channel.id, record, channel.guild.id)
+            host_data = await self.hosts.get(user_id, hostname)
+
+            if not host_data:
+                await interaction.followup.send("Host not found. Please check your configured hosts.")
+                return
 
-                ip, username, password, identification_file, port = host_data
-
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    temp_file_path = f"temp_{channel.id}.pem"
-                    with open(temp_file_path, "w") as temp_file:
-                        temp_file.write(identification_file)
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
-
-                shell = client.invoke_shell()
-                shell.send('export TERM=xterm\n')
-                shell.send('set +o vi\n')
-                shell.send('stty -echo\n')
+            client = self.create_ssh_client(host_data)
+
+            shell = client.invoke_shell()
+            shell.send('export TERM=xterm\n')
+            shell.send('set +o vi\n')
+            shell.send('stty -echo\n')
                 
-                self.active_terminals[channel.id] = {
-                    'client': client,
-                    'shell': shell,
-                    'user_id': user_id,
-                    'output_buffer': ''
-                }
+            self.active_terminals[channel.id] = {
+                'client': client,
+                'shell': shell,
+                'user_id': user_id,
+                'output_buffer': '',
+                'hostname': hostname,
+                'recorder': self.start_recorder(channel.id, hostname, record)
+            }
 
-                self.bot.loop.create_task(self.monitor_shell_output(channel, shell))
-                await interaction.followup.send(f"Live terminal started in {channel.mention}. You can now send commands directly in this channel.")
-                os.remove(temp_file_path)
+            self.bot.loop.create_task(self.monitor_shell_output(channel, shell))
+            await interaction.followup.send(f"Live terminal started in {channel.mention}. You can now send commands directly in this channel.")
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-                await self.cleanup_terminal(channel.id)
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+            await self.cleanup_terminal(channel.id)
 
     @app_commands.command(name="list", description="List all active live terminal sessions.")
     @app_commands.checks.has_permissions(manage_guild=True)
@@ -229,17 +444,194 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
 
         await interaction.followup.send(embed=embed)
 
+    def find_recordings(self, channel_id: int, start: float, end: float) -> List[str]:
+        """Recording segments for a channel that may contain events between start and end."""
+        if not os.path.isdir(RECORDINGS_DIR):
+            return []
+        segments = []
+        for filename in os.listdir(RECORDINGS_DIR):
+            name, _, extension = filename.partition(".")
+            parts = name.split("_")
+            if extension != "cast.gz" or len(parts) != 2 or parts[0] != str(channel_id) or not parts[1].isdigit():
+                continue
+            segments.append((int(parts[1]) / 1000, os.path.join(RECORDINGS_DIR, filename)))  # Named by start in ms
+        segments.sort()
+        # A segment can only hold events up to the start of the next one
+        return [
+            path for index, (started, path) in enumerate(segments)
+            if started <= end and (index + 1 == len(segments) or segments[index + 1][0] >= start)
+        ]
+
+    def render_frames(self, paths: List[str], start: float, end: float, max_chars: Optional[int]):
+        """Group recorded output between start and end into (time, cleaned_text) frames.
+
+        Returns (frames, complete). Stops early once max_chars of cleaned text are collected.
+        """
+        frames = []
+        total = 0
+        frame_start = None
+        last_time = None
+        raw = []
+
+        def close_frame():
+            nonlocal total
+            cleaned = self.clean_terminal_output(''.join(raw))
+            if cleaned.strip():
+                frames.append((frame_start, cleaned))
+                total += len(cleaned)
+
+        for path in paths:
+            for event_time, kind, data in read_recording(path):
+                if kind != "o" or event_time < start:
+                    continue
+                if event_time > end:
+                    break
+                if raw and (event_time - last_time > 0.5 or sum(map(len, raw)) > 1500):
+                    close_frame()
+                    raw = []
+                    if max_chars is not None and total > max_chars:
+                        return frames, False
+                if not raw:
+                    frame_start = event_time
+                raw.append(data)
+                last_time = event_time
+        if raw:
+            close_frame()
+        return frames, max_chars is None or total <= max_chars
+
+    @app_commands.describe(
+        channel="The live terminal channel whose recording to replay",
+        since_minutes="Start the replay this many minutes ago",
+        duration_minutes="How many minutes to replay (defaults to everything since the start)",
+        speed="Playback speed multiplier, 0 attaches the whole range as a file instead"
+    )
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.command(name="replay", description="Replay a recorded live terminal session")
+    async def replay_terminal(
+        self,
+        interaction: discord.Interaction,
+        channel: discord.TextChannel,
+        since_minutes: float = 60.0,
+        duration_minutes: Optional[float] = None,
+        speed: app_commands.Range[float, 0.0, 100.0] = 1.0
+    ):
+        await interaction.response.defer()
+
+        start = time.time() - since_minutes * 60
+        end = start + duration_minutes * 60 if duration_minutes else time.time()
+        paths = self.find_recordings(channel.id, start, end)
+        if not paths:
+            await interaction.followup.send("No recordings found for this channel in that time range.")
+            return
+
+        terminal_data = self.active_terminals.get(channel.id)
+        if terminal_data and terminal_data.get('recorder'):
+            await terminal_data['recorder'].flush()  # Include what's still buffered
+
+        loop = asyncio.get_event_loop()
+        max_chars = None if speed == 0 else 25 * 1900
+        try:
+            frames, complete = await loop.run_in_executor(None, self.render_frames, paths, start, end, max_chars)
+        except Exception as e:
+            await interaction.followup.send(f"Failed to read the recording: {e}")
+            return
+
+        if not frames:
+            await interaction.followup.send("Nothing was recorded in that time range.")
+            return
+
+        if speed == 0 or not complete:
+            note = "" if complete else " The range is too long for a timed replay, narrow it down to replay it live."
+            replay_file = discord.File(
+                io.StringIO('\n'.join(text for _, text in frames)),
+                filename=f"replay_{channel.id}.txt"
+            )
+            await interaction.followup.send(f"Recorded output from {channel.mention} attached.{note}", file=replay_file)
+            return
+
+        await interaction.followup.send(f"Replaying {channel.mention} at {speed}x speed...")
+        previous = frames[0][0]
+        for frame_time, text in frames:
+            # Long idle gaps are capped so a replay doesn't stall
+            await asyncio.sleep(min((frame_time - previous) / speed, 10))
+            previous = frame_time
+            for i in range(0, len(text), 1900):
+                await interaction.channel.send(f"```\n{text[i:i + 1900]}\n```")
+        await interaction.channel.send("Replay finished.")
+
+    @app_commands.describe(
+        channel="The live terminal channel to search",
+        query="Words to look for, every word must appear on the line",
+        context="Lines of context to show around each match",
+        limit="Maximum number of matches to show"
+    )
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.command(name="search", description="Search the scrollback of a live terminal session")
+    async def search_terminal(
+        self,
+        interaction: discord.Interaction,
+        channel: discord.TextChannel,
+        query: str,
+        context: app_commands.Range[int, 0, 10] = 2,
+        limit: app_commands.Range[int, 1, 25] = 5
+    ):
+        await interaction.response.defer()
+
+        scrollback = self.scrollback.get(channel.id)
+        if scrollback is not None:
+            self.scrollback.move_to_end(channel.id)
+        if not scrollback or not scrollback.lines:
+            await interaction.followup.send("No scrollback recorded for this channel.")
+            return
+
+        started = time.perf_counter()
+        matches = scrollback.search(query, limit)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if not matches:
+            await interaction.followup.send(f"No lines matching `{query}` in {len(scrollback.lines)} lines ({elapsed:.1f} ms).")
+            return
+
+        embed = discord.Embed(
+            title=f"Scrollback matches for '{query[:100]}'",
+            description=f"{len(matches)} newest matches in {channel.mention}",
+            color=discord.Color.blue()
+        )
+        for seq in matches:
+            _, timestamp, _ = scrollback.get_line(seq)
+            lines = []
+            for context_seq in range(seq - context, seq + context + 1):
+                line = scrollback.get_line(context_seq)
+                if line:
+                    lines.append(f"{'>' if context_seq == seq else ' '} {line[2][:150]}")
+            block = '\n'.join(lines)[:1000]
+            embed.add_field(
+                name=f"Line {seq} • {discord.utils.format_dt(datetime.fromtimestamp(timestamp, tz=timezone.utc), 'T')}",
+                value=f"```\n{block}\n```",
+                inline=False
+            )
+        embed.set_footer(text=f"Searched {len(scrollback.lines)} lines in {elapsed:.1f} ms")
+        await interaction.followup.send(embed=embed)
+
     async def monitor_shell_output(self, channel: discord.TextChannel, shell):
         """Monitor and send shell output to the Discord channel."""
         try:
             while channel.id in self.active_terminals:
                 if shell.recv_ready():
                     terminal_data = self.active_terminals[channel.id]
-                    chunk = shell.recv(4096).decode('utf-8', errors='ignore')
+                    raw = shell.recv(4096)
+                    metrics.terminal_bytes.inc(len(raw), channel=channel.id, hostname=terminal_data['hostname'], direction="output")
+                    if terminal_data.get('recorder'):
+                        terminal_data['recorder'].record_output(raw)
+                    chunk = raw.decode('utf-8', errors='ignore')
                     terminal_data['output_buffer'] += chunk
                     
                     if '\n' in terminal_data['output_buffer'] or len(terminal_data['output_buffer']) > 1500:
                         cleaned_output = self.clean_terminal_output(terminal_data['output_buffer'])
+                        scrollback = self.scrollback_for(channel.id)
+                        for line in cleaned_output.splitlines():
+                            if line.strip():
+                                scrollback.add_line(line)
                         if cleaned_output.strip():
                             chunks = [cleaned_output[i:i + 1900] for i in range(0, len(cleaned_output), 1900)]
                             for chunk in chunks:
@@ -255,16 +647,7 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
 
     async def get_terminal_session_data(self, channel_id: int):
         """Fetch session data for reconnection."""
-        async with self.bot.db.acquire() as conn:
-            return await conn.fetchrow(
-                """SELECT lt.hostname, h.ip, h.username, h.password, 
-                        h.identification_file, h.port,
-                        lt.channel_id, lt.user_id
-                FROM live_terminals lt 
-                JOIN hosts h ON lt.user_id = h.user_id AND lt.hostname = h.hostname
-                WHERE lt.channel_id = $1 AND lt.is_active = true""",
-                str(channel_id)
-            )
+        return await self.terminals.session(channel_id)
 
     async def handle_disconnection(self, channel_id: int):
         """Handle disconnections by attempting to reconnect."""
@@ -294,59 +677,29 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
                                 await channel.send("Could not find active terminal session data.")
                                 break
                                 
-                            # Create temporary key file if needed
-                            temp_file_path = None
-                            try:
-                                if session['identification_file']:
-                                    temp_file_path = f"temp_{channel_id}.pem"
-                                    with open(temp_file_path, "w") as temp_file:
-                                        temp_file.write(session['identification_file'])
-                                
-                                # Create new SSH client
-                                new_client = paramiko.SSHClient()
-                                new_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                                
-                                connect_kwargs = {
-                                    'hostname': session['ip'],
-                                    'username': session['username'],
-                                    'port': session['port'] or 22,
-                                    'timeout': 10
-                                }
-                                
-                                if session['identification_file']:
-                                    connect_kwargs['key_filename'] = temp_file_path
-                                else:
-                                    connect_kwargs['password'] = session['password']
-                                    
-                                new_client.connect(**connect_kwargs)
-                                new_shell = new_client.invoke_shell()
-                                
-                                # Initialize terminal settings
-                                new_shell.send('export TERM=xterm\n')
-                                new_shell.send('set +o vi\n')
-                                new_shell.send('stty -echo\n')
-                                
-                                # Update terminal data
-                                terminal_data.update({
-                                    'shell': new_shell,
-                                    'client': new_client,
-                                    'output_buffer': '',
-                                    'user_id': session['user_id'],
-                                    'hostname': session['hostname']
-                                })
-                                
-                                await channel.send("Reconnected successfully.")
-                                self.bot.loop.create_task(self.monitor_shell_output(channel, new_shell))
-                                return
-                                
-                            finally:
-                                # Clean up temporary key file
-                                if temp_file_path and os.path.exists(temp_file_path):
-                                    try:
-                                        os.remove(temp_file_path)
-                                    except Exception:
-                                        pass
-                                        
+                            new_client = self.create_ssh_client(session)
+                            new_shell = new_client.invoke_shell()
+
+                            # Initialize terminal settings
+                            new_shell.send('export TERM=xterm\n')
+                            new_shell.send('set +o vi\n')
+                            new_shell.send('stty -echo\n')
+
+                            # Update terminal data, each connection gets its own recording segment
+                            await self.stop_recorder(terminal_data)
+                            terminal_data.update({
+                                'recorder': self.start_recorder(channel_id, session['hostname'], session['recording']),
+                                'shell': new_shell,
+                                'client': new_client,
+                                'output_buffer': '',
+                                'user_id': session['user_id'],
+                                'hostname': session['hostname']
+                            })
+
+                            await channel.send("Reconnected successfully.")
+                            self.bot.loop.create_task(self.monitor_shell_output(channel, new_shell))
+                            return
+
                         except Exception as e:
                             await channel.send(f"Reconnection attempt {attempt + 1} failed: {str(e)}")
                             await asyncio.sleep(2)
@@ -373,23 +726,36 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
         
         await interaction.followup.send("Terminal session has been stopped and cleaned up.")
 
+    def scrollback_for(self, channel_id: int) -> ScrollbackIndex:
+        """The channel's scrollback, created on its first output."""
+        scrollback = self.scrollback.get(channel_id)
+        if scrollback is None:
+            scrollback = self.scrollback[channel_id] = ScrollbackIndex(SCROLLBACK_MAX_LINES)
+            self.evict_scrollback()
+        else:
+            self.scrollback.move_to_end(channel_id)
+        return scrollback
+
+    def evict_scrollback(self):
+        """Drop the least recently used scrollbacks of stopped sessions beyond SCROLLBACK_KEPT_SESSIONS."""
+        stopped = [channel_id for channel_id in self.scrollback if channel_id not in self.active_terminals]
+        for channel_id in stopped[:max(0, len(stopped) - SCROLLBACK_KEPT_SESSIONS)]:
+            del self.scrollback[channel_id]
+
     async def delete_terminal(self, channel_id: int):
         """Clean up terminal session resources and remove the database entry."""
         if channel_id in self.active_terminals:
             try:
                 self.active_terminals[channel_id]['shell'].close()
                 self.active_terminals[channel_id]['client'].close()
+                await self.stop_recorder(self.active_terminals[channel_id])
                 
-                async with self.bot.db.acquire() as conn:
-                    await conn.execute(
-                        """DELETE FROM live_terminals 
-                           WHERE channel_id = $1""",
-                        str(channel_id)
-                    )
+                await self.terminals.delete(channel_id)
             except Exception as e:
                 print(f"Error during cleanup: {e}")
             finally:
                 del self.active_terminals[channel_id]
+                self.evict_scrollback()
 
     async def cleanup_terminal(self, channel_id: int):
         """Clean up terminal session resources and update database."""
@@ -403,19 +769,15 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
                         terminal_data['client'].close()
                 except Exception:
                     pass  # Ignore errors during closure
+                await self.stop_recorder(terminal_data)
                     
-                async with self.bot.db.acquire() as conn:
-                    await conn.execute(
-                        """UPDATE live_terminals 
-                        SET is_active = false 
-                        WHERE channel_id = $1""",
-                        str(channel_id)
-                    )
+                await self.terminals.deactivate(channel_id)
             except Exception as e:
                 print(f"Error during cleanup: {e}")
             finally:
                 if channel_id in self.active_terminals:
                     del self.active_terminals[channel_id]
+                self.evict_scrollback()
 
     @app_commands.describe(
         channel="The text channel to restart the inactive terminal session"
@@ -434,79 +796,43 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
             await interaction.followup.send("There's already an active terminal session in this channel.")
             return
 
-        async with self.bot.db.acquire() as conn:
-            try:
-                # Get the most recent inactive terminal session for this channel
-                terminal_data = await conn.fetchrow(
-                    """SELECT lt.hostname, h.ip, h.username, h.password, 
-                              h.identification_file, h.port
-                       FROM live_terminals lt
-                       JOIN hosts h ON lt.user_id = h.user_id AND lt.hostname = h.hostname
-                       WHERE lt.channel_id = $1 AND lt.is_active = false
-                       ORDER BY lt.created_at DESC
-                       LIMIT 1""",
-                    str(channel.id)
-                )
-
-                if not terminal_data:
-                    await interaction.followup.send("No previous terminal session found for this channel.")
-                    return
+        try:
+            # Get the most recent inactive terminal session for this channel
+            terminal_data = await self.terminals.session(channel.id, active=False)
+
+            if not terminal_data:
+                await interaction.followup.send("No previous terminal session found for this channel.")
+                return
+
+            # Update the terminal session to active
+            await self.terminals.reactivate(user_id, channel.id, terminal_data['hostname'], channel.guild.id)
 
-                # Update the terminal session to active
-                await conn.execute(
-                    """UPDATE live_terminals 
-                       SET is_active = true, user_id = $1
-                       WHERE channel_id = $2 AND hostname = $3""",
-                    user_id, str(channel.id), terminal_data['hostname']
-                )
-
-                # Create new SSH connection
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if terminal_data['identification_file']:
-                    temp_file_path = f"temp_{channel.id}.pem"
-                    with open(temp_file_path, "w") as temp_file:
-                        temp_file.write(terminal_data['identification_file'])
-                    client.connect(
-                        hostname=terminal_data['ip'],
-                        username=terminal_data['username'],
-                        port=terminal_data['port'] or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                    os.remove(temp_file_path)
-                else:
-                    client.connect(
-                        hostname=terminal_data['ip'],
-                        username=terminal_data['username'],
-                        password=terminal_data['password'],
-                        port=terminal_data['port'] or 22,
-                        timeout=10
-                    )
-
-                shell = client.invoke_shell()
-                shell.send('export TERM=xterm\n')
-                shell.send('set +o vi\n')
-                shell.send('stty -echo\n')
+            # Create new SSH connection
+            client = self.create_ssh_client(terminal_data)
+
+            shell = client.invoke_shell()
+            shell.send('export TERM=xterm\n')
+            shell.send('set +o vi\n')
+            shell.send('stty -echo\n')
                 
-                self.active_terminals[channel.id] = {
-                    'client': client,
-                    'shell': shell,
-                    'user_id': user_id,
-                    'output_buffer': '',
-                    'hostname': terminal_data['hostname']
-                }
-
-                self.bot.loop.create_task(self.monitor_shell_output(channel, shell))
-                await interaction.followup.send(
-                    f"Previous terminal session restarted in {channel.mention} "
-                    f"for host '{terminal_data['hostname']}'. You can now send commands directly in this channel."
-                )
+            self.active_terminals[channel.id] = {
+                'client': client,
+                'shell': shell,
+                'user_id': user_id,
+                'output_buffer': '',
+                'hostname': terminal_data['hostname'],
+                'recorder': self.start_recorder(channel.id, terminal_data['hostname'], terminal_data['recording'])
+            }
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred while restarting the terminal: {e}")
-                await self.cleanup_terminal(channel.id)
+            self.bot.loop.create_task(self.monitor_shell_output(channel, shell))
+            await interaction.followup.send(
+                f"Previous terminal session restarted in {channel.mention} "
+                f"for host '{terminal_data['hostname']}'. You can now send commands directly in this channel."
+            )
+
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred while restarting the terminal: {e}")
+            await self.cleanup_terminal(channel.id)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -528,6 +854,10 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
                     if command.startswith('^'):
                         command = self.handle_control_input(command)
                     terminal_data['shell'].send(command + '\n')
+                    metrics.terminal_bytes.inc(len(command) + 1, channel=channel_id, hostname=terminal_data['hostname'], direction="input")
+                    if terminal_data.get('recorder'):
+                        terminal_data['recorder'].record_input(command + '\n')
+                    await self.touch_terminal(channel_id, terminal_data)
                 except Exception as e:
                     if str(e) == "Socket is closed":
                         await message.channel.send(f"Socket closed while executing command use `/live_terminal restart` to restore session.")
@@ -535,6 +865,17 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
                         await message.channel.send(f"Error executing command: {e}")
                     await self.cleanup_terminal(channel_id)
 
+    async def touch_terminal(self, channel_id: int, terminal_data: Dict):
+        """Record that a terminal was used, so it's restored early after a restart. Throttled per terminal."""
+        now = time.monotonic()
+        if now - terminal_data.get('last_active_written', float('-inf')) < self.activity_interval:
+            return
+        terminal_data['last_active_written'] = now
+        try:
+            await self.terminals.touch(channel_id)
+        except Exception as e:
+            print(f"Failed to update terminal activity: {e}")
+
     def handle_control_input(self, command: str) -> str:
         """Convert control input notation to actual control characters."""
         control_mappings = {
@@ -550,23 +891,13 @@ class LiveTerminalCommand(commands.GroupCog, name="live-terminal"):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(LiveTerminalCommand(bot))
@@ -0,0 +1,78 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import List, Optional
+import asyncio
+import os
+from config import OUTPUT_STORE_HOURS
+from utils.output import CODECS, format_size, join_hint, list_stored_outputs, load_stored_output
+
+class OutputCommand(commands.GroupCog, name="output"):
+    """Command output too large to attach when it finished, kept on the bot's disk for a while."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.describe(
+        output_id="The stored output to fetch",
+        part="The part to send, each fits in one attachment"
+    )
+    @app_commands.command(name="get", description="Fetch a part of a stored command output")
+    async def get_output(self, interaction: discord.Interaction, output_id: str, part: Optional[app_commands.Range[int, 1]] = 1):
+        await interaction.response.defer()
+
+        meta = await asyncio.get_running_loop().run_in_executor(None, load_stored_output, output_id)
+        if not meta or meta['user_id'] != str(interaction.user.id):
+            await interaction.followup.send(f"No stored output with id `{output_id}`, it may have expired after {OUTPUT_STORE_HOURS} hours.")
+            return
+
+        parts = meta['parts']
+        if part > len(parts):
+            await interaction.followup.send(f"Output `{output_id}` only has {len(parts)} parts.")
+            return
+
+        path = os.path.join(meta['directory'], parts[part - 1])
+        text = f"Part {part} of {len(parts)} of output `{output_id}`."
+        if part == 1 and len(parts) > 1:
+            text += f" Fetch the others with `part`, then {join_hint(parts)}."
+        try:
+            await interaction.followup.send(text, file=discord.File(path))
+        except discord.errors.HTTPException as e:
+            print(f"Failed to send stored output: {e}")
+            await interaction.followup.send("The part is too large to upload here, fetch it from the server it was stored on.")
+
+    @app_commands.command(name="list", description="List your stored command outputs")
+    async def list_outputs(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+
+        outputs = await asyncio.get_running_loop().run_in_executor(None, list_stored_outputs, str(interaction.user.id))
+        if not outputs:
+            await interaction.followup.send("You have no stored outputs.")
+            return
+
+        embed = discord.Embed(title="Stored Outputs", color=discord.Color.blue())
+        for meta in outputs[:25]:
+            codec = f", {CODECS[meta['codec']]}" if meta['codec'] else ""
+            embed.add_field(
+                name=f"`{meta['id']}` • {meta['filename']}",
+                value=f"{format_size(meta['size'])} in {len(meta['parts'])} parts{codec}\nStored <t:{int(meta['created_at'])}:R>",
+                inline=False
+            )
+        embed.set_footer(text=f"Outputs are kept for {OUTPUT_STORE_HOURS} hours")
+        await interaction.followup.send(embed=embed)
+
+    @get_output.autocomplete("output_id")
+    async def output_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        outputs = await asyncio.get_running_loop().run_in_executor(None, list_stored_outputs, str(interaction.user.id))
+        return [
+            app_commands.Choice(name=f"{meta['id']} {meta['filename']} ({format_size(meta['size'])})", value=meta['id'])
+            for meta in outputs
+            if meta['id'].startswith(current)
+        ][:25]
+
+async def setup(bot):
+    await bot.add_cog(OutputCommand(bot))
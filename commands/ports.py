@@ -1,15 +1,16 @@
 import discord
 from discord.ext import commands
-import paramiko
 from discord import app_commands
-import os
 import re
 from typing import List, Dict
 from collections import defaultdict
+from utils.repository import HostRepository
+from utils.ssh import connect_client
 
 class PortsCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     def strip_ansi_codes(self, text: str) -> str:
         """Remove ANSI escape sequences from the text."""
@@ -95,113 +96,82 @@ class PortsCommand(commands.Cog):
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while checking ports on host '{hostname}'. Please try again later.")
+            return
+
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
+
+        client = None
+        try:
+            # SSH connection setup
+            client = connect_client(host_data)
+
+            # Execute command to get ports info
+            stdin, stdout, stderr = client.exec_command(self.get_ports_command())
+            output = self.strip_ansi_codes(stdout.read().decode())
+
+            port_info = self.parse_port_info(output)
+
+            embed = discord.Embed(
+                title=f"🔍 Open Ports on {hostname}",
+                color=discord.Color.green()
+            )
+
+            tcp_description = ""
+            for port in self.safe_port_sort(port_info['tcp_ports']):
+                if port.strip():  # Only process non-empty ports
+                    service = self.get_common_port_service(port)
+                    process = port_info['processes'].get(port, 'N/A')
+                    tcp_description += f"🔐 Port {port} ({service})\n└─ Process: {process}\n"
+
+            if tcp_description:
+                embed.add_field(
+                    name="📡 TCP Ports",
+                    value=f"```{tcp_description}```",
+                    inline=False
+                )
+            else:
+                embed.add_field(
+                    name="📡 TCP Ports",
+                    value="```No TCP ports found```",
+                    inline=False
                 )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while checking ports on host '{hostname}'. Please try again later.")
-                return
-
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
-
-            ip, username, password, identification_file, port = host_data
-
-            # Temporary file creation for SSH key if needed
-            temp_file_path = f"temp.pem"
-            if identification_file:
-                with open(temp_file_path, "w") as temp_file:
-                    temp_file.write(identification_file)
 
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
-
-                # Execute command to get ports info
-                stdin, stdout, stderr = client.exec_command(self.get_ports_command())
-                output = self.strip_ansi_codes(stdout.read().decode())
-
-                port_info = self.parse_port_info(output)
-
-                embed = discord.Embed(
-                    title=f"🔍 Open Ports on {hostname}",
-                    color=discord.Color.green()
+            udp_description = ""
+            for port in self.safe_port_sort(port_info['udp_ports']):
+                if port.strip():  # Only process non-empty ports
+                    service = self.get_common_port_service(port)
+                    process = port_info['processes'].get(port, 'N/A')
+                    udp_description += f"🔓 Port {port} ({service})\n└─ Process: {process}\n"
+
+            if udp_description:
+                embed.add_field(
+                    name="📡 UDP Ports",
+                    value=f"```{udp_description}```",
+                    inline=False
                 )
+            else:
+                embed.add_field(
+                    name="📡 UDP Ports",
+                    value="```No UDP ports found```",
+                    inline=False
+                )
+
+            embed.set_footer(text="🔒 Shows listening ports and associated processes")
+            await interaction.followup.send(embed=embed)
 
-                tcp_description = ""
-                for port in self.safe_port_sort(port_info['tcp_ports']):
-                    if port.strip():  # Only process non-empty ports
-                        service = self.get_common_port_service(port)
-                        process = port_info['processes'].get(port, 'N/A')
-                        tcp_description += f"🔐 Port {port} ({service})\n└─ Process: {process}\n"
-
-                if tcp_description:
-                    embed.add_field(
-                        name="📡 TCP Ports",
-                        value=f"```{tcp_description}```",
-                        inline=False
-                    )
-                else:
-                    embed.add_field(
-                        name="📡 TCP Ports",
-                        value="```No TCP ports found```",
-                        inline=False
-                    )
-
-                udp_description = ""
-                for port in self.safe_port_sort(port_info['udp_ports']):
-                    if port.strip():  # Only process non-empty ports
-                        service = self.get_common_port_service(port)
-                        process = port_info['processes'].get(port, 'N/A')
-                        udp_description += f"🔓 Port {port} ({service})\n└─ Process: {process}\n"
-
-                if udp_description:
-                    embed.add_field(
-                        name="📡 UDP Ports",
-                        value=f"```{udp_description}```",
-                        inline=False
-                    )
-                else:
-                    embed.add_field(
-                        name="📡 UDP Ports",
-                        value="```No UDP ports found```",
-                        inline=False
-                    )
-
-                embed.set_footer(text="🔒 Shows listening ports and associated processes")
-                await interaction.followup.send(embed=embed)
-
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-            finally:
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+        finally:
+            if client is not None:
                 client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
 
     @ports.autocomplete("hostname")
     async def host_autocomplete(
@@ -209,23 +179,13 @@ class PortsCommand(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
-
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(PortsCommand(bot))
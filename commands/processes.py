@@ -1,11 +1,11 @@
 import discord
 from discord.ext import commands
-import paramiko
 from discord import app_commands
-import os
 from typing import List, Tuple
 import re
 from discord.ui import Button, View
+from utils.repository import HostRepository
+from utils.ssh import connect_client
 
 class ProcessPaginationView(View):
     def __init__(self, processes: List[Tuple], page_size: int, sort_type: str, hostname: str):
@@ -100,6 +100,7 @@ class ProcessPaginationView(View):
 class ProcessesCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     def strip_ansi_codes(self, text: str) -> str:
         ansi_escape = re.compile(r'\x1B\[[0-?9;]*[mK]')
@@ -160,95 +161,64 @@ class ProcessesCommand(commands.Cog):
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while getting processes from host '{hostname}'. Please try again later.")
-                return
-
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
-
-            ip, username, password, identification_file, port = host_data
-
-            # Temporary file creation for SSH key
-            temp_file_path = f"temp.pem"
-            if identification_file:
-                with open(temp_file_path, "w") as temp_file:
-                    temp_file.write(identification_file)
-
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while getting processes from host '{hostname}'. Please try again later.")
+            return
 
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
 
-                # Not yet fully Implemented 
-                if "Network" in sort:
-                    cmd = "ps aux"  # Get all processes
-                    stdin, stdout, stderr = client.exec_command(cmd)
-                    output = self.strip_ansi_codes(stdout.read().decode())
-                    processes = self.parse_ps_output(output)
+        client = None
+        try:
+            # SSH connection setup
+            client = connect_client(host_data)
+
+            # Not yet fully Implemented 
+            if "Network" in sort:
+                cmd = "ps aux"  # Get all processes
+                stdin, stdout, stderr = client.exec_command(cmd)
+                output = self.strip_ansi_codes(stdout.read().decode())
+                processes = self.parse_ps_output(output)
                     
-                    # Get network usage for each process and include it in processes
-                    processes_with_network = []
-                    for pid, cpu, mem, command, user in processes[:30]:
-                        network = self.get_network_usage_by_pid(client, user)  # Get the network usage
-                        processes_with_network.append((pid, cpu, mem, command, user, network if network else "N/A"))
+                # Get network usage for each process and include it in processes
+                processes_with_network = []
+                for pid, cpu, mem, command, user in processes[:30]:
+                    network = self.get_network_usage_by_pid(client, user)  # Get the network usage
+                    processes_with_network.append((pid, cpu, mem, command, user, network if network else "N/A"))
                     
-                    # Sort by network usage
-                    processes_with_network.sort(
-                        key=lambda x: float(x[5].rstrip('MB')) if x[5] != 'N/A' else -1,
-                        reverse="Hi - Lo" in sort
-                    )
+                # Sort by network usage
+                processes_with_network.sort(
+                    key=lambda x: float(x[5].rstrip('MB')) if x[5] != 'N/A' else -1,
+                    reverse="Hi - Lo" in sort
+                )
                     
-                    processes = processes_with_network
-                else:
-                    cmd = "ps aux --sort=-%cpu" if "CPU" in sort else "ps aux --sort=-%mem"
-                    stdin, stdout, stderr = client.exec_command(cmd)
-                    output = self.strip_ansi_codes(stdout.read().decode())
-                    processes = self.parse_ps_output(output)[:30]  # Get top 30 for pagination
-
-                    # Add a default "N/A" for network usage when not sorting by it
-                    for i in range(len(processes)):
-                        processes[i] += ("N/A",)  # Append N/A for network
-
-                view = ProcessPaginationView(processes, page_size=5, sort_type=sort, hostname=hostname)
-                embed = view.get_page_content()
+                processes = processes_with_network
+            else:
+                cmd = "ps aux --sort=-%cpu" if "CPU" in sort else "ps aux --sort=-%mem"
+                stdin, stdout, stderr = client.exec_command(cmd)
+                output = self.strip_ansi_codes(stdout.read().decode())
+                processes = self.parse_ps_output(output)[:30]  # Get top 30 for pagination
+
+                # Add a default "N/A" for network usage when not sorting by it
+                for i in range(len(processes)):
+                    processes[i] += ("N/A",)  # Append N/A for network
+
+            view = ProcessPaginationView(processes, page_size=5, sort_type=sort, hostname=hostname)
+            embed = view.get_page_content()
                 
-                message = await interaction.followup.send(embed=embed, view=view)
-                view.message = message
+            message = await interaction.followup.send(embed=embed, view=view)
+            view.message = message
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-            finally:
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+        finally:
+            if client is not None:
                 client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
 
     @processes.autocomplete("hostname")
     async def host_autocomplete(
@@ -256,23 +226,13 @@ class ProcessesCommand(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(ProcessesCommand(bot))
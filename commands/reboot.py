@@ -1,127 +1,271 @@
-import discord 
+import discord
 from discord.ext import commands
-import paramiko
 from discord import app_commands
-import os
 import asyncio
-from typing import List
+import random
+import time
+from typing import List, Optional
+from utils.repository import HostRepository
+from utils.ssh import connect_client
 
 class RebootCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
+        self.default_poll_interval = 1.0  # First delay between reachability probes, in seconds
+        self.max_poll_interval = 15.0  # Upper bound for the exponential backoff
+        self.default_timeout = 300  # How long to wait for the host to come back, in seconds
+        self.probe_timeout = 3  # Timeout for a single TCP/banner probe
 
-    @app_commands.describe(hostname="The hostname of the host to execute the command on")
+    @app_commands.describe(
+        hostname="The hostname of the host to execute the command on",
+        wait_for_ready="Wait until systemd reports the system as running before reporting success"
+    )
     @app_commands.command(name="reboot", description="Reboot a selected host")
     async def reboot(
         self,
         interaction: discord.Interaction,
-        hostname: str
+        hostname: str,
+        wait_for_ready: Optional[bool] = False
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-            except Exception as e:
-                print(f"Database error: {e}")
-                await self.send_embed(interaction, "Error", "An error occurred while rebooting the host. Please try again later.", discord.Color.red())
-                return
-
-            if not host_data:
-                await self.send_embed(interaction, "Host Not Found", "Host not found. Check your configured hosts.", discord.Color.orange())
-                return
-
-            ip, username, password, identification_file, port = host_data
-
-            # Temporary file creation
-            temp_file_path = "temp.pem"
-            with open(temp_file_path, "w") as temp_file:
-                temp_file.write(identification_file)
-
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        password=password,
-                        timeout=10
-                    )
-
-                # Execute command
-                stdin, stdout, stderr = client.exec_command("sudo reboot")
-                error = stderr.read().decode("utf-8")
-
-                if error:
-                    await self.send_embed(interaction, "Reboot Error", f"An error occurred while rebooting host '{hostname}': {error}", discord.Color.red())
-                else:
-                    await self.send_embed(interaction, "Rebooting", f"🔄 Rebooting host '{hostname}'... Please wait for reconnection.", discord.Color.blue())
-
-                success = await self.try_reconnect(interaction, ip, username, password, identification_file, port)
-
-                if success:
-                    await self.send_embed(interaction, "Reboot Successful", f"✅ Host '{hostname}' has successfully restarted and is back online!", discord.Color.green())
-                else:
-                    await self.send_embed(interaction, "Reconnect Failed", f"❌ Failed to reconnect to '{hostname}' after 60 seconds.", discord.Color.red())
-
-            except Exception as e:
-                print(f"SSH error: {e}")
-                await self.send_embed(interaction, "Error", f"An error occurred while rebooting host '{hostname}'. Please try again later.", discord.Color.red())
-            finally:
-                client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-
-    async def try_reconnect(self, interaction, ip, username, password, identification_file, port):
-        """Attempt to reconnect to the VM for 60 seconds."""
-        temp_file_path = "temp.pem"
-        with open(temp_file_path, "w") as temp_file:
-            temp_file.write(identification_file)
-        for _ in range(6):
-            await asyncio.sleep(10)
-            try:
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        password=password,
-                        timeout=10
-                    )
-                client.close()
-                return True 
-            except Exception:
-                continue 
-
-        return False
+
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"Database error: {e}")
+            await self.send_embed(interaction, "Error", "An error occurred while rebooting the host. Please try again later.", discord.Color.red())
+            return
+
+        if not host_data:
+            await self.send_embed(interaction, "Host Not Found", "Host not found. Check your configured hosts.", discord.Color.orange())
+            return
+
+        async def on_rebooting():
+            await self.send_embed(interaction, "Rebooting", f"🔄 Rebooting host '{hostname}'... Please wait for reconnection.", discord.Color.blue())
+
+        status, detail = await self.reboot_host(host_data, wait_for_ready, on_rebooting)
+
+        if status == "online":
+            await self.send_embed(interaction, "Reboot Successful", f"✅ Host '{hostname}' has successfully restarted and is back online after {detail}!", discord.Color.green())
+        elif status == "unverified":
+            await self.send_embed(interaction, "Reboot Unverified", f"⚠️ Host '{hostname}' stayed reachable for {detail} and its boot id couldn't be read, so the reboot couldn't be confirmed.", discord.Color.orange())
+        elif status == "timeout":
+            await self.send_embed(interaction, "Reconnect Failed", f"❌ Failed to reconnect to '{hostname}' after {detail}.", discord.Color.red())
+        elif status == "error":
+            await self.send_embed(interaction, "Reboot Error", f"An error occurred while rebooting host '{hostname}': {detail}", discord.Color.red())
+        else:
+            await self.send_embed(interaction, "Error", f"An error occurred while rebooting host '{hostname}'. Please try again later.", discord.Color.red())
+
+    async def reboot_host(self, host_data, wait_for_ready: bool = False, on_rebooting=None):
+        """Reboot a single host and wait for it to come back.
+
+        Returns a (status, detail) tuple where status is one of "online", "unverified", "timeout", "error" or "failed".
+        """
+        try:
+            boot_id, error = await self.issue_reboot(host_data)
+        except Exception as e:
+            print(f"SSH error: {e}")
+            return "failed", str(e)
+
+        if error:
+            return "error", error.strip()
+
+        if on_rebooting:
+            await on_rebooting()
+
+        status, elapsed = await self.try_reconnect(host_data, boot_id, wait_for_ready)
+        if status == "online":
+            return "online", f"{elapsed:.0f} seconds"
+        return status, f"{host_data['reboot_timeout'] or self.default_timeout} seconds"
+
+    @app_commands.describe(
+        group="The host group to reboot",
+        max_in_flight="How many hosts to reboot at the same time in each wave",
+        health_gate="What a host must pass before it counts as back online"
+    )
+    @app_commands.choices(health_gate=[
+        app_commands.Choice(name="SSH reachable", value="ssh"),
+        app_commands.Choice(name="System running (systemctl is-system-running)", value="ready")
+    ])
+    @app_commands.command(name="rolling-reboot", description="Reboot every host in a group in waves, halting on failures")
+    async def rolling_reboot(
+        self,
+        interaction: discord.Interaction,
+        group: str,
+        max_in_flight: app_commands.Range[int, 1, 25] = 1,
+        health_gate: str = "ssh"
+    ):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+
+        try:
+            hosts = await self.hosts.in_group(user_id, group)
+        except Exception as e:
+            print(f"Database error: {e}")
+            await self.send_embed(interaction, "Error", "An error occurred while loading the host group. Please try again later.", discord.Color.red())
+            return
+
+        if not hosts:
+            await self.send_embed(interaction, "Group Not Found", f"No hosts found in group '{group}'.", discord.Color.orange())
+            return
+
+        states = {host['hostname']: ("⏳", "Pending") for host in hosts}
+        waves = [hosts[i:i + max_in_flight] for i in range(0, len(hosts), max_in_flight)]
+        progress = {"wave": 0, "finished": False, "halted": False}
+
+        message = await interaction.followup.send(embed=self.rolling_embed(group, states, progress, len(waves)))
+
+        async def refresh_embed():
+            # Edits are throttled so a big wave doesn't hit the rate limit
+            while not progress["finished"]:
+                await asyncio.sleep(2)
+                try:
+                    await message.edit(embed=self.rolling_embed(group, states, progress, len(waves)))
+                except discord.errors.HTTPException as e:
+                    print(f"Failed to update rolling reboot embed: {e}")
+
+        async def reboot_one(host):
+            hostname = host['hostname']
+            states[hostname] = ("🔌", "Sending reboot")
+
+            async def on_rebooting():
+                states[hostname] = ("🔄", "Waiting for host to come back")
+
+            status, detail = await self.reboot_host(host, health_gate == "ready", on_rebooting)
+            if status == "online":
+                states[hostname] = ("✅", f"Back online after {detail}")
+            elif status == "unverified":
+                states[hostname] = ("⚠️", f"Stayed reachable, reboot not confirmed within {detail}")
+            elif status == "timeout":
+                states[hostname] = ("❌", f"Did not come back within {detail}")
+            else:
+                states[hostname] = ("❌", f"Reboot failed: {detail[:100]}")
+            return status == "online"
+
+        refresher = asyncio.create_task(refresh_embed())
+        try:
+            for index, wave in enumerate(waves, start=1):
+                progress["wave"] = index
+                results = await asyncio.gather(*(reboot_one(host) for host in wave))
+                if not all(results):
+                    progress["halted"] = True
+                    for host in hosts:
+                        if states[host['hostname']][1] == "Pending":
+                            states[host['hostname']] = ("⏸️", "Skipped (rollout halted)")
+                    break
+        finally:
+            progress["finished"] = True
+            refresher.cancel()
+
+        await message.edit(embed=self.rolling_embed(group, states, progress, len(waves)))
+
+    def rolling_embed(self, group: str, states: dict, progress: dict, total_waves: int) -> discord.Embed:
+        """Build the progress embed for a rolling reboot."""
+        if progress["halted"]:
+            title, color = f"Rolling Reboot Halted: {group}", discord.Color.red()
+        elif progress["finished"]:
+            title, color = f"Rolling Reboot Complete: {group}", discord.Color.green()
+        else:
+            title, color = f"Rolling Reboot: {group}", discord.Color.blue()
+
+        done = sum(1 for emoji, _ in states.values() if emoji == "✅")
+        lines = [f"{emoji} **{hostname}**: {text}" for hostname, (emoji, text) in states.items()]
+        description = "\n".join(lines)
+        if len(description) > 3900:
+            description = description[:3900] + "\n..."
+
+        embed = discord.Embed(title=title, description=description, color=color)
+        embed.set_footer(text=f"Wave {progress['wave']}/{total_waves} • {done}/{len(states)} hosts back online")
+        return embed
+
+    def run_reboot(self, host_data):
+        """Record the current boot id and send the reboot command. Returns (boot_id, error)."""
+        client = connect_client(host_data)
+        try:
+            stdin, stdout, stderr = client.exec_command("cat /proc/sys/kernel/random/boot_id")
+            boot_id = stdout.read().decode("utf-8").strip()
+
+            stdin, stdout, stderr = client.exec_command("sudo reboot")
+            error = stderr.read().decode("utf-8")
+            return boot_id, error
+        finally:
+            client.close()
+
+    async def issue_reboot(self, host_data):
+        return await self.bot.loop.run_in_executor(None, self.run_reboot, host_data)
+
+    async def probe_ssh_banner(self, ip: str, port: int) -> bool:
+        """Cheap reachability check: open a TCP connection and wait for the SSH identification banner."""
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout=self.probe_timeout)
+            banner = await asyncio.wait_for(reader.readline(), timeout=self.probe_timeout)
+            return banner.startswith(b"SSH-")
+        except (OSError, asyncio.TimeoutError):
+            return False
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def check_session(self, host_data, old_boot_id: str, wait_for_ready: bool):
+        """Open a full session once the banner is back. Returns True when the host has rebooted and is ready."""
+        client = connect_client(host_data)
+        try:
+            stdin, stdout, stderr = client.exec_command("cat /proc/sys/kernel/random/boot_id")
+            boot_id = stdout.read().decode("utf-8").strip()
+            if old_boot_id and boot_id == old_boot_id:
+                return False  # sshd is still answering from before the reboot
+
+            if wait_for_ready:
+                stdin, stdout, stderr = client.exec_command("systemctl is-system-running")
+                state = stdout.read().decode("utf-8").strip()
+                return state in ("running", "degraded")
+            return True
+        finally:
+            client.close()
+
+    async def try_reconnect(self, host_data, old_boot_id: str = "", wait_for_ready: bool = False):
+        """Poll the host with banner probes and exponential backoff until it is back or the deadline passes.
+
+        Without the old boot id a session can't tell the new kernel from the old one, so the banner has
+        to disappear first and only its return counts. Returns (status, elapsed_seconds) where status is
+        "online", "timeout", or "unverified" when the host never went away.
+        """
+        ip = host_data['ip']
+        port = host_data['port'] or 22
+        poll_interval = host_data['reboot_poll_interval'] or self.default_poll_interval
+        timeout = host_data['reboot_timeout'] or self.default_timeout
+
+        started = time.monotonic()
+        deadline = started + timeout
+        delay = poll_interval
+        went_down = bool(old_boot_id)  # With a boot id check_session recognises the old kernel itself
+        reachable = False
+
+        while time.monotonic() < deadline:
+            # Equal jitter keeps hosts rebooted together from probing in lockstep
+            await asyncio.sleep(min(delay / 2 + random.uniform(0, delay / 2), max(0, deadline - time.monotonic())))
+
+            reachable = await self.probe_ssh_banner(ip, port)
+            if not reachable:
+                went_down = True
+            elif went_down:
+                try:
+                    ready = await self.bot.loop.run_in_executor(None, self.check_session, host_data, old_boot_id, wait_for_ready)
+                    if ready:
+                        return "online", time.monotonic() - started
+                except Exception:
+                    pass  # Banner is up but auth/session isn't yet, keep polling
+
+            if went_down:
+                delay = min(delay * 2, self.max_poll_interval)
+            # Until the banner has gone, keep probing often enough not to miss a quick reboot
+
+        if reachable and not went_down:
+            return "unverified", time.monotonic() - started
+        return "timeout", time.monotonic() - started
 
     async def send_embed(self, interaction: discord.Interaction, title: str, description: str, color: discord.Color):
         """Sends an embed message to the interaction channel."""
@@ -130,19 +274,23 @@ class RebootCommand(commands.Cog):
 
     @reboot.autocomplete("hostname")
     async def reboot_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-        async with db.acquire() as conn:
-            try:
-                hostnames = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1",
-                    user_id
-                )
-            except Exception as e:
-                print(f"Database error: {e}")
-                return []
-
-        return [app_commands.Choice(name=hostname["hostname"], value=hostname["hostname"]) for hostname in hostnames]
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
+
+    @rolling_reboot.autocomplete("group")
+    async def group_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        try:
+            groups = await self.hosts.groups(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+        return [app_commands.Choice(name=group, value=group) for group in groups]
 
 async def setup(bot):
     await bot.add_cog(RebootCommand(bot))
@@ -2,10 +2,12 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from typing import List
+from utils.repository import HostRepository
 
 class RemoveHostCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     @app_commands.describe(hostname="The hostname of the host to remove")
     @app_commands.command(name="remove-host", description="Remove an existing host")
@@ -16,21 +18,15 @@ class RemoveHostCommand(commands.Cog):
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
-        async with db.acquire() as conn:
-            try:
-                result = await conn.execute(
-                    """DELETE FROM hosts WHERE user_id = $1 AND hostname = $2""",
-                    user_id, hostname
-                )
-                if result == 'DELETE 0':
-                    await interaction.followup.send(f"Host '{hostname}' not found.")
-                else:
-                    await interaction.followup.send(f"Host '{hostname}' removed successfully.")
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while removing host '{hostname}'. Please try again later.")
+        try:
+            if await self.hosts.remove(user_id, hostname):
+                await interaction.followup.send(f"Host '{hostname}' removed successfully.")
+            else:
+                await interaction.followup.send(f"Host '{hostname}' not found.")
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while removing host '{hostname}'. Please try again later.")
     
     @remove_host.autocomplete("hostname")
     async def host_autocomplete(
@@ -38,23 +34,13 @@ class RemoveHostCommand(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(RemoveHostCommand(bot))
\ No newline at end of file
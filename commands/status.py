@@ -1,14 +1,16 @@
 import discord
 from discord.ext import commands
-import paramiko
 from discord import app_commands
-import os
 import re
 from typing import List
+from utils.tracing import span
+from utils.repository import HostRepository
+from utils.ssh import connect_client
 
 class StatusCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     def strip_ansi_codes(self, text: str) -> str:
         """Remove ANSI escape sequences from the text."""
@@ -86,123 +88,101 @@ class StatusCommand(commands.Cog):
         interaction: discord.Interaction,
         hostname: str
     ):
-        await interaction.response.defer()
+        with span("discord.defer"):
+            await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while getting status from host '{hostname}'. Please try again later.")
-                return
-
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
+        try:
+            with span("db.host_lookup"):
+                host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while getting status from host '{hostname}'. Please try again later.")
+            return
 
-            ip, username, password, identification_file, port = host_data
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
 
-            # Temporary file creation for SSH key
-            temp_file_path = f"temp.pem"
-            if identification_file:
-                with open(temp_file_path, "w") as temp_file:
-                    temp_file.write(identification_file)
+        client = None
+        try:
+            # SSH connection setup
+            with span("ssh.connect", ip=host_data['ip']):
+                client = connect_client(host_data)
 
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
-
-                # Get CPU info
+            # Get CPU info
+            with span("ssh.exec", step="cpu_info"):
                 stdin, stdout, stderr = client.exec_command('cat /proc/cpuinfo')
                 cpu_info = self.strip_ansi_codes(stdout.read().decode())
-                cpu_name = self.parse_cpu_info(cpu_info)
+            cpu_name = self.parse_cpu_info(cpu_info)
 
-                # Get CPU usage with fallback
+            # Get CPU usage with fallback
+            with span("ssh.exec", step="cpu_usage"):
                 cpu_usage = self.get_cpu_usage(client)
 
-                # Get memory info
+            # Get memory info
+            with span("ssh.exec", step="memory"):
                 stdin, stdout, stderr = client.exec_command("free | grep Mem:")
                 mem_output = self.strip_ansi_codes(stdout.read().decode())
-                try:
-                    mem_values = mem_output.split()
-                    total_kb = int(mem_values[1])
-                    used_kb = int(mem_values[2])
-                    memory_usage = self.format_memory(total_kb, used_kb)
-                except (IndexError, ValueError):
-                    memory_usage = "N/A"
-
-                # Get uptime
+            try:
+                mem_values = mem_output.split()
+                total_kb = int(mem_values[1])
+                used_kb = int(mem_values[2])
+                memory_usage = self.format_memory(total_kb, used_kb)
+            except (IndexError, ValueError):
+                memory_usage = "N/A"
+
+            # Get uptime
+            with span("ssh.exec", step="uptime"):
                 stdin, stdout, stderr = client.exec_command('cat /proc/uptime')
                 uptime_output = self.strip_ansi_codes(stdout.read().decode())
-                try:
-                    uptime_seconds = float(uptime_output.split()[0])
-                    uptime = self.format_uptime(uptime_seconds)
-                except (IndexError, ValueError):
-                    uptime = "N/A"
+            try:
+                uptime_seconds = float(uptime_output.split()[0])
+                uptime = self.format_uptime(uptime_seconds)
+            except (IndexError, ValueError):
+                uptime = "N/A"
 
-                # Get network usage with fallback
+            # Get network usage with fallback
+            with span("ssh.exec", step="network"):
                 network_usage = self.get_network_usage(client)
 
-                embed = discord.Embed(
-                    title=f"📊 System Status for {hostname}",
-                    color=discord.Color.blue()
-                )
-
-                embed.add_field(
-                    name="💻 CPU",
-                    value=f"**Model:** {cpu_name}\n**Usage:** {cpu_usage}",
-                    inline=False
-                )
-
-                embed.add_field(
-                    name="🧮 Memory Usage",
-                    value=memory_usage,
-                    inline=True
-                )
-
-                embed.add_field(
-                    name="⏰ Uptime",
-                    value=uptime,
-                    inline=True
-                )
-
-                embed.add_field(
-                    name="🌐 Network Usage",
-                    value=network_usage,
-                    inline=True
-                )
-
+            embed = discord.Embed(
+                title=f"📊 System Status for {hostname}",
+                color=discord.Color.blue()
+            )
+
+            embed.add_field(
+                name="💻 CPU",
+                value=f"**Model:** {cpu_name}\n**Usage:** {cpu_usage}",
+                inline=False
+            )
+
+            embed.add_field(
+                name="🧮 Memory Usage",
+                value=memory_usage,
+                inline=True
+            )
+
+            embed.add_field(
+                name="⏰ Uptime",
+                value=uptime,
+                inline=True
+            )
+
+            embed.add_field(
+                name="🌐 Network Usage",
+                value=network_usage,
+                inline=True
+            )
+
+            with span("discord.followup"):
                 await interaction.followup.send(embed=embed)
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-            finally:
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+        finally:
+            if client is not None:
                 client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
 
     @status.autocomplete("hostname")
     async def host_autocomplete(
@@ -210,23 +190,13 @@ class StatusCommand(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
-
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(StatusCommand(bot))
\ No newline at end of file
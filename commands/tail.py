@@ -0,0 +1,478 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import shlex
+import time
+from config import TAIL_POLL_INTERVAL, TAIL_FLUSH_INTERVAL, TAIL_MAX_MESSAGES, TAIL_ROTATION_CHECK, TAIL_START_BYTES
+from utils.output import format_size
+from utils.repository import HostRepository, TailRepository
+from utils.ssh import connect_client
+
+MESSAGE_CHARS = 1900  # Text per message, leaves room for the code block around it
+
+class CoalescingSender:
+    """Collects new bytes of a file and sends them to a channel in as few messages as possible.
+
+    Everything that arrives between two flushes goes out together, packed into code blocks. Only
+    whole lines are sent, a trailing partial line waits for the next flush unless it's been
+    waiting for a whole flush already. At most max_messages go out per flush, older text beyond
+    that is dropped and replaced by a note saying how much was skipped.
+    """
+
+    def __init__(self, channel, max_messages: int):
+        self.channel = channel
+        self.max_messages = max_messages
+        self.limit = max_messages * MESSAGE_CHARS  # Bytes worth reading per flush, the rest would be dropped anyway
+        self.pending = bytearray()
+        self.skipped = 0
+        self.held_since_flush = False
+
+    @property
+    def held(self) -> int:
+        """Bytes read but not sent yet, the saved offset stays behind them."""
+        return len(self.pending)
+
+    def add(self, data: bytes):
+        self.pending += data
+        if len(self.pending) > self.limit * 2:
+            # Keep memory bounded when the file grows faster than Discord lets us send
+            cut = len(self.pending) - self.limit
+            self.skipped += cut
+            del self.pending[:cut]
+
+    def skip(self, size: int):
+        self.skipped += size
+
+    def end_of_file(self):
+        """The file was rotated, a partial last line won't be continued."""
+        if self.pending and not self.pending.endswith(b"\n"):
+            self.pending += b"\n"
+
+    def drop_partial(self):
+        """Forget a partial last line, it will be read again from the saved offset."""
+        newline = self.pending.rfind(b"\n")
+        del self.pending[newline + 1:]
+
+    def chunks(self, text: str) -> List[str]:
+        chunks = []
+        current = ""
+        for line in text.splitlines():
+            while len(line) > MESSAGE_CHARS:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(line[:MESSAGE_CHARS])
+                line = line[MESSAGE_CHARS:]
+            if current and len(current) + len(line) + 1 > MESSAGE_CHARS:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def flush(self, final: bool = False):
+        newline = self.pending.rfind(b"\n")
+        if final or self.held_since_flush:
+            ready = len(self.pending)
+        else:
+            ready = newline + 1
+        data = bytes(self.pending[:ready])
+        del self.pending[:ready]
+        self.held_since_flush = bool(self.pending)
+
+        if len(data) > self.limit:
+            cut = len(data) - self.limit
+            aligned = data.find(b"\n", cut)
+            cut = aligned + 1 if aligned != -1 and aligned + 1 < len(data) else cut
+            self.skipped += cut
+            data = data[cut:]
+
+        text = data.decode("utf-8", errors="replace").replace("```", "`\u200b``")  # Keep the file from closing our code block
+        chunks = [chunk for chunk in self.chunks(text) if chunk.strip()][-self.max_messages:]
+        note = f"… skipped {format_size(self.skipped)} …\n" if self.skipped else ""
+        self.skipped = 0
+        if note and not chunks:
+            await self.channel.send(note.strip())
+        for index, chunk in enumerate(chunks):
+            await self.channel.send(f"{note if index == 0 else ''}```\n{chunk}\n```")
+
+class RemoteFile:
+    """Reads what's appended to a remote file over SFTP, following it across log rotation.
+
+    SFTP doesn't report inode numbers, so rotation is detected by asking `stat` over an exec
+    channel, only when the open file has stopped growing. The old file is read to the end before
+    switching, nothing written just before the rotation is lost. On hosts without `stat` a file
+    shorter than our offset counts as rotated or truncated. Every method blocks, run them in an
+    executor.
+    """
+
+    def __init__(self, client, path: str, inode: Optional[int], offset: Optional[int], read_limit: int):
+        self.client = client
+        self.sftp = client.open_sftp()
+        self.path = path
+        self.inode = inode
+        self.offset = offset  # None starts near the end of the file, like tail does
+        self.read_limit = read_limit
+        self.handle = None
+        self.last_rotation_check = time.monotonic()
+
+    def path_inode(self) -> Optional[int]:
+        stdin, stdout, stderr = self.client.exec_command(f"stat -Lc %i -- {shlex.quote(self.path)}", timeout=10)
+        output = stdout.read().decode("utf-8", "ignore").strip()
+        if stdout.channel.recv_exit_status() != 0 or not output.isdigit():
+            return None
+        return int(output)
+
+    def open(self) -> Tuple[int, bool]:
+        """Open the file at the saved offset. Returns (bytes skipped, whether the saved position was stale)."""
+        inode = self.path_inode()
+        self.handle = self.sftp.open(self.path, "rb")
+        size = self.handle.stat().st_size
+        stale = False
+        skipped = 0
+        if self.offset is None:
+            self.offset = max(0, size - TAIL_START_BYTES)
+            if self.offset:
+                # Start at a line boundary instead of in the middle of one
+                self.handle.seek(self.offset)
+                newline = self.handle.read(TAIL_START_BYTES).find(b"\n")
+                self.offset = self.offset + newline + 1 if newline != -1 else size
+        elif (inode is not None and self.inode is not None and inode != self.inode) or self.offset > size:
+            # Rotated or truncated while nobody was watching, the saved offset belongs to another file
+            self.offset = 0
+            stale = True
+        if size - self.offset > self.read_limit:
+            skipped = size - self.offset - self.read_limit
+            self.offset += skipped
+        self.inode = inode
+        return skipped, stale
+
+    def rotated(self) -> bool:
+        inode = self.path_inode()
+        if inode is not None:
+            return self.inode is not None and inode != self.inode
+        try:
+            return self.sftp.stat(self.path).st_size < self.offset
+        except FileNotFoundError:
+            return False  # Moved away and not recreated yet, keep the old one
+
+    def reopen(self):
+        self.handle.close()
+        self.inode = self.path_inode()
+        self.handle = self.sftp.open(self.path, "rb")
+        self.offset = 0
+
+    def poll(self) -> Tuple[bytes, int, bool]:
+        """Bytes appended since the last poll. Returns (data, bytes skipped, whether the file was rotated).
+
+        At most read_limit bytes are read, anything older is skipped on the host and never
+        crosses the network.
+        """
+        size = self.handle.stat().st_size
+        if size < self.offset:
+            self.offset = 0  # Truncated in place (copytruncate)
+        if size == self.offset:
+            now = time.monotonic()
+            if now - self.last_rotation_check < TAIL_ROTATION_CHECK:
+                return b"", 0, False
+            self.last_rotation_check = now
+            if not self.rotated():
+                return b"", 0, False
+            self.reopen()
+            return b"", 0, True
+
+        skipped = max(0, size - self.offset - self.read_limit)
+        self.offset += skipped
+        self.handle.seek(self.offset)
+        data = self.handle.read(size - self.offset)
+        self.offset += len(data)
+        return data, skipped, False
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+        self.sftp.close()
+
+class TailCommand(commands.GroupCog, name="tail"):
+    def __init__(self, bot):
+        self.bot = bot
+        self.hosts = HostRepository(bot.db)
+        self.tails = TailRepository(bot.db)
+        self.active_tails: Dict[int, asyncio.Task] = {}  # tail id -> task following it
+        self.max_backoff = 60  # Seconds between reconnection attempts at most
+        self.bot.loop.create_task(self.initialize_tails())
+
+    async def cog_unload(self):
+        for task in self.active_tails.values():
+            task.cancel()
+        self.active_tails.clear()
+
+    async def initialize_tails(self):
+        """Resume every active tail from its saved offset after a restart."""
+        await self.bot.wait_until_ready()
+        try:
+            tails = [tail for tail in await self.tails.active() if self.owns_tail(tail)]
+        except Exception as e:
+            print(f"Failed to load tails: {e}")
+            return
+
+        for tail in tails:
+            channel = self.bot.get_channel(int(tail['channel_id']))
+            if not channel:
+                continue
+            self.active_tails[tail['id']] = self.bot.loop.create_task(self.follow(tail, channel))
+        if tails:
+            print(f"Resumed {len(self.active_tails)}/{len(tails)} tails")
+
+    def owns_tail(self, tail) -> bool:
+        """Whether this process runs the shard a tail's guild is on, and so should follow it."""
+        shard_ids = getattr(self.bot, "shard_ids", None)
+        if not shard_ids:
+            return True
+        if tail['guild_id'] is None:
+            return self.bot.get_channel(int(tail['channel_id'])) is not None
+        return (int(tail['guild_id']) >> 22) % self.bot.shard_count in shard_ids
+
+    def following(self, tail_id: int) -> bool:
+        """Whether the current task still follows the tail. A tail stopped and started again gets a new task."""
+        return self.active_tails.get(tail_id) is asyncio.current_task()
+
+    def open_remote(self, host_data, path: str, inode: Optional[int], offset: Optional[int], read_limit: int):
+        """Connect and open the file. Blocking, run it in an executor."""
+        client = connect_client(host_data)
+        try:
+            remote = RemoteFile(client, path, inode, offset, read_limit)
+            skipped, stale = remote.open()
+        except Exception:
+            client.close()
+            raise
+        return client, remote, skipped, stale
+
+    async def close_remote(self, client, remote):
+        loop = asyncio.get_running_loop()
+        if remote is not None:
+            try:
+                await loop.run_in_executor(None, remote.close)
+            except Exception:
+                pass
+        if client is not None:
+            client.close()
+
+    async def follow(self, tail, channel, client=None, remote=None):
+        """Forward what's appended to the file until the tail is stopped, reconnecting when the host goes away.
+
+        The offset is saved after every flush, minus the bytes still held back, so a restart
+        resumes exactly after the last line that was sent.
+        """
+        loop = asyncio.get_running_loop()
+        sender = CoalescingSender(channel, TAIL_MAX_MESSAGES)
+        tail_id = tail['id']
+        inode, offset = tail['inode'], tail['file_offset']
+        saved = (inode, offset)
+        failures = 0
+        label = f"`{tail['path']}` on '{tail['hostname']}'"
+
+        try:
+            while self.following(tail_id):
+                try:
+                    if remote is None:
+                        host_data = await self.hosts.get(tail['user_id'], tail['hostname'])
+                        if not host_data:
+                            await channel.send(f"Stopped following {label}, the host was removed.")
+                            await self.tails.deactivate(tail_id)
+                            break
+                        client, remote, skipped, stale = await loop.run_in_executor(
+                            None, self.open_remote, host_data, tail['path'], inode, offset, sender.limit
+                        )
+                        sender.skip(skipped)
+                        if stale:
+                            await channel.send(f"{label} was rotated while it wasn't followed, reading the new file from the start.")
+                        elif failures:
+                            await channel.send(f"Reconnected, following {label} again.")
+                        failures = 0
+
+                    last_flush = time.monotonic()
+                    while self.following(tail_id):
+                        data, skipped, rotated = await loop.run_in_executor(None, remote.poll)
+                        if rotated:
+                            # Finish the old file before offsets start counting in the new one
+                            sender.end_of_file()
+                            await sender.flush(final=True)
+                        sender.skip(skipped)
+                        sender.add(data)
+                        inode, offset = remote.inode, remote.offset
+
+                        if time.monotonic() - last_flush >= TAIL_FLUSH_INTERVAL:
+                            await sender.flush()
+                            position = (inode, offset - sender.held)
+                            if position != saved:
+                                await self.tails.save_position(tail_id, *position)
+                                saved = position
+                            last_flush = time.monotonic()
+                        await asyncio.sleep(TAIL_POLL_INTERVAL)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if remote is not None:
+                        # Send the lines that were read, a partial line is read again after reconnecting
+                        held = sender.held
+                        sender.drop_partial()
+                        offset -= held - sender.held
+                        await sender.flush(final=True)
+                    await self.close_remote(client, remote)
+                    client = remote = None
+                    failures += 1
+                    if failures == 1:
+                        await channel.send(f"Lost {label}: {e or type(e).__name__}. Retrying...")
+                    await asyncio.sleep(min(self.max_backoff, 2 ** failures))
+        except discord.HTTPException as e:
+            print(f"Failed to send tail output, stopping tail {tail_id}: {e}")
+            await self.tails.deactivate(tail_id)
+        finally:
+            if self.following(tail_id):
+                del self.active_tails[tail_id]
+            await self.close_remote(client, remote)
+
+        if not sender.held or tail_id in self.active_tails:
+            return  # Nothing left, or the tail was started again and its new task owns the position
+        try:
+            await sender.flush(final=True)
+            await self.tails.save_position(tail_id, inode, offset)
+        except Exception as e:
+            print(f"Failed to flush tail {tail_id}: {e}")
+
+    @app_commands.describe(hostname="The host the file is on", path="The file to follow")
+    @app_commands.command(name="start", description="Follow a file on a host and post new lines in this channel")
+    async def start_tail(self, interaction: discord.Interaction, hostname: str, path: str):
+        await interaction.response.defer()
+        user_id = str(interaction.user.id)
+        # SFTP paths are relative to the login directory already
+        remote_path = path[2:] if path.startswith("~/") else path
+
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while following a file on host '{hostname}'. Please try again later.")
+            return
+
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            client, remote, _, _ = await loop.run_in_executor(
+                None, self.open_remote, host_data, remote_path, None, None, TAIL_MAX_MESSAGES * MESSAGE_CHARS
+            )
+        except FileNotFoundError:
+            await interaction.followup.send(f"'{path}' doesn't exist on '{hostname}'.")
+            return
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"Couldn't open '{path}' on '{hostname}': {e}")
+            return
+
+        try:
+            tail = await self.tails.start(
+                interaction.channel_id, interaction.guild.id if interaction.guild else None,
+                user_id, hostname, remote_path, remote.inode, remote.offset
+            )
+        except Exception as e:
+            await self.close_remote(client, remote)
+            print(f"An error occurred: {e}")
+            await interaction.followup.send("An error occurred while saving the tail. Please try again later.")
+            return
+
+        if tail is None:
+            await self.close_remote(client, remote)
+            await interaction.followup.send(f"This channel already follows '{path}' on '{hostname}'.")
+            return
+
+        self.active_tails[tail['id']] = self.bot.loop.create_task(self.follow(tail, interaction.channel, client, remote))
+        await interaction.followup.send(
+            f"Following `{path}` on '{hostname}' (tail #{tail['id']}). New lines are posted here, "
+            f"use `/tail stop {tail['id']}` to stop."
+        )
+
+    @app_commands.describe(tail_id="The tail to stop")
+    @app_commands.command(name="stop", description="Stop following a file")
+    async def stop_tail(self, interaction: discord.Interaction, tail_id: int):
+        await interaction.response.defer()
+
+        try:
+            tail = await self.tails.stop(tail_id, str(interaction.user.id))
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send("An error occurred while stopping the tail. Please try again later.")
+            return
+
+        if not tail:
+            await interaction.followup.send(f"You have no active tail with id {tail_id}.")
+            return
+
+        # The follow task sees it's gone, flushes what it has and exits
+        self.active_tails.pop(tail_id, None)
+        await interaction.followup.send(f"Stopped following `{tail['path']}` on '{tail['hostname']}'.")
+
+    @app_commands.command(name="list", description="List the files you're following")
+    async def list_tails(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+
+        try:
+            tails = await self.tails.for_user(str(interaction.user.id))
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send("An error occurred while listing your tails. Please try again later.")
+            return
+
+        if not tails:
+            await interaction.followup.send("You're not following any files.")
+            return
+
+        embed = discord.Embed(title="Followed Files", color=discord.Color.blue())
+        for tail in tails:
+            embed.add_field(
+                name=f"#{tail['id']} • {tail['hostname']}",
+                value=f"`{tail['path']}` in <#{tail['channel_id']}>\nAt byte {tail['file_offset']:,}",
+                inline=False
+            )
+        await interaction.followup.send(embed=embed)
+
+    @stop_tail.autocomplete("tail_id")
+    async def tail_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[int]]:
+        try:
+            tails = await self.tails.for_user(str(interaction.user.id))
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
+
+        return [
+            app_commands.Choice(name=f"#{tail['id']} {tail['hostname']}:{tail['path']}"[:100], value=tail['id'])
+            for tail in tails
+            if current in f"{tail['id']} {tail['hostname']}:{tail['path']}"
+        ][:25]
+
+    @start_tail.autocomplete("hostname")
+    async def host_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
+
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
+
+async def setup(bot):
+    await bot.add_cog(TailCommand(bot))
@@ -1,12 +1,12 @@
 import discord
 from discord.ext import commands
-import paramiko
 from discord import app_commands
-import os
 from typing import List, Optional
 import re
 from datetime import datetime
 import math
+from utils.repository import HostRepository
+from utils.ssh import connect_client
 
 class UsersPaginator(discord.ui.View):
     def __init__(self, users: List[dict], users_per_page: int = 3):
@@ -111,6 +111,7 @@ class UsersPaginator(discord.ui.View):
 class UsersCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.hosts = HostRepository(bot.db)
 
     def strip_ansi_codes(self, text: str) -> str:
         """Remove ANSI escape sequences from the text."""
@@ -165,81 +166,50 @@ class UsersCommand(commands.Cog):
     ):
         await interaction.response.defer()
         user_id = str(interaction.user.id)
-        db = self.bot.db
 
-        async with db.acquire() as conn:
-            try:
-                host_data = await conn.fetchrow(
-                    "SELECT ip, username, password, identification_file, port FROM hosts WHERE user_id = $1 AND hostname = $2",
-                    user_id, hostname
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await interaction.followup.send(f"An error occurred while getting users from host '{hostname}'. Please try again later.")
-                return
+        try:
+            host_data = await self.hosts.get(user_id, hostname)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            await interaction.followup.send(f"An error occurred while getting users from host '{hostname}'. Please try again later.")
+            return
 
-            if not host_data:
-                await interaction.followup.send("Host not found. Check your configured hosts.")
-                return
+        if not host_data:
+            await interaction.followup.send("Host not found. Check your configured hosts.")
+            return
 
-            ip, username, password, identification_file, port = host_data
-
-            # Temporary file creation for SSH key
-            temp_file_path = f"temp.pem"
-            if identification_file:
-                with open(temp_file_path, "w") as temp_file:
-                    temp_file.write(identification_file)
-
-            try:
-                # SSH connection setup
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                if identification_file:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        port=port or 22,
-                        key_filename=temp_file_path,
-                        timeout=10
-                    )
-                else:
-                    client.connect(
-                        hostname=ip,
-                        username=username,
-                        password=password,
-                        port=port or 22,
-                        timeout=10
-                    )
+        client = None
+        try:
+            # SSH connection setup
+            client = connect_client(host_data)
 
-                stdin, stdout, stderr = client.exec_command('who')
-                who_output = self.strip_ansi_codes(stdout.read().decode())
+            stdin, stdout, stderr = client.exec_command('who')
+            who_output = self.strip_ansi_codes(stdout.read().decode())
 
-                stdin, stdout, stderr = client.exec_command('w')
-                w_output = self.strip_ansi_codes(stdout.read().decode())
+            stdin, stdout, stderr = client.exec_command('w')
+            w_output = self.strip_ansi_codes(stdout.read().decode())
 
-                users = self.parse_users(who_output, w_output)
+            users = self.parse_users(who_output, w_output)
 
-                if not users:
-                    await interaction.followup.send(
-                        embed=discord.Embed(
-                            title="👥 Logged-in Users",
-                            description="No users currently logged in.",
-                            color=discord.Color.orange()
-                        )
+            if not users:
+                await interaction.followup.send(
+                    embed=discord.Embed(
+                        title="👥 Logged-in Users",
+                        description="No users currently logged in.",
+                        color=discord.Color.orange()
                     )
-                    return
+                )
+                return
 
-                view = UsersPaginator(users)
-                message = await interaction.followup.send(embed=view.get_page_content(), view=view)
-                view.message = message
+            view = UsersPaginator(users)
+            message = await interaction.followup.send(embed=view.get_page_content(), view=view)
+            view.message = message
 
-            except Exception as e:
-                await interaction.followup.send(f"An error occurred: {e}")
-            finally:
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {e}")
+        finally:
+            if client is not None:
                 client.close()
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
 
     @users.autocomplete("hostname")
     async def host_autocomplete(
@@ -247,23 +217,13 @@ class UsersCommand(commands.Cog):
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
-        user_id = str(interaction.user.id)
-        db = self.bot.db
+        try:
+            hostnames = await self.hosts.hostnames(str(interaction.user.id), current)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return []
 
-        async with db.acquire() as conn:
-            try:
-                hosts = await conn.fetch(
-                    "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2",
-                    user_id, f"{current}%"
-                )
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                return []
-
-            return [
-                app_commands.Choice(name=host["hostname"], value=host["hostname"])
-                for host in hosts
-            ][:25]
+        return [app_commands.Choice(name=hostname, value=hostname) for hostname in hostnames]
 
 async def setup(bot):
     await bot.add_cog(UsersCommand(bot))
\ No newline at end of file
@@ -23,7 +23,68 @@ async def create_hosts_table(pool):
                 channel_id TEXT NOT NULL PRIMARY KEY,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            ALTER TABLE live_terminals ADD COLUMN is_active BOOLEAN DEFAULT false;            
+            ALTER TABLE live_terminals ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT false;
+            ALTER TABLE live_terminals ADD COLUMN IF NOT EXISTS recording BOOLEAN DEFAULT false;
+            ALTER TABLE live_terminals ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMP;
+            ALTER TABLE live_terminals ADD COLUMN IF NOT EXISTS guild_id TEXT;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS reboot_poll_interval REAL;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS reboot_timeout INTEGER;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS host_group VARCHAR(255);
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS setup_status VARCHAR(20);
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS setup_output TEXT;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS setup_updated_at TIMESTAMP;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS setup_shard INTEGER;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS ssh_profile VARCHAR(20);
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS ssh_compression BOOLEAN;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS ssh_ciphers TEXT;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS ssh_kex TEXT;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS ssh_host_key_algorithms TEXT;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS ssh_connect_timeout REAL;
+            ALTER TABLE hosts ADD COLUMN IF NOT EXISTS ssh_banner_timeout REAL;
+            CREATE TABLE IF NOT EXISTS bot_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id BIGSERIAL PRIMARY KEY,
+                user_id VARCHAR(50) NOT NULL,
+                hostname VARCHAR(255) NOT NULL,
+                command TEXT NOT NULL,
+                channel_id TEXT,
+                status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                exit_status INTEGER,
+                cancel_requested BOOLEAN NOT NULL DEFAULT false,
+                worker_id TEXT,
+                lease_expires_at TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, id);
+            CREATE INDEX IF NOT EXISTS jobs_user_idx ON jobs (user_id, id DESC);
+            ALTER TABLE jobs ADD COLUMN IF NOT EXISTS worker_slot INTEGER;
+            CREATE TABLE IF NOT EXISTS job_output (
+                job_id BIGINT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS tails (
+                id BIGSERIAL PRIMARY KEY,
+                channel_id TEXT NOT NULL,
+                guild_id TEXT,
+                user_id VARCHAR(50) NOT NULL,
+                hostname VARCHAR(255) NOT NULL,
+                path TEXT NOT NULL,
+                inode BIGINT,
+                file_offset BIGINT NOT NULL DEFAULT 0,
+                is_active BOOLEAN NOT NULL DEFAULT true,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (channel_id, hostname, path)
+            );
         ''') 
 
 async def main():
@@ -1,5 +1,7 @@
 # Discord
 TOKEN = "bot token"
+SHARD_COUNT = None # Total number of shards, None runs a single unsharded bot
+SHARD_IDS = None # Shards this process runs, e.g. [0, 1]. None runs all of them (needs SHARD_COUNT)
 
 # Don't change these unless you know what you're doing
 setup_commands = ["sudo apt update", "sudo apt install net-tools"]
@@ -9,4 +11,73 @@ DB_Name = "db name"
 DB_User = "db username"
 DB_Pass = "db password"
 DB_Host = "host ip"
-DB_Port = 00000 # Must be an int
\ No newline at end of file
+DB_Port = 00000 # Must be an int
+DB_POOL_MIN_SIZE = 2 # Connections opened at startup and kept open
+DB_POOL_MAX_SIZE = 10 # Upper bound, commands wait for a free connection beyond this
+DB_STATEMENT_CACHE_SIZE = 100 # Prepared statements cached per connection, 0 disables (needed behind pgbouncer in transaction mode)
+DB_COMMAND_TIMEOUT = 30 # Seconds before a query is cancelled, None waits forever
+DB_MAX_INACTIVE_LIFETIME = 300 # Seconds an idle connection above the minimum is kept before it's closed
+
+# Background jobs
+JOB_WORKERS = 4 # How many jobs the bot process, or each worker process, runs at the same time
+JOB_LEASE_SECONDS = 60 # A job whose worker stops renewing its lease for this long is considered lost
+JOB_MAX_ATTEMPTS = 1 # Lost jobs are re-run until they've been attempted this many times
+SSH_WORKER_MODE = "inline" # "inline" runs jobs in the bot process, "external" leaves them to worker.py
+SSH_WORKERS = 4 # Worker processes started by worker.py, each running JOB_WORKERS jobs at a time
+
+# Tracing
+TRACING_ENABLED = True # Time the phases of every slash command for /latency
+TRACE_SAMPLE_RATE = 0.05 # Share of traces written to TRACE_FILE
+TRACE_SLOW_MS = 2000 # Traces slower than this are always written
+TRACE_FILE = "traces.jsonl" # OTLP/JSON, one trace per line
+
+# Metrics
+METRICS_ENABLED = True # Serve Prometheus metrics about the bot's internals
+METRICS_HOST = "127.0.0.1" # Keep this local unless the port is firewalled
+METRICS_PORT = 9108 # Give every process its own port when running several (see --metrics-port)
+
+# Live terminals
+RECORDINGS_DIR = "recordings" # Where recorded sessions are stored as compressed asciicast files
+SCROLLBACK_MAX_LINES = 200000 # Lines of cleaned output kept per terminal for /live-terminal search
+SCROLLBACK_KEPT_SESSIONS = 20 # Scrollbacks of stopped terminals kept for search, the least recently used go first
+RESTORE_CONCURRENCY = 10 # Terminals reconnected at the same time when the bot restarts
+RESTORE_TIMEOUT = 30 # Seconds to wait for a host when restoring its terminal, unless its SSH profile or timeouts say otherwise
+
+# File transfers
+SFTP_CHUNK_SIZE = 32768 # Bytes per SFTP read/write request
+SFTP_MAX_REQUESTS = 256 # Reads kept in flight per download, a download buffers at most this many chunks
+TRANSFER_MAX_PARTS = 10 # Downloads over the upload limit are split into at most this many attachments
+
+# Tails
+TAIL_POLL_INTERVAL = 1 # Seconds between checks of a followed file for new data
+TAIL_FLUSH_INTERVAL = 2 # Seconds new lines are collected before they're sent as one batch
+TAIL_MAX_MESSAGES = 3 # Messages sent per batch at most, a file growing faster than that is skipped ahead
+TAIL_ROTATION_CHECK = 5 # Seconds between log rotation checks while a file isn't growing
+TAIL_START_BYTES = 4096 # How far back from the end a new tail starts
+
+# Grep
+GREP_CONCURRENCY = 20 # Hosts searched at the same time
+GREP_MAX_MATCHES = 100 # Default matching lines brought back per host, the rest are only counted
+GREP_MAX_LINE = 300 # Characters kept of each matching line
+GREP_TIMEOUT = 60 # Seconds a search may run on one host
+
+# Command output
+OUTPUT_SPOOL_MEMORY = 1048576 # Bytes of a command's output kept in memory, the rest is spooled to a temporary file
+OUTPUT_MAX_PARTS = 5 # Output over the upload limit is compressed and split into at most this many attachments
+OUTPUT_STORE_DIR = "outputs" # Where output needing more parts than that is kept for /output get
+OUTPUT_STORE_HOURS = 24 # How long stored output is kept
+
+# Command result cache
+COMMAND_CACHE_ENABLED = False # Reuse recent results of the read-only commands below in /execute, fresh:True skips it
+COMMAND_CACHE_RULES = { # Regular expression the whole command must match -> seconds its result is reused
+    r"df( -[a-zA-Z]+)*( [\w/.-]+)*": 30,
+    r"free( -[a-z]+)*": 10,
+    r"uptime( -[a-z]+)?": 10,
+    r"uname( -[a-zA-Z]+)*": 3600,
+    r"cat /etc/os-release": 3600,
+    r"(lscpu|lsblk|nproc)( -[a-zA-Z]+)*": 3600,
+    r"ip (-[a-z0-9]+ )*(addr|route|link)( show)?": 30,
+    r"systemctl (status|is-active|is-enabled) [\w@.:-]+( --no-pager)?": 10,
+}
+COMMAND_CACHE_MAX_ENTRIES = 500 # Results kept at most, the least recently used go first
+COMMAND_CACHE_MAX_BYTES = 262144 # Larger results are only shared with identical requests running at the same time
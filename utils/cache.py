@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from config import COMMAND_CACHE_MAX_BYTES, COMMAND_CACHE_MAX_ENTRIES, COMMAND_CACHE_RULES
+from utils import metrics
+
+# Results of read-only /execute commands, reused for a few seconds so an incident where everyone
+# runs `df -h` on the same host costs one remote execution instead of one per person.
+
+# A command with any of these could chain, redirect or substitute its way past the allowlist
+SHELL_METACHARACTERS = re.compile(r"[;&|<>`$(){}\\\n]")
+
+RULES = [(re.compile(pattern), ttl) for pattern, ttl in COMMAND_CACHE_RULES.items()]
+
+def normalize_command(command: str) -> str:
+    return " ".join(command.split())
+
+def cache_ttl(command: str) -> Optional[float]:
+    """Seconds a command's result may be reused, None if the allowlist doesn't cover it."""
+    command = normalize_command(command)
+    if SHELL_METACHARACTERS.search(command):
+        return None
+    for pattern, ttl in RULES:
+        if pattern.fullmatch(command):
+            return ttl
+    return None
+
+def host_key(host) -> Tuple:
+    """Same machine, same account, same credentials: whoever matches all three may share a result."""
+    credentials = hashlib.sha256(f"{host['password'] or ''}\0{host['identification_file'] or ''}".encode("utf-8")).hexdigest()
+    return (host['ip'], host['port'] or 22, host['username'], credentials)
+
+class ResultCache:
+    """TTL cache of command results that also coalesces identical requests made while one is running.
+
+    A result is a dict with stdout, stderr, exit_status and finished_at. Failed runs are never kept.
+    """
+
+    def __init__(self, max_entries: int = COMMAND_CACHE_MAX_ENTRIES, max_bytes: int = COMMAND_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes  # Larger results are still shared with concurrent requests, just not kept
+        self.entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()  # key -> (expires_at, result), oldest use first
+        self.running: Dict[Tuple, asyncio.Future] = {}
+
+    async def get(self, key: Tuple, ttl: float, run: Callable[[], Awaitable[Dict]], bypass: bool = False) -> Tuple[Dict, str]:
+        """The result for key and where it came from: "hit", "coalesced", "miss" or "bypass".
+
+        bypass skips a kept result but still joins a run that's in progress, since that one started
+        after the request did.
+        """
+        if not bypass:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    metrics.command_cache.inc(result="hit")
+                    return entry[1], "hit"
+                del self.entries[key]
+
+        running = self.running.get(key)
+        if running is not None:
+            metrics.command_cache.inc(result="coalesced")
+            return await asyncio.shield(running), "coalesced"
+
+        source = "bypass" if bypass else "miss"
+        metrics.command_cache.inc(result=source)
+        task = asyncio.ensure_future(run())
+        self.running[key] = task
+        # Stored from the callback so the result is kept even if the request that started it is cancelled
+        task.add_done_callback(lambda finished: self.finished(key, ttl, finished))
+        return await asyncio.shield(task), source
+
+    def finished(self, key: Tuple, ttl: float, task: asyncio.Future):
+        self.running.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if len(result['stdout']) + len(result['stderr']) > self.max_bytes:
+            return
+        self.entries[key] = (time.monotonic() + ttl, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
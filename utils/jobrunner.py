@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+import socket
+import os
+from typing import Awaitable, Callable, List, Optional
+from config import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+from utils.repository import HostRepository
+from utils.ssh import connect_client
+
+PID_MARKER = "__termicord_job_pid__ "
+
+def worker_slot(user_id: str, hostname: str, workers: int) -> int:
+    """Pick the worker process that runs a host's jobs using rendezvous hashing.
+
+    Every job for a host lands on the same worker, and changing the number of workers only
+    moves the hosts of the slots that were added or removed.
+    """
+    key = f"{user_id}:{hostname}"
+    return max(range(workers), key=lambda slot: hashlib.sha1(f"{slot}:{key}".encode("utf-8")).digest())
+
+class JobRunner:
+    """Claims jobs from the jobs table and runs them over SSH.
+
+    The jobs cog runs one inside the bot process, worker.py runs one per worker process.
+    With a slot set only jobs hashed to that slot (or enqueued without one) are claimed.
+    """
+
+    def __init__(
+        self,
+        db,
+        slot: Optional[int] = None,
+        on_finished: Optional[Callable[..., Awaitable[None]]] = None
+    ):
+        self.db = db
+        self.hosts = HostRepository(db)
+        self.slot = slot
+        self.on_finished = on_finished  # Called with (job, status, exit_status) once a job is done
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = 2  # Seconds between queue polls when idle
+        self.flush_interval = 1  # Seconds between output flushes for a running job
+        self.flush_size = 16384  # Flush output early once this many characters are buffered
+        self.wakeup = asyncio.Event()
+        self.workers: List[asyncio.Task] = []
+        self.running_jobs = {}  # job id -> paramiko channel, for jobs running in this process
+        self.cancelled_jobs = set()
+        self.listener = None
+
+    def start(self, count: int):
+        self.workers = [
+            asyncio.create_task(self.worker_loop(f"{self.worker_prefix}:{index}"))
+            for index in range(count)
+        ]
+
+    async def listen(self):
+        """Wake up on job_queued notifications and stop jobs on job_cancel ones instead of waiting for a poll."""
+        self.listener = await self.db.acquire()
+        await self.listener.add_listener("job_queued", self.on_job_queued)
+        await self.listener.add_listener("job_cancel", self.on_job_cancel)
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        if self.listener is not None:
+            await self.db.release(self.listener)
+            self.listener = None
+
+    def on_job_queued(self, connection, pid, channel, payload):
+        if self.slot is None or payload in ("", str(self.slot)):
+            self.wakeup.set()
+
+    def on_job_cancel(self, connection, pid, channel, payload):
+        self.cancel_local(int(payload))
+
+    def cancel_local(self, job_id: int) -> bool:
+        """Stop a job right away if this process is the one running it."""
+        channel = self.running_jobs.get(job_id)
+        if channel is None:
+            return False
+        self.cancelled_jobs.add(job_id)
+        channel.close()
+        return True
+
+    async def claim_job(self, worker_id: str):
+        """Lease the oldest runnable job. SKIP LOCKED lets several processes poll the same table."""
+        async with self.db.acquire() as conn:
+            # Jobs whose worker disappeared and are out of attempts are failed instead of re-run
+            await conn.execute(
+                """UPDATE jobs SET status = 'failed', finished_at = CURRENT_TIMESTAMP
+                WHERE status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP AND attempts >= $1""",
+                JOB_MAX_ATTEMPTS
+            )
+            return await conn.fetchrow(
+                """UPDATE jobs
+                SET status = 'running', worker_id = $1, attempts = attempts + 1,
+                    lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => $2),
+                    started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE NOT cancel_requested AND (
+                        status = 'queued'
+                        OR (status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP AND attempts < $3)
+                    )
+                    AND ($4::INTEGER IS NULL OR worker_slot IS NULL OR worker_slot = $4)
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id, user_id, hostname, command, channel_id""",
+                worker_id, float(JOB_LEASE_SECONDS), JOB_MAX_ATTEMPTS, self.slot
+            )
+
+    async def worker_loop(self, worker_id: str):
+        """Claim and run jobs until cancelled."""
+        while True:
+            try:
+                job = await self.claim_job(worker_id)
+            except Exception as e:
+                print(f"Job worker {worker_id} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.run_job(job, worker_id)
+            except Exception as e:
+                print(f"Job {job['id']} crashed: {e}")
+                await self.finish_job(job['id'], worker_id, "failed", None)
+
+    async def append_output(self, job_id: int, seq: int, data: str):
+        async with self.db.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO job_output (job_id, seq, data) VALUES ($1, $2, $3)",
+                job_id, seq, data
+            )
+
+    async def renew_lease(self, job_id: int, worker_id: str) -> str:
+        """Extend the lease on a job. Returns "renewed", "cancelled" or "lost" if another worker took it over."""
+        async with self.db.acquire() as conn:
+            cancel_requested = await conn.fetchval(
+                """UPDATE jobs SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => $3)
+                WHERE id = $1 AND worker_id = $2 AND status = 'running'
+                RETURNING cancel_requested""",
+                job_id, worker_id, float(JOB_LEASE_SECONDS)
+            )
+        if cancel_requested is None:
+            return "lost"
+        return "cancelled" if cancel_requested else "renewed"
+
+    async def finish_job(self, job_id: int, worker_id: str, status: str, exit_status: Optional[int]):
+        async with self.db.acquire() as conn:
+            await conn.execute(
+                """UPDATE jobs SET status = $3, exit_status = $4, finished_at = CURRENT_TIMESTAMP, lease_expires_at = NULL
+                WHERE id = $1 AND worker_id = $2""",
+                job_id, worker_id, status, exit_status
+            )
+
+    def kill_remote(self, client, pid: int):
+        """Terminate a job's command on the host. Blocking, run it in an executor.
+
+        sshd starts the command's shell as a session leader, so its pid is also the process group
+        of everything the command started.
+        """
+        stdin, stdout, stderr = client.exec_command(f"kill -s TERM -- -{pid} 2>/dev/null || kill -s TERM {pid}", timeout=30)
+        stdout.channel.recv_exit_status()
+
+    async def notify(self, job, status: str, exit_status: Optional[int]):
+        if self.on_finished is None:
+            return
+        try:
+            await self.on_finished(job, status, exit_status)
+        except Exception as e:
+            print(f"Failed to report job {job['id']} as {status}: {e}")
+
+    async def run_job(self, job, worker_id: str):
+        """Run a leased job, storing output incrementally and renewing the lease as it goes."""
+        job_id = job['id']
+        host_data = await self.hosts.get(job['user_id'], job['hostname'])
+        async with self.db.acquire() as conn:
+            seq = await conn.fetchval("SELECT COALESCE(MAX(seq), -1) + 1 FROM job_output WHERE job_id = $1", job_id)
+
+        if not host_data:
+            await self.append_output(job_id, seq, "Host not found. Check your configured hosts.\n")
+            await self.finish_job(job_id, worker_id, "failed", None)
+            await self.notify(job, "failed", None)
+            return
+
+        loop = asyncio.get_event_loop()
+        try:
+            client = await loop.run_in_executor(None, connect_client, host_data)
+        except Exception as e:
+            await self.append_output(job_id, seq, f"Connection failed: {e}\n")
+            await self.finish_job(job_id, worker_id, "failed", None)
+            await self.notify(job, "failed", None)
+            return
+
+        buffer = []
+        buffered = 0
+        header = ""  # Output before the pid line is complete
+        pid = None
+        last_flush = loop.time()
+        last_renew = loop.time()
+        status = "succeeded"
+        exit_status = None
+
+        try:
+            channel = client.get_transport().open_session()
+            channel.set_combine_stderr(True)
+            # The shell reports its pid first, so a cancelled job can be killed on the host and not just abandoned
+            channel.exec_command(f"echo {PID_MARKER}$$; {job['command']}")
+            self.running_jobs[job_id] = channel
+
+            while True:
+                if channel.recv_ready():
+                    chunk = channel.recv(4096).decode('utf-8', errors='ignore')
+                    if pid is None:
+                        header += chunk
+                        if "\n" not in header:
+                            continue
+                        line, _, rest = header.partition("\n")
+                        if line.startswith(PID_MARKER) and line[len(PID_MARKER):].isdigit():
+                            pid, chunk = int(line[len(PID_MARKER):]), rest
+                        else:
+                            pid, chunk = 0, header  # A login shell without $$, nothing to kill on cancel
+                    buffer.append(chunk)
+                    buffered += len(chunk)
+                    await asyncio.sleep(0)
+                elif channel.status_event.is_set():
+                    exit_status = channel.recv_exit_status()
+                    break
+                elif channel.closed:
+                    # Closed without an exit status: cancelled from this process or the connection dropped
+                    status = "cancelled" if job_id in self.cancelled_jobs else "failed"
+                    break
+                else:
+                    await asyncio.sleep(0.1)
+
+                now = loop.time()
+                if buffer and (buffered >= self.flush_size or now - last_flush >= self.flush_interval):
+                    await self.append_output(job_id, seq, ''.join(buffer))
+                    seq += 1
+                    buffer, buffered, last_flush = [], 0, now
+
+                if now - last_renew >= JOB_LEASE_SECONDS / 3:
+                    last_renew = now
+                    lease = await self.renew_lease(job_id, worker_id)
+                    if lease != "renewed":
+                        status = lease
+                        break
+
+            if pid is None and header:
+                buffer.append(header)
+            if status == "succeeded" and exit_status != 0:
+                status = "failed"
+        finally:
+            self.running_jobs.pop(job_id, None)
+            self.cancelled_jobs.discard(job_id)
+            if status in ("cancelled", "lost") and pid:
+                # Closing an exec channel without a pty doesn't hang up the command, it would keep running
+                try:
+                    await loop.run_in_executor(None, self.kill_remote, client, pid)
+                except Exception as e:
+                    print(f"Failed to stop job {job_id} on {job['hostname']}: {e}")
+            if buffer:
+                await self.append_output(job_id, seq, ''.join(buffer))
+            client.close()
+
+        if status == "lost":
+            # Another worker owns the job now, its row and its report are that worker's
+            print(f"Job {job_id} was taken over by another worker, stopped it here")
+            return
+
+        await self.finish_job(job_id, worker_id, status, exit_status)
+        await self.notify(job, status, exit_status)
@@ -0,0 +1,23 @@
+import importlib
+import types
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports the real one on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            # importlib's per-module lock makes this safe from executor threads too
+            self._module = importlib.import_module(self.__name__)
+        return getattr(self._module, attribute)
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return a module that is only actually imported when it's first used.
+
+    Used for the SSH stack so cogs can be loaded, and DB-only commands served, without
+    paying for paramiko and cryptography at startup.
+    """
+    return LazyModule(name)
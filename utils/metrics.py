@@ -0,0 +1,249 @@
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from aiohttp import web
+
+class Metric:
+    """A metric family: one value per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        registry.append(self)
+
+    def key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{label}="{escape(value)}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self.label_text(key)} {value}" for key, value in list(self.values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """A gauge that is either set directly or, with a collect callback, read when scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), collect: Optional[Callable] = None):
+        super().__init__(name, description, labels)
+        self.collect = collect  # Returns {label values tuple: value} when scraped
+
+    def set(self, value: float, **labels):
+        self.values[self.key(labels)] = value
+
+    def samples(self) -> List[str]:
+        if self.collect is not None:
+            try:
+                self.values = self.collect()
+            except Exception as e:
+                print(f"Failed to collect metric {self.name}: {e}")
+        return super().samples()
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = ()):
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        counts = self.counts.setdefault(key, [0] * (len(self.buckets) + 1))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[key] = self.sums.get(key, 0) + value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in list(self.counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self.label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self.label_text(key)} {self.sums[key]}")
+            lines.append(f"{self.name}_count{self.label_text(key)} {cumulative}")
+        return lines
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+registry: List[Metric] = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+db_pool_connections = Gauge(
+    "termicord_db_pool_connections", "Connections in the database pool", ("state",)
+)
+db_acquire_seconds = Histogram(
+    "termicord_db_acquire_seconds", "Time spent waiting for a database pool connection", buckets=LATENCY_BUCKETS
+)
+discord_requests = Counter(
+    "termicord_discord_requests_total", "Discord REST requests by method and route", ("method", "route")
+)
+discord_messages = Counter(
+    "termicord_discord_messages_total", "Discord messages sent and edited, including interaction followups", ("action",)
+)
+discord_rate_limits = Counter(
+    "termicord_discord_rate_limits_total", "429 responses received from Discord", ("scope",)
+)
+event_loop_lag = Histogram(
+    "termicord_event_loop_lag_seconds", "How late the event loop woke up from a sleep, a sign of blocking code", buckets=LATENCY_BUCKETS
+)
+command_seconds = Histogram(
+    "termicord_command_duration_seconds", "Slash command handling time", ("command",), buckets=LATENCY_BUCKETS
+)
+terminal_bytes = Counter(
+    "termicord_terminal_bytes_total", "Bytes forwarded through live terminals", ("channel", "hostname", "direction")
+)
+command_cache = Counter(
+    "termicord_command_cache_total", "Cacheable /execute commands by whether they ran on the host", ("result",)
+)
+
+def open_transports():
+    """Count live paramiko transports by peer, without importing paramiko if nothing used it yet."""
+    if "paramiko.transport" not in sys.modules:
+        return {}
+    transport_class = sys.modules["paramiko.transport"].Transport
+    counts = {}
+    for thread in threading.enumerate():
+        if isinstance(thread, transport_class) and thread.is_active():
+            try:
+                peer = "%s:%s" % thread.getpeername()[:2]
+            except Exception:
+                peer = "unknown"
+            counts[(peer,)] = counts.get((peer,), 0) + 1
+    return counts
+
+ssh_transports = Gauge("termicord_ssh_transports", "Open SSH transports by remote address", ("peer",), collect=open_transports)
+live_terminals = Gauge("termicord_live_terminals", "Live terminal sessions hosted by this process")
+
+class MeteredPool:
+    """Wraps an asyncpg pool to time how long each acquire waits for a connection."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def acquire(self):
+        return MeteredAcquire(self.pool.acquire())
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+def instrument_pool(pool) -> MeteredPool:
+    db_pool_connections.collect = lambda: {
+        ("total",): pool.get_size(),
+        ("idle",): pool.get_idle_size(),
+        ("max",): pool.get_max_size(),
+    }
+    return MeteredPool(pool)
+
+class MeteredAcquire:
+    def __init__(self, context):
+        self.context = context
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        conn = await self.context.__aenter__()
+        db_acquire_seconds.observe(time.perf_counter() - start)
+        return conn
+
+    async def __aexit__(self, *exc_info):
+        return await self.context.__aexit__(*exc_info)
+
+    def __await__(self):
+        return self.__aenter__().__await__()
+
+class RateLimitHandler(logging.Handler):
+    """Counts the warnings discord.py logs whenever it gets a 429."""
+
+    scopes = {
+        "We are being rate limited": "route",
+        "Global rate limit": "global",
+        "Webhook ID": "webhook",
+    }
+
+    def emit(self, record: logging.LogRecord):
+        for prefix, scope in self.scopes.items():
+            if isinstance(record.msg, str) and record.msg.startswith(prefix):
+                discord_rate_limits.inc(scope=scope)
+                return
+
+def count_request(route):
+    discord_requests.inc(method=route.method, route=route.path)
+    if route.method == "POST" and (route.path.endswith("/messages") or route.path == "/webhooks/{webhook_id}/{webhook_token}"):
+        discord_messages.inc(action="send")
+    elif route.method == "PATCH" and "/messages/" in route.path:
+        discord_messages.inc(action="edit")
+
+def instrument_discord(bot):
+    """Count REST requests made by the bot and by interaction webhooks, and the 429s they get."""
+    from discord.webhook.async_ import async_context
+
+    bot_request = bot.http.request
+
+    async def request(route, **kwargs):
+        count_request(route)
+        return await bot_request(route, **kwargs)
+
+    bot.http.request = request
+
+    adapter = async_context.get()
+    webhook_request = adapter.request
+
+    async def webhook_request_counted(route, *args, **kwargs):
+        count_request(route)
+        return await webhook_request(route, *args, **kwargs)
+
+    adapter.request = webhook_request_counted
+
+    handler = RateLimitHandler(logging.WARNING)
+    logging.getLogger("discord.http").addHandler(handler)
+    logging.getLogger("discord.webhook.async_").addHandler(handler)
+
+async def monitor_loop_lag(interval: float = 0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, loop.time() - scheduled))
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+async def start_server(host: str, port: int) -> web.AppRunner:
+    """Serve the metrics in Prometheus text format on http://host:port/metrics."""
+    async def handle(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
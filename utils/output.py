@@ -0,0 +1,253 @@
+import asyncio
+import gzip
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import discord
+from config import OUTPUT_MAX_PARTS, OUTPUT_SPOOL_MEMORY, OUTPUT_STORE_DIR, OUTPUT_STORE_HOURS
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, output is gzipped without it
+    zstandard = None
+
+# Delivery of command output that may not fit in one Discord attachment: attached as is when it
+# does, compressed and split over a few messages when that's enough, stored for /output get otherwise.
+
+CODECS = {"gz": "gzip", "zst": "zstd"}
+CHUNK_SIZE = 65536
+
+class TransferTooLarge(Exception):
+    pass
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+def upload_limit(guild: Optional[discord.Guild]) -> int:
+    """Largest attachment a message can carry, less room for the multipart envelope."""
+    return (guild.filesize_limit if guild else 10 * 1024 * 1024) - 1024
+
+class PartWriter:
+    """File-like sink that spreads what's written over part files of at most part_size bytes.
+
+    Only one part is open at a time, so packaging a download needs no more memory than a chunk.
+    """
+
+    def __init__(self, directory: str, filename: str, part_size: int, max_parts: int):
+        self.directory = directory
+        self.filename = filename
+        self.part_size = part_size
+        self.max_parts = max_parts
+        self.paths: List[str] = []
+        self.current = None
+        self.current_size = 0
+        self.total = 0
+
+    def next_part(self):
+        if self.current is not None:
+            self.current.close()
+        if len(self.paths) >= self.max_parts:
+            raise TransferTooLarge(f"needs more than {self.max_parts} parts of {format_size(self.part_size)}")
+        path = os.path.join(self.directory, f"{self.filename}.part{len(self.paths) + 1:03d}")
+        self.paths.append(path)
+        self.current = open(path, "wb")
+        self.current_size = 0
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        while view:
+            if self.current is None or self.current_size >= self.part_size:
+                self.next_part()
+            taken = view[:self.part_size - self.current_size]
+            self.current.write(taken)
+            self.current_size += len(taken)
+            view = view[len(taken):]
+        self.total += len(data)
+        return len(data)
+
+    def flush(self):
+        if self.current is not None:
+            self.current.flush()
+
+    def close(self) -> List[str]:
+        """Close the last part and return the part paths. A single part gets the plain file name."""
+        if self.current is None:
+            self.next_part()  # Empty file, still deliver one (empty) attachment
+        self.current.close()
+        if len(self.paths) == 1:
+            path = os.path.join(self.directory, self.filename)
+            os.replace(self.paths[0], path)
+            self.paths = [path]
+        return self.paths
+
+class OutputSpool:
+    """Append-only buffer for a command's full output.
+
+    The first OUTPUT_SPOOL_MEMORY bytes are kept in memory, the rest goes to a temporary file,
+    so a command that prints for hours doesn't grow the bot. Appends can continue while an
+    executor thread reads the spool, the lock keeps their file positions apart.
+    """
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=OUTPUT_SPOOL_MEMORY, mode="w+b")
+        self.lock = threading.Lock()
+        self.size = 0
+
+    def append(self, text: str):
+        data = text.encode("utf-8")
+        with self.lock:
+            if self.file.closed:
+                return  # Output arriving after delivery has nowhere to go
+            self.file.seek(0, os.SEEK_END)
+            self.file.write(data)
+            self.size += len(data)
+
+    def chunks(self, limit: int):
+        """The first limit bytes, CHUNK_SIZE at a time."""
+        position = 0
+        while position < limit:
+            with self.lock:
+                self.file.seek(position)
+                chunk = self.file.read(min(CHUNK_SIZE, limit - position))
+            if not chunk:
+                break
+            position += len(chunk)
+            yield chunk
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+def package_output(spool: OutputSpool, directory: str, filename: str, part_size: int) -> Tuple[List[str], Optional[str], int]:
+    """Write the spool into part files. Blocking, run it in an executor.
+
+    Output that fits one attachment stays plain text, anything larger is compressed with zstd when
+    it's installed and gzip otherwise. Returns the part paths, the codec and the bytes packaged.
+    """
+    size = spool.size  # Whatever arrives while packaging isn't included
+    if size <= part_size:
+        writer = PartWriter(directory, filename, part_size, 1)
+        for chunk in spool.chunks(size):
+            writer.write(chunk)
+        return writer.close(), None, size
+
+    codec = "zst" if zstandard else "gz"
+    # Compressed output is never much larger than the input, so this only guards against runaway parts
+    writer = PartWriter(directory, f"{filename}.{codec}", part_size, size // part_size + 2)
+    try:
+        if zstandard:
+            sink = zstandard.ZstdCompressor(level=9).stream_writer(writer, closefd=False)
+        else:
+            sink = gzip.GzipFile(filename=filename, mode="wb", fileobj=writer, compresslevel=6)
+        for chunk in spool.chunks(size):
+            sink.write(chunk)
+        sink.close()
+    except Exception:
+        if writer.current is not None:
+            writer.current.close()
+        raise
+    return writer.close(), codec, size
+
+def join_hint(paths: List[str]) -> str:
+    name = os.path.basename(paths[0]).rsplit(".part", 1)[0]
+    return f"join them with `cat {name}.part* > {name}`"
+
+def prune_stored_outputs():
+    """Remove stored outputs older than OUTPUT_STORE_HOURS."""
+    if not os.path.isdir(OUTPUT_STORE_DIR):
+        return
+    cutoff = time.time() - OUTPUT_STORE_HOURS * 3600
+    for output_id in os.listdir(OUTPUT_STORE_DIR):
+        path = os.path.join(OUTPUT_STORE_DIR, output_id)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+def store_output(paths: List[str], user_id: str, filename: str, codec: Optional[str], size: int) -> str:
+    """Move packaged parts into OUTPUT_STORE_DIR for /output get. Blocking, run it in an executor."""
+    prune_stored_outputs()
+    output_id = secrets.token_hex(4)
+    directory = os.path.join(OUTPUT_STORE_DIR, output_id)
+    os.makedirs(directory)
+    parts = []
+    for path in paths:
+        shutil.move(path, os.path.join(directory, os.path.basename(path)))  # The temp dir may be on another filesystem
+        parts.append(os.path.basename(path))
+    with open(os.path.join(directory, "meta.json"), "w") as meta_file:
+        json.dump({
+            "user_id": user_id,
+            "filename": filename,
+            "codec": codec,
+            "size": size,
+            "parts": parts,
+            "created_at": time.time(),
+        }, meta_file)
+    return output_id
+
+def load_stored_output(output_id: str) -> Optional[Dict]:
+    """Metadata of a stored output, None if it doesn't exist or has expired."""
+    if not output_id.isalnum():
+        return None
+    directory = os.path.join(OUTPUT_STORE_DIR, output_id)
+    try:
+        with open(os.path.join(directory, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+    if meta["created_at"] < time.time() - OUTPUT_STORE_HOURS * 3600:
+        return None
+    meta["id"] = output_id
+    meta["directory"] = directory
+    return meta
+
+def list_stored_outputs(user_id: str) -> List[Dict]:
+    """A user's stored outputs, newest first."""
+    if not os.path.isdir(OUTPUT_STORE_DIR):
+        return []
+    outputs = [load_stored_output(output_id) for output_id in os.listdir(OUTPUT_STORE_DIR)]
+    outputs = [meta for meta in outputs if meta is not None and meta["user_id"] == user_id]
+    return sorted(outputs, key=lambda meta: -meta["created_at"])
+
+async def deliver_output(send, spool: OutputSpool, user_id: str, part_size: int, text: str, filename: str = "command_output.txt"):
+    """Send the spool's contents with text, and close it.
+
+    send is a coroutine function like Messageable.send, it's called once per attachment. Packaging
+    streams through temporary part files, never holding more than a chunk of the output in memory.
+    """
+    loop = asyncio.get_running_loop()
+    directory = tempfile.mkdtemp(prefix="termicord-output-")
+    try:
+        paths, codec, size = await loop.run_in_executor(None, package_output, spool, directory, filename, part_size)
+        packed = sum(os.path.getsize(path) for path in paths)
+        details = f"{format_size(size)}, {CODECS[codec]} compressed to {format_size(packed)}" if codec else None
+
+        if len(paths) > OUTPUT_MAX_PARTS:
+            output_id = await loop.run_in_executor(None, store_output, paths, user_id, filename, codec, size)
+            await send(
+                f"{text}\nThe output ({details}) needs {len(paths)} attachments, too many to post here. "
+                f"It's kept for {OUTPUT_STORE_HOURS} hours, fetch the parts with `/output get {output_id}` and {join_hint(paths)}."
+            )
+            return
+
+        lines = [text]
+        if details:
+            lines.append(f"Output is {details}.")
+        if len(paths) > 1:
+            lines.append(f"Split into {len(paths)} parts, {join_hint(paths)}.")
+        # One part per message, each stays under the upload limit on its own
+        await send("\n".join(lines), file=discord.File(paths[0]))
+        for path in paths[1:]:
+            await send(file=discord.File(path))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        spool.close()
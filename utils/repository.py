@@ -0,0 +1,246 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+import asyncpg
+from config import (
+    DB_Host, DB_Name, DB_User, DB_Pass, DB_Port,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_STATEMENT_CACHE_SIZE, DB_COMMAND_TIMEOUT, DB_MAX_INACTIVE_LIFETIME
+)
+from utils import tracing
+
+# Every query the cogs run against hosts and live_terminals lives here. The statements are fixed
+# strings, so asyncpg's per-connection statement cache prepares each one once per connection and
+# every later call only sends the bind parameters.
+
+async def create_pool(**overrides) -> asyncpg.Pool:
+    """The connection pool, sized and tuned from config.py."""
+    options = {
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "command_timeout": DB_COMMAND_TIMEOUT,
+        "max_inactive_connection_lifetime": DB_MAX_INACTIVE_LIFETIME,
+    }
+    options.update(overrides)
+    return await asyncpg.create_pool(
+        database=DB_Name, user=DB_User, password=DB_Pass, host=DB_Host, port=DB_Port, **options
+    )
+
+class Repository:
+    """Runs one statement per pool connection checkout."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def fetch(self, query: str, *args) -> List:
+        async with tracing.acquire(self.db) as conn:
+            return await conn.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args):
+        async with tracing.acquire(self.db) as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def execute(self, query: str, *args) -> str:
+        async with tracing.acquire(self.db) as conn:
+            return await conn.execute(query, *args)
+
+# A host's SSH connection profile, see utils/ssh.py
+SSH_PROFILE_COLUMNS = "ssh_profile, ssh_compression, ssh_ciphers, ssh_kex, ssh_host_key_algorithms, ssh_connect_timeout, ssh_banner_timeout"
+# What the cogs need to open an SSH connection to a host
+HOST_CONNECTION_COLUMNS = f"hostname, ip, username, password, identification_file, port, reboot_poll_interval, reboot_timeout, {SSH_PROFILE_COLUMNS}"
+HOST_IMPORT_FIELDS = ["hostname", "ip", "username", "password", "identification_file", "port", "host_group"]
+AUTOCOMPLETE_LIMIT = 25  # Discord shows at most 25 choices
+
+class HostRepository(Repository):
+    GET = f"SELECT {HOST_CONNECTION_COLUMNS} FROM hosts WHERE user_id = $1 AND hostname = $2"
+    GET_MANY = f"SELECT {HOST_CONNECTION_COLUMNS} FROM hosts WHERE user_id = $1 AND hostname = ANY($2::TEXT[]) ORDER BY hostname"
+    IN_GROUP = f"SELECT {HOST_CONNECTION_COLUMNS} FROM hosts WHERE user_id = $1 AND host_group = $2 ORDER BY hostname"
+    LIST = f"SELECT hostname, ip, username, port, host_group, setup_status, {SSH_PROFILE_COLUMNS} FROM hosts WHERE user_id = $1 ORDER BY hostname"
+    HOSTNAMES = "SELECT hostname FROM hosts WHERE user_id = $1 AND hostname LIKE $2 ORDER BY hostname LIMIT $3"
+    GROUPS = "SELECT DISTINCT host_group FROM hosts WHERE user_id = $1 AND host_group LIKE $2 ORDER BY host_group LIMIT $3"
+    ADD = """INSERT INTO hosts (user_id, hostname, ip, username, password, identification_file, port, host_group, setup_status, setup_updated_at, setup_shard)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, 'pending', CURRENT_TIMESTAMP, $9)
+        ON CONFLICT (user_id, hostname) DO UPDATE
+        SET ip = $3, username = $4, password = $5, identification_file = $6, port = $7, host_group = COALESCE($8, hosts.host_group),
+            setup_status = 'pending', setup_updated_at = CURRENT_TIMESTAMP, setup_shard = $9"""
+    # NULL leaves a column unchanged, so one statement covers every combination of edits
+    UPDATE = """UPDATE hosts
+        SET hostname = COALESCE($3, hostname), ip = COALESCE($4, ip), username = COALESCE($5, username),
+            password = COALESCE($6, password), identification_file = COALESCE($7, identification_file),
+            port = COALESCE($8, port), reboot_poll_interval = COALESCE($9, reboot_poll_interval),
+            reboot_timeout = COALESCE($10, reboot_timeout), host_group = COALESCE($11, host_group),
+            ssh_profile = COALESCE($12, ssh_profile), ssh_compression = COALESCE($13, ssh_compression),
+            ssh_ciphers = COALESCE($14, ssh_ciphers), ssh_kex = COALESCE($15, ssh_kex),
+            ssh_host_key_algorithms = COALESCE($16, ssh_host_key_algorithms),
+            ssh_connect_timeout = COALESCE($17, ssh_connect_timeout), ssh_banner_timeout = COALESCE($18, ssh_banner_timeout)
+        WHERE user_id = $1 AND hostname = $2"""
+    REMOVE = "DELETE FROM hosts WHERE user_id = $1 AND hostname = $2"
+    SET_SETUP_STATUS = """UPDATE hosts SET setup_status = $3, setup_output = $4, setup_updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = $1 AND hostname = $2"""
+    # A setup belongs to the shard it was started from. One that stopped updating for longer than a
+    # setup command may take is dead too, wherever it ran.
+    INTERRUPT_SETUPS = """UPDATE hosts SET setup_status = 'interrupted'
+        WHERE setup_status IN ('pending', 'running')
+        AND ($1::INTEGER[] IS NULL OR COALESCE(setup_shard, 0) = ANY($1)
+             OR setup_updated_at < CURRENT_TIMESTAMP - make_interval(secs => $2))"""
+
+    async def get(self, user_id: str, hostname: str):
+        """Connection details of one host, or None."""
+        return await self.fetchrow(self.GET, user_id, hostname)
+
+    async def get_many(self, user_id: str, hostnames: Iterable[str]) -> List:
+        """Connection details of several hosts in one round trip. Unknown hostnames are left out."""
+        return await self.fetch(self.GET_MANY, user_id, list(hostnames))
+
+    async def in_group(self, user_id: str, group: str) -> List:
+        return await self.fetch(self.IN_GROUP, user_id, group)
+
+    async def list(self, user_id: str) -> List:
+        return await self.fetch(self.LIST, user_id)
+
+    async def hostnames(self, user_id: str, prefix: str = "", limit: Optional[int] = AUTOCOMPLETE_LIMIT) -> List[str]:
+        return [row['hostname'] for row in await self.fetch(self.HOSTNAMES, user_id, f"{prefix}%", limit)]
+
+    async def groups(self, user_id: str, prefix: str = "", limit: Optional[int] = AUTOCOMPLETE_LIMIT) -> List[str]:
+        return [row['host_group'] for row in await self.fetch(self.GROUPS, user_id, f"{prefix}%", limit)]
+
+    async def add(self, user_id: str, hostname: str, ip: str, username: str, password: Optional[str],
+                  identification_file: Optional[str], port: int, group: Optional[str], setup_shard: int = 0):
+        """Insert or replace a host, marking its setup as pending on setup_shard."""
+        await self.execute(self.ADD, user_id, hostname, ip, username, password, identification_file, port, group, setup_shard)
+
+    async def update(self, user_id: str, hostname: str, hostname_edit: Optional[str] = None, ip: Optional[str] = None,
+                     username: Optional[str] = None, password: Optional[str] = None,
+                     identification_file: Optional[str] = None, port: Optional[int] = None,
+                     reboot_poll_interval: Optional[float] = None, reboot_timeout: Optional[int] = None,
+                     group: Optional[str] = None, ssh_profile: Optional[str] = None,
+                     ssh_compression: Optional[bool] = None, ssh_ciphers: Optional[str] = None,
+                     ssh_kex: Optional[str] = None, ssh_host_key_algorithms: Optional[str] = None,
+                     ssh_connect_timeout: Optional[float] = None, ssh_banner_timeout: Optional[float] = None) -> bool:
+        """Change the given fields of a host, returns False if it doesn't exist."""
+        result = await self.execute(
+            self.UPDATE, user_id, hostname, hostname_edit, ip, username, password, identification_file,
+            port, reboot_poll_interval, reboot_timeout, group, ssh_profile, ssh_compression, ssh_ciphers,
+            ssh_kex, ssh_host_key_algorithms, ssh_connect_timeout, ssh_banner_timeout
+        )
+        return result != "UPDATE 0"
+
+    async def remove(self, user_id: str, hostname: str) -> bool:
+        return await self.execute(self.REMOVE, user_id, hostname) != "DELETE 0"
+
+    async def set_setup_status(self, user_id: str, hostname: str, status: str, output: str):
+        await self.execute(self.SET_SETUP_STATUS, user_id, hostname, status, output)
+
+    async def interrupt_setups(self, shard_ids: Optional[List[int]], stale_after: float):
+        """Mark the setups of these shards (all of them for None), and stale ones, as interrupted."""
+        await self.execute(self.INTERRUPT_SETUPS, shard_ids, float(stale_after))
+
+    async def import_hosts(self, user_id: str, hosts: Sequence[Dict]):
+        """COPY the hosts into a temporary table and upsert them into hosts in one statement."""
+        records = [(user_id, *(host[field] for field in HOST_IMPORT_FIELDS)) for host in hosts]
+        columns = ["user_id"] + HOST_IMPORT_FIELDS
+        # A row without a group keeps the group the host already has
+        updates = [
+            f"{field} = COALESCE(EXCLUDED.{field}, hosts.{field})" if field == "host_group" else f"{field} = EXCLUDED.{field}"
+            for field in HOST_IMPORT_FIELDS[1:]
+        ]
+        async with tracing.acquire(self.db) as conn:
+            async with conn.transaction():
+                await conn.execute("CREATE TEMP TABLE hosts_import (LIKE hosts INCLUDING DEFAULTS) ON COMMIT DROP")
+                await conn.copy_records_to_table("hosts_import", records=records, columns=columns)
+                await conn.execute(
+                    f"""INSERT INTO hosts ({', '.join(columns)})
+                    SELECT {', '.join(columns)} FROM hosts_import
+                    ON CONFLICT (user_id, hostname) DO UPDATE
+                    SET {', '.join(updates)}"""
+                )
+
+# A live terminal joined with the connection details of its host
+TERMINAL_SESSION_COLUMNS = """lt.channel_id, lt.guild_id, lt.user_id, lt.hostname, lt.recording,
+    h.ip, h.username, h.password, h.identification_file, h.port, h.ssh_profile, h.ssh_compression,
+    h.ssh_ciphers, h.ssh_kex, h.ssh_host_key_algorithms, h.ssh_connect_timeout, h.ssh_banner_timeout"""
+
+class LiveTerminalRepository(Repository):
+    ACTIVE_SESSIONS = f"""SELECT {TERMINAL_SESSION_COLUMNS}
+        FROM live_terminals lt
+        JOIN hosts h ON lt.user_id = h.user_id AND lt.hostname = h.hostname
+        WHERE lt.is_active = true
+        ORDER BY COALESCE(lt.last_active_at, lt.created_at) DESC"""
+    SESSION = f"""SELECT {TERMINAL_SESSION_COLUMNS}
+        FROM live_terminals lt
+        JOIN hosts h ON lt.user_id = h.user_id AND lt.hostname = h.hostname
+        WHERE lt.channel_id = $1 AND lt.is_active = $2
+        ORDER BY lt.created_at DESC
+        LIMIT 1"""
+    START = """INSERT INTO live_terminals (user_id, hostname, channel_id, is_active, recording, last_active_at, guild_id)
+        VALUES ($1, $2, $3, true, $4, CURRENT_TIMESTAMP, $5)
+        ON CONFLICT (channel_id) DO UPDATE
+        SET user_id = $1, hostname = $2, is_active = true, recording = $4, last_active_at = CURRENT_TIMESTAMP, guild_id = $5"""
+    REACTIVATE = """UPDATE live_terminals
+        SET is_active = true, user_id = $1, last_active_at = CURRENT_TIMESTAMP, guild_id = $4
+        WHERE channel_id = $2 AND hostname = $3"""
+    DEACTIVATE = "UPDATE live_terminals SET is_active = false WHERE channel_id = $1"
+    DELETE = "DELETE FROM live_terminals WHERE channel_id = $1"
+    TOUCH = "UPDATE live_terminals SET last_active_at = CURRENT_TIMESTAMP WHERE channel_id = $1"
+
+    async def active_sessions(self) -> List:
+        """Every active terminal with its host, most recently used first."""
+        return await self.fetch(self.ACTIVE_SESSIONS)
+
+    async def session(self, channel_id: int, active: bool = True):
+        """The terminal in a channel with its host, or None."""
+        return await self.fetchrow(self.SESSION, str(channel_id), active)
+
+    async def start(self, user_id: str, hostname: str, channel_id: int, recording: bool, guild_id: int):
+        await self.execute(self.START, user_id, hostname, str(channel_id), recording, str(guild_id))
+
+    async def reactivate(self, user_id: str, channel_id: int, hostname: str, guild_id: int):
+        await self.execute(self.REACTIVATE, user_id, str(channel_id), hostname, str(guild_id))
+
+    async def deactivate(self, channel_id: int):
+        await self.execute(self.DEACTIVATE, str(channel_id))
+
+    async def delete(self, channel_id: int):
+        await self.execute(self.DELETE, str(channel_id))
+
+    async def touch(self, channel_id: int):
+        await self.execute(self.TOUCH, str(channel_id))
+
+TAIL_COLUMNS = "id, channel_id, guild_id, user_id, hostname, path, inode, file_offset"
+
+class TailRepository(Repository):
+    ACTIVE = f"SELECT {TAIL_COLUMNS} FROM tails WHERE is_active = true ORDER BY id"
+    FOR_USER = f"SELECT {TAIL_COLUMNS} FROM tails WHERE user_id = $1 AND is_active = true ORDER BY id"
+    # A tail that's already running in the channel isn't replaced, RETURNING gives nothing then
+    START = f"""INSERT INTO tails (channel_id, guild_id, user_id, hostname, path, inode, file_offset)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT (channel_id, hostname, path) DO UPDATE
+        SET guild_id = $2, user_id = $3, inode = $6, file_offset = $7, is_active = true, updated_at = CURRENT_TIMESTAMP
+        WHERE tails.is_active = false
+        RETURNING {TAIL_COLUMNS}"""
+    SAVE_POSITION = "UPDATE tails SET inode = $2, file_offset = $3, updated_at = CURRENT_TIMESTAMP WHERE id = $1"
+    STOP = f"""UPDATE tails SET is_active = false, updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1 AND user_id = $2 AND is_active = true
+        RETURNING {TAIL_COLUMNS}"""
+    DEACTIVATE = "UPDATE tails SET is_active = false, updated_at = CURRENT_TIMESTAMP WHERE id = $1"
+
+    async def active(self) -> List:
+        return await self.fetch(self.ACTIVE)
+
+    async def for_user(self, user_id: str) -> List:
+        return await self.fetch(self.FOR_USER, user_id)
+
+    async def start(self, channel_id: int, guild_id: Optional[int], user_id: str, hostname: str, path: str,
+                    inode: Optional[int], offset: int):
+        """Record a new tail, returns None if the channel already follows that file."""
+        return await self.fetchrow(
+            self.START, str(channel_id), str(guild_id) if guild_id else None, user_id, hostname, path, inode, offset
+        )
+
+    async def save_position(self, tail_id: int, inode: Optional[int], offset: int):
+        await self.execute(self.SAVE_POSITION, tail_id, inode, offset)
+
+    async def stop(self, tail_id: int, user_id: str):
+        """Stop one of the user's tails, returns it or None if there's no such active tail."""
+        return await self.fetchrow(self.STOP, tail_id, user_id)
+
+    async def deactivate(self, tail_id: int):
+        await self.execute(self.DEACTIVATE, tail_id)
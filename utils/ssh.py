@@ -0,0 +1,137 @@
+import io
+from typing import Dict, List, Optional
+from utils.lazy import lazy_import
+
+paramiko = lazy_import("paramiko")
+
+# Every SSH connection the bot opens goes through connect_client, so a host's connection profile
+# applies to /execute, live terminals, transfers and background jobs alike.
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_BANNER_TIMEOUT = 15
+
+# Named starting points for a host's settings. Algorithm lists are in order of preference,
+# the first one the server also supports is used. None keeps paramiko's own choice.
+PROFILES = {
+    "default": {},
+    # zlib compression pays off when the link, not the CPU, is the bottleneck
+    "slow-link": {
+        "compression": True,
+        "ciphers": "aes128-ctr,aes256-ctr",
+        "kex": "curve25519-sha256@libssh.org,ecdh-sha2-nistp256",
+        "host_key_algorithms": "ssh-ed25519,ecdsa-sha2-nistp256,rsa-sha2-256,rsa-sha2-512",
+        "connect_timeout": 30,
+        "banner_timeout": 60,
+    },
+    # Old appliances and embedded sshd that only speak SHA-1 era algorithms
+    "legacy": {
+        "ciphers": "aes128-ctr,aes128-cbc,3des-cbc",
+        "kex": "diffie-hellman-group14-sha1,diffie-hellman-group-exchange-sha1,diffie-hellman-group1-sha1",
+        "host_key_algorithms": "ssh-rsa,ssh-dss",
+        "connect_timeout": 20,
+        "banner_timeout": 30,
+    },
+}
+
+# hosts column -> setting name
+PROFILE_COLUMNS = {
+    "ssh_compression": "compression",
+    "ssh_ciphers": "ciphers",
+    "ssh_kex": "kex",
+    "ssh_host_key_algorithms": "host_key_algorithms",
+    "ssh_connect_timeout": "connect_timeout",
+    "ssh_banner_timeout": "banner_timeout",
+}
+
+# setting name -> (SecurityOptions attribute, Transport table of known algorithms)
+ALGORITHM_SETTINGS = {
+    "ciphers": ("ciphers", "_cipher_info"),
+    "kex": ("kex", "_kex_info"),
+    "host_key_algorithms": ("key_types", "_key_info"),
+}
+
+def split_algorithms(text: Optional[str]) -> List[str]:
+    return [name.strip() for name in (text or "").split(",") if name.strip()]
+
+def validate_algorithms(setting: str, text: str) -> Optional[str]:
+    """Error message for algorithm names paramiko doesn't know, None if they're all fine."""
+    known = getattr(paramiko.Transport, ALGORITHM_SETTINGS[setting][1])
+    unknown = [name for name in split_algorithms(text) if name not in known]
+    if unknown:
+        return f"Unknown {setting.replace('_', ' ')}: {', '.join(unknown)}. Supported: {', '.join(known)}"
+    return None
+
+def resolve_profile(host) -> Dict:
+    """The settings a host connects with: its own columns over its named profile over the defaults."""
+    settings = {"compression": False, "connect_timeout": DEFAULT_CONNECT_TIMEOUT, "banner_timeout": DEFAULT_BANNER_TIMEOUT}
+    settings.update(PROFILES.get(host.get("ssh_profile") or "default", {}))
+    for column, setting in PROFILE_COLUMNS.items():
+        value = host.get(column)
+        # An empty list or a zero timeout means "use the profile's", compression can be turned off explicitly
+        if value is None or (setting != "compression" and not value):
+            continue
+        settings[setting] = value
+    return settings
+
+def describe_profile(host) -> str:
+    """One line summary of a host's connection settings, for /list-hosts and /edit-host."""
+    settings = resolve_profile(host)
+    parts = [host.get("ssh_profile") or "default"]
+    if settings["compression"]:
+        parts.append("compressed")
+    for setting in ALGORITHM_SETTINGS:
+        if settings.get(setting):
+            parts.append(f"{setting.replace('_', ' ')}: {split_algorithms(settings[setting])[0]}…")
+    parts.append(f"timeouts {settings['connect_timeout']:g}s/{settings['banner_timeout']:g}s")
+    return ", ".join(parts)
+
+def load_private_key(text: str) -> "paramiko.PKey":
+    """Parse a private key of any type paramiko supports, without writing it to disk."""
+    errors = []
+    for key_class in (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey, paramiko.DSSKey):
+        try:
+            return key_class.from_private_key(io.StringIO(text))
+        except (paramiko.SSHException, ValueError) as e:
+            errors.append(f"{key_class.__name__}: {e}")
+    raise paramiko.SSHException(f"Unsupported or invalid private key ({'; '.join(errors)})")
+
+def transport_factory(settings: Dict):
+    """Build transports with the profile's algorithm preferences, set before the handshake starts."""
+    def factory(sock, **kwargs) -> "paramiko.Transport":
+        transport = paramiko.Transport(sock, **kwargs)
+        options = transport.get_security_options()
+        for setting, (attribute, _) in ALGORITHM_SETTINGS.items():
+            names = split_algorithms(settings.get(setting))
+            if names:
+                setattr(options, attribute, names)
+        return transport
+    return factory
+
+def connect_client(host, **overrides) -> "paramiko.SSHClient":
+    """Open an SSH connection to a host row (or a dict with the same keys). Blocking, run it in an executor.
+
+    overrides replace single settings of the host's profile, e.g. connect_timeout for a probe.
+    """
+    settings = resolve_profile(host)
+    settings.update(overrides)
+
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    credentials = {"password": host["password"]}
+    if host["identification_file"]:
+        credentials = {"pkey": load_private_key(host["identification_file"])}
+    try:
+        client.connect(
+            hostname=host["ip"],
+            username=host["username"],
+            port=host["port"] or 22,
+            timeout=settings["connect_timeout"],
+            banner_timeout=settings["banner_timeout"],
+            compress=bool(settings["compression"]),
+            transport_factory=transport_factory(settings),
+            **credentials
+        )
+    except Exception:
+        client.close()
+        raise
+    return client
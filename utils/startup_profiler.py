@@ -0,0 +1,94 @@
+import importlib.abc
+import sys
+import time
+
+class TimedLoader:
+    """Wraps a module loader and records how long the module takes to execute."""
+
+    def __init__(self, loader, profiler, name: str):
+        self.loader = loader
+        self.profiler = profiler
+        self.name = name
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profiler.enter(self.name)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler.leave(self.name)
+
+    def __getattr__(self, attribute):
+        return getattr(self.loader, attribute)
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Meta path hook that measures inclusive and self import time for every module."""
+
+    def __init__(self):
+        self.inclusive = {}
+        self.children = {}
+        self.stack = []
+        self.finding = False
+        self.setup_times = {}
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if self.finding:
+            return None
+        self.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self.finding = False
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self, fullname)
+        return spec
+
+    def enter(self, name: str):
+        self.stack.append((name, time.perf_counter()))
+
+    def leave(self, name: str):
+        _, started = self.stack.pop()
+        elapsed = time.perf_counter() - started
+        self.inclusive[name] = self.inclusive.get(name, 0) + elapsed
+        if self.stack:
+            parent = self.stack[-1][0]
+            self.children[parent] = self.children.get(parent, 0) + elapsed
+
+    def self_time(self, name: str) -> float:
+        return self.inclusive[name] - self.children.get(name, 0)
+
+    def record_setup(self, extension: str, total: float):
+        """Record a load_extension call, the setup cost is whatever the module import didn't take."""
+        self.setup_times[extension] = total - self.inclusive.get(extension, 0)
+
+    def report(self, top: int = 25) -> str:
+        lines = [f"Startup import profile ({len(self.inclusive)} modules)", ""]
+        lines.append(f"{'self ms':>9} {'total ms':>9}  module")
+        by_self = sorted(self.inclusive, key=self.self_time, reverse=True)[:top]
+        for name in by_self:
+            lines.append(f"{self.self_time(name) * 1000:9.1f} {self.inclusive[name] * 1000:9.1f}  {name}")
+
+        if self.setup_times:
+            lines += ["", f"{'import ms':>9} {'setup ms':>9}  extension"]
+            for extension, setup_time in self.setup_times.items():
+                lines.append(f"{self.inclusive.get(extension, 0) * 1000:9.1f} {setup_time * 1000:9.1f}  {extension}")
+
+        lines += ["", f"SSH stack loaded: {'yes' if 'paramiko.transport' in sys.modules else 'no (lazy)'}"]
+        return "\n".join(lines)
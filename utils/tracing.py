@@ -0,0 +1,183 @@
+import contextvars
+import json
+import os
+import random
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
+import discord
+from discord import app_commands
+from config import TRACING_ENABLED, TRACE_SAMPLE_RATE, TRACE_SLOW_MS, TRACE_FILE
+from utils import metrics
+
+# The trace of the interaction being handled by the current task, if any
+current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict):
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+class Trace:
+    """Spans recorded while handling one interaction, timed with the monotonic clock."""
+
+    def __init__(self, name: str):
+        self.trace_id = os.urandom(16).hex()
+        self.wall_start = time.time_ns()
+        self.root = Span(name, None, {})
+        self.spans: List[Span] = [self.root]
+        self.stack: List[Span] = [self.root]
+        self.status = "ok"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.root.end or time.monotonic()) - self.root.start) * 1000
+
+    def unix_nanos(self, timestamp: float) -> int:
+        return self.wall_start + int((timestamp - self.root.start) * 1e9)
+
+    def to_otlp(self) -> Dict:
+        """One trace as an OTLP/JSON ExportTraceServiceRequest, the format OpenTelemetry's file exporter writes."""
+        def attributes(values: Dict):
+            return [{"key": key, "value": {"stringValue": str(value)}} for key, value in values.items() if value is not None]
+
+        spans = [{
+            "traceId": self.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": 2 if span is self.root else 1,  # SERVER for the interaction, INTERNAL for phases
+            "startTimeUnixNano": str(self.unix_nanos(span.start)),
+            "endTimeUnixNano": str(self.unix_nanos(span.end if span.end is not None else self.root.end)),
+            "attributes": attributes(span.attributes),
+            "status": {"code": 2 if span is self.root and self.status == "error" else 1},
+        } for span in self.spans]
+        return {"resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": "termicord"})},
+            "scopeSpans": [{"scope": {"name": "termicord"}, "spans": spans}],
+        }]}
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a phase of the current interaction. Does nothing outside a traced interaction.
+
+    Use it around awaits in the command's own task; code running in an executor
+    thread should be wrapped from the awaiting coroutine instead.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    phase = Span(name, trace.stack[-1].span_id, attributes)
+    trace.spans.append(phase)
+    trace.stack.append(phase)
+    try:
+        yield phase
+    finally:
+        phase.end = time.monotonic()
+        trace.stack.remove(phase)
+
+@asynccontextmanager
+async def acquire(db):
+    """db.acquire() with the wait for a pool connection recorded as a db.acquire span."""
+    context = db.acquire()
+    with span("db.acquire"):
+        conn = await context.__aenter__()
+    try:
+        yield conn
+    finally:
+        await context.__aexit__(None, None, None)
+
+def set_attribute(key: str, value):
+    """Attach an attribute to the current interaction's root span."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.root.attributes[key] = value
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class TraceCollector:
+    """Keeps recent durations for percentiles and writes sampled traces to TRACE_FILE."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.by_command: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self.by_host: Dict[tuple, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self.by_phase: Dict[tuple, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self.file = None
+
+    def record(self, trace: Trace):
+        duration = trace.duration_ms
+        command = trace.root.name
+        self.by_command[command].append(duration)
+        metrics.command_seconds.observe(duration / 1000, command=command)
+        host = trace.root.attributes.get("host")
+        if host:
+            # Hostnames are per user, so are their stats
+            self.by_host[(trace.root.attributes.get("user_id"), host)].append(duration)
+        for phase in trace.spans[1:]:
+            if phase.end is not None:
+                self.by_phase[(command, phase.name)].append((phase.end - phase.start) * 1000)
+
+        # Every slow trace is kept, the rest are sampled
+        if duration >= TRACE_SLOW_MS or random.random() < TRACE_SAMPLE_RATE:
+            self.export(trace)
+
+    def export(self, trace: Trace):
+        try:
+            if self.file is None:
+                self.file = open(TRACE_FILE, "a", buffering=1)
+            self.file.write(json.dumps(trace.to_otlp(), separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"Failed to write trace: {e}")
+
+    def summary(self, series: Dict, keys=None) -> List[tuple]:
+        """(key, count, p50, p95, p99) in milliseconds for each series, slowest p95 first."""
+        rows = []
+        for key in keys if keys is not None else list(series):
+            values = list(series.get(key, ()))
+            if values:
+                rows.append((key, len(values), percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)))
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+collector = TraceCollector()
+
+def finish_interaction(interaction: discord.Interaction, status: str):
+    trace = current_trace.get()
+    if trace is None or trace.root.end is not None:
+        return
+    trace.root.end = time.monotonic()
+    trace.status = status
+    if interaction.command is not None:
+        trace.root.name = interaction.command.qualified_name
+    hostname = getattr(interaction.namespace, "hostname", None)
+    if hostname and "host" not in trace.root.attributes:
+        trace.root.attributes["host"] = hostname
+    trace.root.attributes["user_id"] = str(interaction.user.id)
+    trace.root.attributes["status"] = status
+    collector.record(trace)
+
+class TracingCommandTree(app_commands.CommandTree):
+    """Command tree that opens a trace for every slash command it handles.
+
+    The trace starts in interaction_check, which runs in the same task as the command, and is
+    finished by on_app_command_completion or on_error.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if TRACING_ENABLED and interaction.type is discord.InteractionType.application_command:
+            current_trace.set(Trace(interaction.data.get("name", "unknown")))
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        finish_interaction(interaction, "error")
+        await super().on_error(interaction, error)
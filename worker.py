@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from config import JOB_WORKERS, SSH_WORKERS
+from utils.jobrunner import JobRunner
+from utils.repository import create_pool
+
+# Runs background jobs outside the bot process so SSH work gets its own cores.
+# Set SSH_WORKER_MODE = "external" in config.py and run this next to app.py.
+
+async def run_slot(slot: int):
+    pool = await create_pool()
+
+    async def publish(job, status, exit_status):
+        # The bot process listens for these and posts the completion message
+        async with pool.acquire() as conn:
+            await conn.execute("SELECT pg_notify('job_events', $1)", str(job['id']))
+
+    runner = JobRunner(pool, slot=slot, on_finished=publish)
+    await runner.listen()
+    runner.start(JOB_WORKERS)
+    print(f"Worker {slot}/{SSH_WORKERS} started (pid {os.getpid()}, {JOB_WORKERS} concurrent jobs)")
+    try:
+        await asyncio.gather(*runner.workers)
+    finally:
+        await runner.stop()
+        await pool.close()
+
+def worker_main(slot: int):
+    try:
+        asyncio.run(run_slot(slot))
+    except KeyboardInterrupt:
+        pass
+
+def supervise(slots):
+    """Run one process per slot and restart any that exit, so no slot's jobs are left unclaimed."""
+    processes = {}
+    try:
+        while True:
+            for slot in slots:
+                process = processes.get(slot)
+                if process is not None and process.is_alive():
+                    continue
+                if process is not None:
+                    print(f"Worker {slot} exited with code {process.exitcode}, restarting")
+                process = multiprocessing.Process(target=worker_main, args=(slot,), name=f"termicord-worker-{slot}")
+                process.start()
+                processes[slot] = process
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Termicord SSH worker processes")
+    parser.add_argument(
+        "--slot", type=int, action="append",
+        help=f"Only run this worker slot (0-{SSH_WORKERS - 1}), can be repeated. Defaults to all of them"
+    )
+    args = parser.parse_args()
+
+    slots = args.slot or list(range(SSH_WORKERS))
+    invalid = [slot for slot in slots if not 0 <= slot < SSH_WORKERS]
+    if invalid:
+        parser.error(f"slots must be between 0 and {SSH_WORKERS - 1}")
+    supervise(slots)